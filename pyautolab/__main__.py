@@ -1,12 +1,19 @@
+import sys
 from multiprocessing import freeze_support
 
-from pyautolab.app.app import App
-from pyautolab.app.commands import register_default_commands
-
 
 def main():
     freeze_support()
 
+    # The command-line runner never imports Qt.
+    if len(sys.argv) > 1 and sys.argv[1] in ("run", "bench"):
+        from pyautolab.cli import main as run_cli
+
+        sys.exit(run_cli())
+
+    from pyautolab.app.app import App
+    from pyautolab.app.commands import register_default_commands
+
     app = App()
 
     register_default_commands()
@@ -1,3 +1,3 @@
-from pyautolab.api import command, qt, widgets, window
+from pyautolab.api import command, qt, storage, widgets, window
 from pyautolab.api.base import get_setting
-from pyautolab.core.plugin import Controller, Device, DeviceTab
+from pyautolab.core.plugin import AsyncDevice, Controller, Device, DeviceTab, StreamingDevice
@@ -0,0 +1,9 @@
+from pyautolab.core.storage import (
+    FlushPolicy,
+    RunFileReader,
+    SegmentManifest,
+    Sink,
+    SqliteRunReader,
+    get_sinks,
+    register_sink,
+)
@@ -1,5 +1,6 @@
 from pyautolab.api.widgets.base import Manager
 from pyautolab.core.qt.widgets import (
+    BaseRunStatus,
     BaseTimerStatus,
     CheckCombobox,
     FlexiblePopupCombobox,
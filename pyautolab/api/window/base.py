@@ -9,9 +9,13 @@ from pyautolab.core import qt
 
 
 def create_window_timer(
-    timeout=None, enable_count: bool = False, enable_clock: bool = False, timer_type: Qt.TimerType | None = None
+    timeout=None,
+    enable_count: bool = False,
+    enable_clock: bool = False,
+    timer_type: Qt.TimerType | None = None,
+    absolute_deadline: bool = False,
 ):
-    return qt.helper.timer(MainWindow.instance, timeout, enable_count, enable_clock, timer_type)
+    return qt.helper.timer(MainWindow.instance, timeout, enable_count, enable_clock, timer_type, absolute_deadline)
 
 
 def alert(
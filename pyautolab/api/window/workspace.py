@@ -3,7 +3,7 @@ from collections.abc import Callable
 from qtpy.QtWidgets import QWidget
 
 from pyautolab.app.main_window import MainWindow
-from pyautolab.core.plugin.device import DeviceTab
+from pyautolab.core.plugin.device_tab import DeviceTab
 
 
 def add_tab(
@@ -10,6 +10,7 @@ from qtpy.QtWidgets import QApplication
 from pyautolab.app.main_window import MainWindow
 from pyautolab.core import qt
 from pyautolab.core.plugin import DeviceStatus, get_plugins
+from pyautolab.core.storage import register_sink
 from pyautolab.core.utils.conf import Configuration
 
 
@@ -18,6 +19,7 @@ class _EventListener(QObject):
         if event.type() == QEvent.Type.Show:
             App.actions.execute("window.theme")
             App.actions.execute("window.openWelcomeTab")
+            App.actions.execute("runner.recover")
         elif event.type() == QEvent.Type.Close:
             for device_status in App.device_statuses:
                 if device_status.is_connected:
@@ -83,6 +85,8 @@ class App:
 
         for plugin in App.plugins:
             App.device_statuses.extend(plugin.get_device_statuses())
+            for sink in plugin.get_sinks():
+                register_sink(sink)
             for conf in plugin.get_configurations():
                 App.configurations.add_conf(conf, plugin.name)
 
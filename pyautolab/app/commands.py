@@ -4,6 +4,7 @@ from qtpy.QtWidgets import QDialogButtonBox
 
 from pyautolab.app import App, tabs
 from pyautolab.core import qt
+from pyautolab.core.runner import get_active_sinks, recover_runs
 from pyautolab.core.utils.conf import RunConfiguration
 
 
@@ -38,7 +39,8 @@ def _run() -> None:
             App.actions.execute("open.runConfTab")
         return
 
-    if save_path := qt.helper.show_save_dialog(filter="CSV UTF-8 (*.csv)"):
+    sinks = get_active_sinks(RunConfiguration().get("sinks"))
+    if save_path := qt.helper.show_save_dialog(filter=";;".join(f"{sink.title} (*{sink.suffix})" for sink in sinks)):
         App.actions.add_when("run")
         App.window.workspace.add_tab(
             tabs.MeasurementTab(save_path), "Measurement", True, lambda: App.actions.execute("runner.stop")
@@ -51,6 +53,12 @@ def _stop() -> None:
         tab.stop()  # type: ignore
 
 
+def _recover_runs() -> None:
+    if recovered_paths := recover_runs():
+        text = "Interrupted runs were recovered to:\n" + "\n".join(str(path) for path in recovered_paths)
+        qt.widgets.Alert("info", text=text, parent=App.window).open()
+
+
 def register_default_commands() -> None:
     App.register_action("window.theme", "Setup Theme", None, _setup_theme)
     App.register_action("window.openWelcomeTab", "Welcome...", None, _open_welcome_tab, menubar="Help")
@@ -97,6 +105,7 @@ def register_default_commands() -> None:
         menubar="Run",
         when="run",
     )
+    App.register_action("runner.recover", "Recover Interrupted Runs", None, _recover_runs)
     App.register_action(
         "window.openRunConfiguration",
         "Run Configuration...",
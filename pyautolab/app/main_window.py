@@ -20,6 +20,8 @@ class MainWindow(QMainWindow):
     toolbar: QToolBar
     menubar: _MenuBar
     instance: QMainWindow
+    run_statuses: list[qt.widgets.BaseRunStatus]
+    """The status bar widgets that the running measurement publishes its telemetry to."""
 
     def __init__(self) -> None:
         super().__init__()
@@ -35,6 +37,15 @@ class MainWindow(QMainWindow):
         # status bar
         self.ui.statusbar.add_status(qt.widgets.MemoryStatus(), self.ui.statusbar.Align.LEFT)
         self.ui.statusbar.add_status(qt.widgets.CPUStatus(), self.ui.statusbar.Align.LEFT)
+        MainWindow.run_statuses = [
+            qt.widgets.SampleRateStatus(),
+            qt.widgets.QueueDepthStatus(),
+            qt.widgets.WriterLagStatus(),
+            qt.widgets.DroppedSamplesStatus(),
+            qt.widgets.OverrunStatus(),
+        ]
+        for status in MainWindow.run_statuses:
+            self.ui.statusbar.add_status(status, self.ui.statusbar.Align.RIGHT)
 
         # Window size
         width = self.size().width()
@@ -1,105 +1,307 @@
-import csv
-import multiprocessing as mp
-from multiprocessing.connection import Connection
+import math
+from collections.abc import Callable
+from enum import Enum
+from functools import partial
 from pathlib import Path
-from typing import Callable
+from time import monotonic
 
-from qtpy.QtCore import QObject, Qt, Signal  # type: ignore
+from qtpy.QtCore import QCoreApplication, QObject, Qt, QThread, Signal, Slot  # type: ignore
 
 from pyautolab import api
+from pyautolab.app.app import App
+from pyautolab.core.acquisition import ConsumerStats, Measurer, OverrunPolicy, RingReader, SchedulerStats, Trigger
+from pyautolab.core.qt.widgets.timer import AutoLabTimer
+from pyautolab.core.runner import RunSession, RunTelemetry, get_active_sinks
 from pyautolab.core.utils.conf import RunConfiguration
+from pyautolab.core.utils.system import create_logger
+
+_logger = create_logger("pyautolab.controller")
+
+
+class DisplayPolicy(Enum):
+    """How the display handles more samples than it draws in one frame."""
+
+    DROP_OLDEST = "dropOldest"
+    """Draw the newest samples only."""
+    DECIMATE = "decimate"
+    """Draw every n-th sample, including the newest one."""
 
 
 class DataReadWorker(QObject):
-    sig_read = Signal(dict)
+    """Emit the samples of the display reader at the display frame rate.
+
+    Every frame drains all samples written since the last one and emits them as one numpy block, so the display
+    keeps up with any measuring interval and the Qt event loop handles ``frame_rate`` signals per second. A frame
+    holds at most ``max_rows`` samples, the others are dropped or decimated by ``policy`` and counted in the stats
+    of the reader. When ``is_finished`` returns True and every sample was emitted, e.g. because a finite run
+    measured all its samples, ``sig_finished`` is emitted once. If ``get_telemetry`` is given, the snapshot it returns
+    is emitted with ``sig_telemetry`` every ``telemetry_interval`` milliseconds and when the worker stops.
+    """
+
+    sig_read = Signal(object)
+    sig_telemetry = Signal(object)
     sig_stopped = Signal()
+    sig_finished = Signal()
 
-    def __init__(self, parent_recv_conn: Connection):
+    def __init__(
+        self,
+        reader: RingReader,
+        frame_rate: float = 30,
+        policy: DisplayPolicy = DisplayPolicy.DECIMATE,
+        max_rows: int = 10000,
+        is_finished: Callable[[], bool] | None = None,
+        get_telemetry: Callable[[], RunTelemetry] | None = None,
+        telemetry_interval: int = 500,
+    ):
         super().__init__()
-        self._parent_recv_conn = parent_recv_conn
+        self._get_telemetry = get_telemetry
+        self._telemetry_interval = telemetry_interval / 1000
+        self._telemetry_published = 0.0
+        self._reader = reader
+        self._frame_interval = max(1, round(1000 / frame_rate))
+        self._policy = policy
+        self._max_rows = max_rows
+        self._is_finished = is_finished
 
     def start(self) -> None:
-        self._timer_read_data = api.qt.timer(self, timeout=self._on_timer_timeout)
+        self._timer_read_data = api.qt.timer(
+            self, timeout=self._on_timer_timeout, timer_type=Qt.TimerType.PreciseTimer
+        )
         self.sig_stopped.connect(self._stop)
-        self._timer_read_data.start(10)
+        self._timer_read_data.start(self._frame_interval)
 
     def _on_timer_timeout(self) -> None:
-        if self._parent_recv_conn.poll(0):
-            data = self._parent_recv_conn.recv()
-            self.sig_read.emit(data)
+        # Checked before reading, so the last samples are emitted before the run is reported as finished.
+        is_finished = self._is_finished is not None and self._is_finished()
+        frame = self._reader.read()
+        if len(frame) > self._max_rows:
+            if self._policy is DisplayPolicy.DROP_OLDEST:
+                self._reader.count_dropped(len(frame) - self._max_rows)
+                frame = frame[-self._max_rows :]
+            else:
+                step = math.ceil(len(frame) / self._max_rows)
+                decimated_frame = frame[(len(frame) - 1) % step :: step]
+                self._reader.count_decimated(len(frame) - len(decimated_frame))
+                frame = decimated_frame
+        if len(frame):
+            self.sig_read.emit(frame)
+        if self._get_telemetry is not None and monotonic() - self._telemetry_published >= self._telemetry_interval:
+            self._publish_telemetry()
+        if is_finished and self._reader.lag == 0:
+            self._is_finished = None
+            self.sig_finished.emit()
+
+    def _publish_telemetry(self) -> None:
+        assert self._get_telemetry is not None
+        self._telemetry_published = monotonic()
+        self.sig_telemetry.emit(self._get_telemetry())
 
     def _stop(self) -> None:
+        self._is_finished = None
         self._timer_read_data.stop()
+        # The last samples of the run were written after the last frame.
+        self._on_timer_timeout()
+        if self._get_telemetry is not None:
+            self._publish_telemetry()
+
+
+class ControllerWorker(QObject):
+    """Run the controllers of a run on the thread this worker lives in.
 
+    The controllers that have a `Controller.interval` are called on absolute deadlines by timers of this thread, so a
+    late call never shifts the following ones. A tick that fired late, or after deadlines were skipped by
+    ``overrun_policy``, is an overrun: the first one of each controller is logged, and all of them are counted in the
+    stats returned by `get_stats`. A controller whose `Controller.control` raised is not called anymore.
+    """
 
-class SaveWorker:
-    def __init__(self, data_info: dict[str, str], save_file_path: Path) -> None:
+    sig_stop = Signal()
+
+    def __init__(self, controllers: set[api.Controller], overrun_policy: OverrunPolicy = OverrunPolicy.SKIP) -> None:
         super().__init__()
-        self._child_recv_conn, self.parent_send_conn = mp.Pipe(duplex=False)
-        self._data_info = data_info
-        self.stop_event = mp.Event()
-        self._save_file_path = save_file_path
+        self._controllers = list(controllers)
+        self._overrun_policy = overrun_policy
+        self._timers: list[AutoLabTimer] = []
+        self._stats: dict[str, SchedulerStats] = {}
+
+    def get_stats(self) -> dict[str, SchedulerStats]:
+        """Return the live jitter and overrun statistics of each controller with an interval."""
+        return dict(self._stats)
 
+    # The slots are decorated, so queued calls run on the thread this worker was moved to after they were connected.
+    @Slot()
     def start(self) -> None:
-        with self._save_file_path.open("w", encoding="utf-8-sig", newline="") as f:
-            header = [f"{name}[{unit}]" for name, unit in self._data_info.items()]
-            f.write(",".join(header) + "\n")
-            writer = csv.DictWriter(f, self._data_info.keys())
-            while not self.stop_event.is_set():
-                if self._child_recv_conn.poll():
-                    writer.writerow(self._child_recv_conn.recv())
+        for controller in self._controllers:
+            name = type(controller).__name__
+            try:
+                controller.start()
+            except Exception:
+                _logger.exception(f"{name} failed to start.")
+                continue
+            if controller.interval is None:
+                continue
+            timer = AutoLabTimer(self, absolute_deadline=True, overrun_policy=self._overrun_policy)
+            timer.setTimerType(Qt.TimerType.PreciseTimer)
+            timer.timeout.connect(partial(self._control, controller, timer))  # type: ignore
+            timer.start(controller.interval)
+            self._stats[name] = timer.stats  # type: ignore
+            self._timers.append(timer)
+
+    def _control(self, controller: api.Controller, timer: AutoLabTimer) -> None:
+        tick = timer.tick
+        assert tick is not None and timer.stats is not None
+        name = type(controller).__name__
+        if tick.overrun and timer.stats.overruns == 1:
+            _logger.warning(
+                f"{name} overran its interval of {controller.interval} ms. The overruns are counted in its stats."
+            )
+        try:
+            controller.control(tick)
+        except Exception:
+            _logger.exception(f"{name} stopped because its control raised an exception.")
+            timer.stop()
+
+    @Slot()
+    def stop(self) -> None:
+        for timer in self._timers:
+            timer.stop()
+        self._timers.clear()
+        main_thread = QCoreApplication.instance().thread()  # type: ignore
+        for controller in self._controllers:
+            try:
+                controller.stop()
+            except Exception:
+                _logger.exception(f"{type(controller).__name__} failed to stop.")
+            # Only the thread an object lives in can move it, and the tab may hand the controller to the next run.
+            controller.moveToThread(main_thread)
+        self.moveToThread(main_thread)
+        for name, stats in self._stats.items():
+            if stats.overruns:
+                _logger.warning(f"{name} overran {stats.overruns} of {stats.ticks} ticks.")
 
 
 class Runner:
     def __init__(self, device_tabs: set[api.DeviceTab], save_path: Path) -> None:
-        # Timer
-        self._measure_timer = api.qt.timer(enable_count=False, enable_clock=True, timer_type=Qt.TimerType.PreciseTimer)
+        conf = RunConfiguration()
 
         # get_control_object
-        self._measurers: set[Callable] = set()
+        interval = int(conf.get("measuringInterval")) / 1000
+        measurers: list[Measurer] = []
+        units: dict[str, str] = {}
         self._controllers: set[api.Controller] = set()
         for tab in device_tabs:
             tab.setup_settings()
             if controller := tab.get_controller():
                 self._controllers.add(controller)
+            if parameters := tab.get_parameters():
+                units.update(parameters)
             if hasattr(tab.device, "measure"):
-                self._measurers.add(tab.device.measure)  # type: ignore
+                timeout = tab.get_measure_timeout()
+                measuring_interval = tab.get_measuring_interval()
+                measurers.append(
+                    Measurer(
+                        type(tab.device).__name__,
+                        tab.device.measure,  # type: ignore
+                        [] if parameters is None else list(parameters),
+                        None if timeout is None else timeout / 1000,
+                        None if measuring_interval is None else measuring_interval / 1000,
+                        streaming=isinstance(tab.device, api.StreamingDevice),
+                    )
+                )
 
-        # multiprocessing
-        self.parent_recv_conn, self.child_send_conn = mp.Pipe(duplex=False)
-        self.stop_event = mp.Event()
-        self.data_descriptions = {"Time": "sec"}
-        for tab in device_tabs:
-            if parameters := tab.get_parameters():
-                self.data_descriptions.update(parameters)
+        # A trigger that can not be used saves every sample rather than none.
+        trigger: Trigger | None = None
+        if (trigger_conf := conf.get("trigger")) and trigger_conf.get("enabled"):
+            if (channel := trigger_conf.get("channel")) not in units:
+                _logger.warning(f'The trigger channel "{channel}" is not measured. Every sample is saved.')
+            else:
+                try:
+                    trigger = Trigger.from_dict(trigger_conf)
+                except ValueError as e:
+                    _logger.warning(f"{e} Every sample is saved.")
+
+        self._session = RunSession(
+            measurers,
+            units,
+            save_path,
+            App.configurations,
+            interval,
+            get_active_sinks(conf.get("sinks")),
+            None if conf.get("continuous") else int(conf.get("numberOfMeasuringTimes")),
+            display=True,
+            trigger=trigger,
+        )
+        self.max_samples = self._session.max_samples
+        """The number of samples of a finite run, or None if the run continues until it is stopped."""
+        self.sampling_intervals = self._session.sampling_intervals
+        self.streaming_parameters = self._session.streaming_parameters
+        self.data_descriptions = self._session.data_descriptions
+        self.timestamp_columns = self._session.timestamp_columns
+        self.schema = self._session.schema
+        self.profiler = self._session.profiler
+        self.display_reader: RingReader = self._session.display_reader  # type: ignore
+        self.stop_event = self._session.stop_event
 
-        self._save_worker = SaveWorker(self.data_descriptions, save_path)
-        self._save_process = mp.Process(target=self._save_worker.start)
-        self._save_process.daemon = True
+        # The controllers run on their own event loop, so redrawing the graphs does not delay them.
+        self._controller_worker = ControllerWorker(
+            self._controllers, OverrunPolicy(App.configurations.get("runner.scheduler.overrunPolicy"))
+        )
+        self._controller_thread: QThread | None = None
+        # Qt only moves objects without a parent to another thread.
+        if parented := sorted(type(controller).__name__ for controller in self._controllers if controller.parent()):
+            _logger.warning(f"{', '.join(parented)} have a parent, so the controllers run on the GUI thread.")
+        elif self._controllers and App.configurations.get("runner.controller.thread"):
+            self._controller_thread = QThread()
+            self._controller_thread.setObjectName("pyautolab-controllers")
+            self._controller_thread.started.connect(self._controller_worker.start)  # type: ignore
+            self._controller_worker.sig_stop.connect(
+                self._controller_worker.stop, Qt.ConnectionType.BlockingQueuedConnection
+            )
+
+    @property
+    def is_multi_rate(self) -> bool:
+        """Whether the devices are sampled at different intervals or stream blocks, so each parameter has its own
+        timestamps."""
+        return len(set(self.sampling_intervals.values())) > 1 or bool(self.streaming_parameters)
+
+    def is_finished(self) -> bool:
+        """Whether the acquisition ended by itself, because a finite run measured all its samples or a device
+        failed. Call `stop` to save the files."""
+        return self._session.is_finished()
 
     def start(self) -> None:
-        self._save_process.start()
-        self._measure_timer.timeout.connect(self._measure)  # type: ignore
-
-        for device_controller in self._controllers:
-            device_controller.start()
-        self._measure_timer.start(int(RunConfiguration().get("measuringInterval")))
-
-    def _measure(self) -> None:
-        measurement_time = round(self._measure_timer.time, 2)
-        measurements = {"Time": measurement_time}
-        for measurer in self._measurers:
-            measurements.update(measurer())
-        self.child_send_conn.send(measurements)
-        self._save_worker.parent_send_conn.send(measurements)
-        if self.stop_event.is_set():
-            self.stop()
+        self._session.start()
+        if self._controller_thread is None:
+            self._controller_worker.start()
+            return
+        self._controller_worker.moveToThread(self._controller_thread)
+        for controller in self._controllers:
+            controller.moveToThread(self._controller_thread)
+        self._controller_thread.start()
 
     def stop(self) -> None:
-        self._measure_timer.stop()
-        for device_controller in self._controllers:
-            device_controller.stop()
-        self._save_worker.stop_event.set()
-        self._save_process.join()
+        if self._controllers:
+            if self._controller_thread is None:
+                self._controller_worker.stop()
+            elif self._controller_thread.isRunning():
+                # Blocks until the controllers stopped on their thread.
+                self._controller_worker.sig_stop.emit()
+                self._controller_thread.quit()
+                self._controller_thread.wait()
         self._controllers.clear()
-        self._measurers.clear()
+        self._session.stop()
+
+    def get_controller_stats(self) -> dict[str, SchedulerStats]:
+        """Return the live jitter and overrun statistics of each controller with an interval."""
+        return self._controller_worker.get_stats()
+
+    def get_telemetry(self) -> RunTelemetry:
+        """Return a snapshot of the counters of the running measurement."""
+        return self._session.get_telemetry()
+
+    def get_consumer_stats(self) -> list[ConsumerStats]:
+        """Return the live backpressure counters of the display and every storage sink."""
+        return self._session.get_consumer_stats()
+
+    def close(self) -> None:
+        """Release the shared buffer. Call this after every reader stopped."""
+        self._session.close()
@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 from time import sleep
 
 import qtawesome as qta
@@ -16,6 +18,8 @@ class _DataReadWorker(QObject):
     def __init__(self, device_status: DeviceStatus):
         super().__init__(None)
         self._device_status = device_status
+        # One loop for the whole monitoring, rather than one per read.
+        self._event_loop: asyncio.AbstractEventLoop | None = None
 
     def start(self) -> None:
         self._timer_read_data = qt.helper.timer(self, timeout=self._read)
@@ -25,6 +29,10 @@ class _DataReadWorker(QObject):
     def _read(self) -> None:
         try:
             message = self._device_status.device.receive()
+            if inspect.isawaitable(message):
+                if self._event_loop is None:
+                    self._event_loop = asyncio.new_event_loop()
+                message = self._event_loop.run_until_complete(message)
         except Exception:
             self.sig_read.emit("")
             return
@@ -34,6 +42,9 @@ class _DataReadWorker(QObject):
 
     def _stop(self) -> None:
         self._timer_read_data.stop()
+        if self._event_loop is not None:
+            self._event_loop.close()
+            self._event_loop = None
 
 
 class CommunicationMonitor(QWidget):
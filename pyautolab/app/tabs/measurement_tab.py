@@ -1,12 +1,15 @@
 from pathlib import Path
+from time import monotonic, perf_counter_ns
 
+import numpy as np
 from qtpy.QtCore import Qt, QThread, Slot  # type: ignore
-from qtpy.QtWidgets import QDockWidget, QLineEdit, QMainWindow, QPlainTextEdit, QWidget
+from qtpy.QtWidgets import QDockWidget, QLabel, QLineEdit, QMainWindow, QPlainTextEdit, QWidget
 
 from pyautolab.app.app import App
 from pyautolab.app.main_window import MainWindow
-from pyautolab.app.runner import DataReadWorker, Runner
+from pyautolab.app.runner import DataReadWorker, DisplayPolicy, Runner
 from pyautolab.core import qt
+from pyautolab.core.acquisition import Stage
 from pyautolab.core.plugin import DeviceTab
 from pyautolab.core.utils.conf import RunConfiguration
 
@@ -16,12 +19,22 @@ class MeasurementTab(QMainWindow):
         super().__init__()
         self.ui = _SubWindowUi()
         self._conf = RunConfiguration()
+        self._show_graph: bool = self._conf.get("showGraph")
+        self._console_lines: int = App.configurations.get("runner.console.maximumNumberOfLine")
+        self._profile_updated = 0.0
         self.ui.setup_ui(self)
         self._runner = self._create_runner(save_path)
 
         # Thread
         self._data_read_thread = QThread()
-        self._data_read_worker = DataReadWorker(self._runner.parent_recv_conn)
+        self._data_read_worker = DataReadWorker(
+            self._runner.display_reader,
+            App.configurations.get("runner.graph.frameRate"),
+            DisplayPolicy(App.configurations.get("runner.display.policy")),
+            App.configurations.get("runner.display.maxSamplesPerFrame"),
+            self._runner.is_finished,
+            self._runner.get_telemetry,
+        )
 
         self._setup()
 
@@ -40,15 +53,19 @@ class MeasurementTab(QMainWindow):
         self.ui.line_edit_description.setCursorPosition(0)
         # Signal Slot
         self._data_read_worker.sig_read.connect(self._on_read)
+        self._data_read_worker.sig_finished.connect(self._on_finished)
+        for status in MainWindow.run_statuses:
+            status.reset()
+            self._data_read_worker.sig_telemetry.connect(status.update_telemetry)
 
         # layout
         graph_states: None | dict = self._conf.get("graphShowStates")
         graph_number_of_plots: None | dict = self._conf.get("graphNumberOfPlots")
         line_width: int = App.configurations.get("runner.graph.lineWidth")
-        if self._conf.get("showGraph"):
+        if self._show_graph:
             self.ui.plot_widgets.show()
             for title, unit in self._runner.data_descriptions.items():
-                if title == "Time":
+                if title == "Time" or title in self._runner.timestamp_columns:
                     continue
                 # Graph show states
                 graph_state = True if graph_states is None else graph_states.get(title)
@@ -59,8 +76,18 @@ class MeasurementTab(QMainWindow):
                 plots = 100 if graph_number_of_plots is None else graph_number_of_plots.get(title)
                 if plots is None:
                     plots = 100
+                # The graph of a finite run holds all its samples, so its buffer never shifts.
+                if self._runner.max_samples is not None:
+                    plots = self._runner.max_samples
                 self.ui.plot_widgets.create_graph(
-                    title=f"{title}", x_max=plots, y_label=title, y_unit=unit, line_width=line_width
+                    title=f"{title}",
+                    x_label="Time" if self._runner.is_multi_rate else "",
+                    x_unit="s" if self._runner.is_multi_rate else "",
+                    x_max=plots,
+                    y_label=title,
+                    y_unit=unit,
+                    line_width=line_width,
+                    time_axis=self._runner.is_multi_rate,
                 )
 
         # thread
@@ -70,7 +97,7 @@ class MeasurementTab(QMainWindow):
         self._data_read_thread.start()
 
         # settings
-        self.ui.console.setMaximumBlockCount(App.configurations.get("runner.console.maximumNumberOfLine"))
+        self.ui.console.setMaximumBlockCount(self._console_lines)
 
         # multiprocessing
         self._runner.start()
@@ -79,32 +106,91 @@ class MeasurementTab(QMainWindow):
     def stop(self) -> None:
         if self._data_read_thread.isFinished():
             return
-        self._runner.stop_event.set()
+        self._runner.stop()
         self._data_read_worker.sig_stopped.emit()
         self._data_read_thread.quit()
         self._data_read_thread.wait()
+        self._runner.close()
 
-    @Slot(dict)
-    def _on_read(self, data: dict[str, float]) -> None:
-        str_list = [str(value) for value in data.values()]
-        self.ui.console.appendPlainText(", ".join(str_list))
-
-        if self._conf.get("showGraph"):
-            data.pop("Time")
-            self.ui.plot_widgets.update(data)
+    @Slot()
+    def _on_finished(self) -> None:
+        # The run ended by itself, stop it as the stop button does.
+        App.actions.execute("runner.stop")
+
+    @Slot(object)
+    def _on_read(self, frame: np.ndarray) -> None:
+        profiler = self._runner.profiler
+        start_ns = perf_counter_ns() if profiler is not None else 0
+        # Rows that would scroll out of the console at once are not formatted.
+        rows = frame[-self._console_lines :].tolist()
+        self.ui.console.appendPlainText("\n".join(", ".join(str(value) for value in row) for row in rows))
+        if profiler is not None:
+            profiler.record(Stage.DISPLAY, "console", perf_counter_ns() - start_ns)
+
+        if self._show_graph:
+            start_ns = perf_counter_ns() if profiler is not None else 0
+            columns = self._runner.schema.columns
+            if self._runner.is_multi_rate:
+                # Each parameter is plotted against its own timestamps, the rows of the other devices are NaN.
+                data, times = {}, {}
+                for i in range(1, len(columns)):
+                    sampled = ~np.isnan(frame[:, i])
+                    data[columns[i]], times[columns[i]] = frame[sampled, i], frame[sampled, 0]
+                self.ui.plot_widgets.extend(data, times)
+            else:
+                self.ui.plot_widgets.extend({columns[i]: frame[:, i] for i in range(1, len(columns))})
+            if profiler is not None:
+                profiler.record(Stage.DISPLAY, "graph", perf_counter_ns() - start_ns)
+        self._update_consumer_stats()
+        # The histograms change little from frame to frame, so they are shown once per second.
+        if profiler is not None and monotonic() - self._profile_updated >= 1:
+            self._profile_updated = monotonic()
+            self._update_profile()
+
+    def _update_consumer_stats(self) -> None:
+        texts = []
+        for stats in self._runner.get_consumer_stats():
+            counts = {"dropped": stats.dropped, "spilled": stats.recovered, "decimated": stats.decimated}
+            counters = [f"{count} {label}" for label, count in counts.items() if count]
+            if stats.blocked:
+                counters.append(f"blocked {stats.blocked:.1f} s")
+            if counters:
+                texts.append(f"{stats.name}: {', '.join(counters)}")
+        for name, controller_stats in self._runner.get_controller_stats().items():
+            if controller_stats.overruns:
+                texts.append(
+                    f"{name}: {controller_stats.overruns} overruns, "
+                    f"late up to {controller_stats.max_jitter_ns / 1e6:.1f} ms"
+                )
+        self.ui.label_consumer_stats.setText("\n".join(texts))
+        self.ui.label_consumer_stats.setVisible(bool(texts))
+
+    def _update_profile(self) -> None:
+        assert self._runner.profiler is not None
+        texts = []
+        for (stage, name), histogram in self._runner.profiler.get_histograms().items():
+            if histogram.count:
+                texts.append(
+                    f"{stage.value} {name}: p50 {histogram.percentile(50) / 1e6:.3f}, "
+                    f"p99 {histogram.percentile(99) / 1e6:.3f}, max {histogram.max_ns / 1e6:.3f} ms"
+                )
+        self.ui.label_profile.setText("\n".join(texts))
+        self.ui.label_profile.setVisible(bool(texts))
 
 
 class _SubWindowUi:
     def setup_ui(self, win: QMainWindow) -> None:
         self.line_edit_description = QLineEdit()
+        self.label_consumer_stats = QLabel()
+        self.label_profile = QLabel()
         self.console = QPlainTextEdit(win)
-        self.plot_widgets = qt.widgets.MultiplePlotWidget(
-            win, App.configurations.get("runner.graph.antialias")
-        )
+        self.plot_widgets = qt.widgets.MultiplePlotWidget(win, App.configurations.get("runner.graph.antialias"))
 
         # Setup UI
         self.line_edit_description.setReadOnly(True)
         self.line_edit_description.setContentsMargins(0, 0, 0, 0)
+        self.label_consumer_stats.hide()
+        self.label_profile.hide()
         self.console.setReadOnly(True)
         self.console.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
         self.console.setUndoRedoEnabled(False)
@@ -115,7 +201,13 @@ class _SubWindowUi:
         win.setCentralWidget(self.plot_widgets)
 
         widget = QWidget()
-        qt.helper.layout(self.line_edit_description, self.console, parent=widget).setContentsMargins(0, 0, 0, 0)
+        qt.helper.layout(
+            self.line_edit_description,
+            self.label_consumer_stats,
+            self.label_profile,
+            self.console,
+            parent=widget,
+        ).setContentsMargins(0, 0, 0, 0)
 
         left_dock = QDockWidget("Console")
         left_dock.setWidget(widget)
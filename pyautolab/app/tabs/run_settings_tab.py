@@ -1,12 +1,24 @@
 import qtawesome as qta
 from qtpy.QtCore import Qt, Slot  # type: ignore
 from qtpy.QtGui import QStandardItem, QStandardItemModel
-from qtpy.QtWidgets import QFormLayout, QGroupBox, QRadioButton, QSpinBox, QTreeView, QWidget
+from qtpy.QtWidgets import (
+    QCheckBox,
+    QComboBox,
+    QDoubleSpinBox,
+    QFormLayout,
+    QGroupBox,
+    QRadioButton,
+    QSpinBox,
+    QTreeView,
+    QWidget,
+)
 
 from pyautolab.app.app import App
 from pyautolab.app.main_window import MainWindow
 from pyautolab.core import qt
+from pyautolab.core.acquisition import Slope, TriggerMode
 from pyautolab.core.plugin import DeviceTab
+from pyautolab.core.storage import get_sinks
 from pyautolab.core.utils.conf import RunConfiguration
 
 
@@ -29,6 +41,18 @@ class RunConfTab(QWidget):
         self._ui.graph_value_model.itemChanged.connect(self._change_graph_show_state)
         self._ui.graph_value_model.itemChanged.connect(self._change_graph_number_of_plots)
         self._ui.p_btn_reload_tree_view.pressed.connect(self.update_graph_tree_view)
+        for checkbox_sink in self._ui.checkbox_sinks.values():
+            checkbox_sink.toggled.connect(self._change_sinks)
+        self._ui.group_trigger.toggled.connect(lambda is_checked: self._change_trigger("enabled", is_checked))
+        self._ui.combobox_trigger_channel.currentTextChanged.connect(
+            lambda text: self._change_trigger("channel", text)
+        )
+        self._ui.combobox_trigger_mode.currentTextChanged.connect(self._change_trigger_mode)
+        self._ui.spinbox_trigger_level.valueChanged.connect(lambda value: self._change_trigger("level", value))
+        self._ui.spinbox_trigger_upper.valueChanged.connect(lambda value: self._change_trigger("upper", value))
+        self._ui.combobox_trigger_slope.currentTextChanged.connect(lambda text: self._change_trigger("slope", text))
+        self._ui.spinbox_pre_samples.valueChanged.connect(lambda num: self._change_trigger("preSamples", num))
+        self._ui.spinbox_post_samples.valueChanged.connect(lambda num: self._change_trigger("postSamples", num))
 
         # Configuration
         self._ui.spinbox_interval.setValue(self._conf.get("measuringInterval"))
@@ -36,6 +60,19 @@ class RunConfTab(QWidget):
         self._ui.radiobutton_interval.setChecked(not self._conf.get("continuous"))
         self._ui.spinbox_number_measuring.setValue(self._conf.get("numberOfMeasuringTimes"))
         self._ui.group_graph.setChecked(self._conf.get("showGraph"))
+        sinks = self._conf.get("sinks")
+        for name, checkbox_sink in self._ui.checkbox_sinks.items():
+            checkbox_sink.setChecked(name in sinks)
+        trigger = self._conf.get("trigger")
+        self._ui.group_trigger.setChecked(trigger["enabled"])
+        self._ui.combobox_trigger_channel.setCurrentText(trigger["channel"])
+        self._ui.combobox_trigger_mode.setCurrentText(trigger["mode"])
+        self._ui.spinbox_trigger_level.setValue(trigger["level"])
+        self._ui.spinbox_trigger_upper.setValue(trigger["upper"])
+        self._ui.combobox_trigger_slope.setCurrentText(trigger["slope"])
+        self._ui.spinbox_pre_samples.setValue(trigger["preSamples"])
+        self._ui.spinbox_post_samples.setValue(trigger["postSamples"])
+        self._change_trigger_mode(trigger["mode"])
 
         # Setup graph tree view
         self.update_graph_tree_view()
@@ -45,6 +82,21 @@ class RunConfTab(QWidget):
         self._conf.add("continuous", is_checked)
         self._ui.spinbox_number_measuring.setDisabled(is_checked)
 
+    @Slot()
+    def _change_sinks(self) -> None:
+        self._conf.add("sinks", [name for name, checkbox in self._ui.checkbox_sinks.items() if checkbox.isChecked()])
+
+    def _change_trigger(self, key: str, value: str | bool | float) -> None:
+        trigger = self._conf.get("trigger")
+        trigger[key] = value
+        self._conf.add("trigger", trigger)
+
+    @Slot(str)  # type: ignore
+    def _change_trigger_mode(self, mode: str) -> None:
+        self._change_trigger("mode", mode)
+        self._ui.spinbox_trigger_upper.setEnabled(mode == TriggerMode.WINDOW.value)
+        self._ui.combobox_trigger_slope.setDisabled(mode == TriggerMode.WINDOW.value)
+
     def _change_graph_show_state(self, item: QStandardItem) -> None:
         measurement = item.text()
         if item.column() != 0:
@@ -106,6 +158,13 @@ class RunConfTab(QWidget):
             for name, unit in _parameters.items():
                 parameters.update({name: {"Unit": unit, "State": True, "Number": 100}})
 
+        channel = self._ui.combobox_trigger_channel.currentText()
+        self._ui.combobox_trigger_channel.blockSignals(True)
+        self._ui.combobox_trigger_channel.clear()
+        self._ui.combobox_trigger_channel.addItems(list(parameters))
+        self._ui.combobox_trigger_channel.setCurrentText(channel)
+        self._ui.combobox_trigger_channel.blockSignals(False)
+
         # Marge saved parameters
         show_states_saved = self._conf.get("graphShowStates")
         if show_states_saved is not None:
@@ -137,6 +196,15 @@ class _TabUI:
         self.p_btn_reload_tree_view = qt.helper.push_button(icon=qta.icon("mdi6.reload"), text="Reload")
 
         self.group_graph = QGroupBox("Graph")
+        self.checkbox_sinks = {name: QCheckBox(f"{sink.title} (*{sink.suffix})") for name, sink in get_sinks().items()}
+        self.group_trigger = QGroupBox("Trigger")
+        self.combobox_trigger_channel = QComboBox()
+        self.combobox_trigger_mode = QComboBox()
+        self.spinbox_trigger_level = QDoubleSpinBox()
+        self.spinbox_trigger_upper = QDoubleSpinBox()
+        self.combobox_trigger_slope = QComboBox()
+        self.spinbox_pre_samples = QSpinBox()
+        self.spinbox_post_samples = QSpinBox()
 
         self.graph_value_model = QStandardItemModel()
 
@@ -146,6 +214,14 @@ class _TabUI:
         self.treeview_graph.setFixedHeight(240)
         self.treeview_graph.setAlternatingRowColors(True)
         self.treeview_graph.setStyleSheet("QHeaderView::section:first {padding-left: 50px;}")
+        self.combobox_trigger_channel.setEditable(True)
+        self.combobox_trigger_mode.addItems([mode.value for mode in TriggerMode])
+        self.combobox_trigger_slope.addItems([slope.value for slope in Slope])
+        for spinbox_level in (self.spinbox_trigger_level, self.spinbox_trigger_upper):
+            spinbox_level.setRange(-1e9, 1e9)
+            spinbox_level.setDecimals(6)
+        self.spinbox_pre_samples.setRange(0, 10_000_000)
+        self.spinbox_post_samples.setRange(0, 10_000_000)
 
         # Layout
         group_interval = QGroupBox("Interval")
@@ -159,6 +235,20 @@ class _TabUI:
         f_layout.addRow(self.radiobutton_interval, qt.helper.add_unit(self.spinbox_number_measuring, "times"))
         group_number_of_times.setLayout(f_layout)
 
+        group_storage = QGroupBox("Storage")
+        qt.helper.layout(*self.checkbox_sinks.values(), parent=group_storage)
+
+        self.group_trigger.setCheckable(True)
+        f_layout_trigger = QFormLayout()
+        f_layout_trigger.addRow("Channel", self.combobox_trigger_channel)
+        f_layout_trigger.addRow("Mode", self.combobox_trigger_mode)
+        f_layout_trigger.addRow("Level", self.spinbox_trigger_level)
+        f_layout_trigger.addRow("Upper level", self.spinbox_trigger_upper)
+        f_layout_trigger.addRow("Slope", self.combobox_trigger_slope)
+        f_layout_trigger.addRow("Before each event", qt.helper.add_unit(self.spinbox_pre_samples, "samples"))
+        f_layout_trigger.addRow("After each event", qt.helper.add_unit(self.spinbox_post_samples, "samples"))
+        self.group_trigger.setLayout(f_layout_trigger)
+
         self.group_graph.setCheckable(True)
         qt.helper.layout(self.p_btn_reload_tree_view, self.treeview_graph, parent=self.group_graph)
 
@@ -166,6 +256,8 @@ class _TabUI:
             "This setting is automatically saved.",
             group_interval,
             group_number_of_times,
+            group_storage,
+            self.group_trigger,
             self.group_graph,
             parent=win,
         )
@@ -0,0 +1,314 @@
+"""
+pyautolab command-line runner
+This file only deals with non-GUI runner features
+
+Measure devices of the installed plugins and save the samples without Qt, e.g. on an acquisition box without a
+display::
+
+    python -m pyautolab run --devices Multimeter --port Multimeter=/dev/ttyUSB0 --interval 100 --out run.csv
+
+or benchmark the acquisition pipeline, see `pyautolab.core.benchmark`::
+
+    python -m pyautolab bench --out benchmark.json --baseline previous.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import signal
+import sys
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from pyautolab.core.acquisition import Block, Measurer, Slope, Trigger, TriggerMode
+from pyautolab.core.benchmark import Scenario, find_regressions, format_result, run_benchmark
+from pyautolab.core.plugin import DeviceStatus, StreamingDevice, get_plugins
+from pyautolab.core.runner import RunSession, get_active_sinks, get_sink_path, recover_runs
+from pyautolab.core.storage import get_sinks, register_sink
+from pyautolab.core.utils.conf import Configuration, RunConfiguration
+from pyautolab.core.utils.system import create_logger
+
+_logger = create_logger("pyautolab.cli")
+
+
+class _CliError(Exception):
+    """This error raise when the devices of a run can not be set up."""
+
+
+def _create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pyautolab", description="Run pyAutoLab without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run = subparsers.add_parser("run", help="Measure devices and save the samples.")
+    run.add_argument("--devices", nargs="+", required=True, metavar="NAME", help="The names of the devices.")
+    run.add_argument("--out", type=Path, required=True, help="The path of the file to save.")
+    run.add_argument(
+        "--interval", type=int, metavar="MS", help="The measuring interval. Defaults to the run configuration."
+    )
+    run.add_argument("--samples", type=int, metavar="N", help="Stop after this many samples.")
+    run.add_argument("--duration", type=float, metavar="SEC", help="Stop after this many seconds.")
+    run.add_argument("--sinks", nargs="+", metavar="NAME", help="The file formats. Defaults to the run configuration.")
+    run.add_argument("--port", action="append", default=[], metavar="NAME=PORT", help="The port of a device.")
+    run.add_argument("--baudrate", action="append", default=[], metavar="NAME=RATE", help="The baud rate of a device.")
+    run.add_argument(
+        "--device-interval",
+        action="append",
+        default=[],
+        metavar="NAME=MS",
+        help="The measuring interval of a device, if it differs from --interval.",
+    )
+    run.add_argument(
+        "--trigger",
+        metavar="CHANNEL",
+        help="Only save the samples around the events of a trigger on this channel. Defaults to the run "
+        "configuration.",
+    )
+    run.add_argument("--trigger-mode", choices=[mode.value for mode in TriggerMode], help="The trigger condition.")
+    run.add_argument("--trigger-level", type=float, metavar="VALUE", help="The level of the trigger.")
+    run.add_argument("--trigger-upper", type=float, metavar="VALUE", help="The upper level of a window trigger.")
+    run.add_argument("--trigger-slope", choices=[slope.value for slope in Slope], help="The slope of the trigger.")
+    run.add_argument("--pre-samples", type=int, metavar="N", help="The samples to save before each event.")
+    run.add_argument("--post-samples", type=int, metavar="N", help="The samples to save after each event.")
+    bench = subparsers.add_parser(
+        "bench", help="Benchmark the acquisition pipeline with synthetic devices and report the results in JSON."
+    )
+    bench.add_argument(
+        "--intervals",
+        nargs="+",
+        type=float,
+        default=[10, 1, 0.1],
+        metavar="MS",
+        help="The measuring intervals of the scenarios.",
+    )
+    bench.add_argument(
+        "--channels",
+        nargs="+",
+        type=int,
+        default=[1, 16, 128],
+        metavar="N",
+        help="The channel counts of the scenarios.",
+    )
+    bench.add_argument("--duration", type=float, default=3.0, metavar="SEC", help="The duration of each scenario.")
+    bench.add_argument(
+        "--sinks", nargs="+", metavar="NAME", help="The file formats. Defaults to the run configuration."
+    )
+    bench.add_argument("--out", type=Path, help="The path of the JSON report. Defaults to the standard output.")
+    bench.add_argument("--baseline", type=Path, help="The JSON report of an earlier benchmark to compare with.")
+    bench.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        metavar="FRACTION",
+        help="The slowdown against the baseline that counts as a regression.",
+    )
+    return parser
+
+
+def _parse_assignments(parser: argparse.ArgumentParser, option: str, values: list[str]) -> dict[str, str]:
+    assignments = {}
+    for value in values:
+        name, separator, setting = value.partition("=")
+        if not separator:
+            parser.error(f"argument {option}: expected NAME=VALUE, got {value!r}")
+        assignments[name] = setting
+    return assignments
+
+
+def _load_plugins(settings: Configuration) -> dict[str, DeviceStatus]:
+    """Register the sinks and settings of the plugins and return their devices by name. Tabs are not loaded."""
+    device_statuses = {}
+    for plugin in get_plugins():
+        if not plugin.enable:
+            continue
+        for device_status in plugin.get_device_statuses(with_tabs=False):
+            device_statuses[device_status.name] = device_status
+        for sink in plugin.get_sinks():
+            register_sink(sink)
+        for conf in plugin.get_configurations():
+            settings.add_conf(conf, plugin.name)
+    return device_statuses
+
+
+def _create_measurer(
+    device_status: DeviceStatus, interval: str | None, event_loop: asyncio.AbstractEventLoop
+) -> tuple[Measurer, dict[str, str]]:
+    """Return the measurer of an opened device and the unit of each of its parameters.
+
+    The parameters are declared by the ``parameters`` property of the device in the plugin configuration. A device
+    without it is measured once to find them, and their units are unknown. An async device is measured on
+    ``event_loop``, the running loop the run polls it on.
+    """
+    device = device_status.device
+    if not hasattr(device, "measure"):
+        raise _CliError(f"{device_status.name} can not measure.")
+    units: dict[str, str] | None = device_status.device_properties.get("parameters")
+    if units is None:
+        measurements = device.measure()  # type: ignore
+        if inspect.isawaitable(measurements):
+            measurements = asyncio.run_coroutine_threadsafe(measurements, event_loop).result()
+        if isinstance(measurements, Block):
+            measurements = measurements.channels
+        units = dict.fromkeys(measurements, "")
+    measurer = Measurer(
+        device_status.name,
+        device.measure,  # type: ignore
+        list(units),
+        interval=None if interval is None else int(interval) / 1000,
+        streaming=isinstance(device, StreamingDevice),
+    )
+    return measurer, units
+
+
+def _create_trigger(
+    args: argparse.Namespace, parser: argparse.ArgumentParser, conf: RunConfiguration
+) -> Trigger | None:
+    """Return the trigger of the run configuration, with the options given on the command line."""
+    trigger_conf = dict(conf.get("trigger") or {})
+    if args.trigger is None and not trigger_conf.get("enabled"):
+        return None
+    options = {
+        "channel": args.trigger,
+        "mode": args.trigger_mode,
+        "level": args.trigger_level,
+        "upper": args.trigger_upper,
+        "slope": args.trigger_slope,
+        "preSamples": args.pre_samples,
+        "postSamples": args.post_samples,
+    }
+    trigger_conf.update({key: value for key, value in options.items() if value is not None})
+    try:
+        return Trigger.from_dict(trigger_conf)
+    except ValueError as e:
+        parser.error(f"argument --trigger: {e}")
+
+
+def _check_trigger(trigger: Trigger | None, units: dict[str, str]) -> None:
+    """Raise `_CliError` if the opened devices do not measure the channel of ``trigger``."""
+    if trigger is not None and trigger.channel not in units:
+        raise _CliError(f'The trigger channel "{trigger.channel}" is not measured.')
+
+
+def run(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    settings = Configuration()
+    conf = RunConfiguration()
+    ports = _parse_assignments(parser, "--port", args.port)
+    baudrates = _parse_assignments(parser, "--baudrate", args.baudrate)
+    device_intervals = _parse_assignments(parser, "--device-interval", args.device_interval)
+    if invalid_intervals := [interval for interval in device_intervals.values() if not interval.isdigit()]:
+        parser.error(f"argument --device-interval: invalid MS value: {invalid_intervals[0]!r}")
+
+    device_statuses = _load_plugins(settings)
+    if unknown_names := [name for name in args.devices if name not in device_statuses]:
+        parser.error(
+            f"unknown devices: {', '.join(unknown_names)} (available: {', '.join(device_statuses) or 'none'})"
+        )
+    if unknown_sinks := [name for name in args.sinks or [] if name not in get_sinks()]:
+        parser.error(f"unknown sinks: {', '.join(unknown_sinks)} (available: {', '.join(get_sinks())})")
+    trigger = _create_trigger(args, parser, conf)
+
+    for path in recover_runs():
+        _logger.warning(f"An interrupted run was recovered to {path}")
+
+    # The async devices are probed and polled on one loop, see `AsyncDevice`.
+    event_loop = asyncio.new_event_loop()
+    event_loop_thread = threading.Thread(target=event_loop.run_forever, name="pyautolab-asyncio", daemon=True)
+    event_loop_thread.start()
+    opened: list[DeviceStatus] = []
+    try:
+        measurers: list[Measurer] = []
+        units: dict[str, str] = {}
+        for name in args.devices:
+            device_status = device_statuses[name]
+            device_status.device.port = ports.get(name, device_status.device.port)
+            device_status.device.baudrate = baudrates.get(name, device_status.device.baudrate)
+            try:
+                device_status.device.open()
+            except Exception as e:
+                raise _CliError(f"Failed to open {name}: {e}") from e
+            device_status.is_connected = True
+            opened.append(device_status)
+            measurer, device_units = _create_measurer(device_status, device_intervals.get(name), event_loop)
+            measurers.append(measurer)
+            units.update(device_units)
+
+        _check_trigger(trigger, units)
+        sinks = get_active_sinks(args.sinks or conf.get("sinks"))
+        session = RunSession(
+            measurers,
+            units,
+            args.out,
+            settings,
+            (conf.get("measuringInterval") if args.interval is None else args.interval) / 1000,
+            sinks,
+            args.samples,
+            trigger=trigger,
+            event_loop=event_loop,
+        )
+        # Ctrl+C and a termination request stop the run as the stop button does.
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signal_number, lambda *_: session.stop_event.set())
+        start = time.monotonic()
+        session.start()
+        session.stop_event.wait(args.duration)
+        is_saved = session.stop()
+        elapsed = time.monotonic() - start
+        session.close()
+    except _CliError as e:
+        _logger.error(e)
+        return 1
+    finally:
+        for device_status in opened:
+            device_status.device.close()
+            device_status.is_connected = False
+        event_loop.call_soon_threadsafe(event_loop.stop)
+        event_loop_thread.join()
+        event_loop.close()
+
+    files = ", ".join(str(get_sink_path(args.out, sink)) for sink in sinks)
+    print(f"{session.number_of_samples} samples in {elapsed:.1f} s were saved to {files}")  # noqa: T201
+    return 0 if is_saved else 1
+
+
+def bench(args: argparse.Namespace, parser: argparse.ArgumentParser) -> int:
+    if unknown_sinks := [name for name in args.sinks or [] if name not in get_sinks()]:
+        parser.error(f"unknown sinks: {', '.join(unknown_sinks)} (available: {', '.join(get_sinks())})")
+    baseline = None
+    if args.baseline is not None:
+        try:
+            baseline = json.loads(args.baseline.read_text())
+        except (OSError, ValueError) as e:
+            parser.error(f"argument --baseline: {e}")
+
+    settings = Configuration()
+    sinks = get_active_sinks(args.sinks or RunConfiguration().get("sinks"))
+    scenarios = [
+        Scenario(interval / 1000, channels, args.duration) for interval in args.intervals for channels in args.channels
+    ]
+    # The progress goes to the standard error, so the report on the standard output stays valid JSON.
+    report = run_benchmark(
+        scenarios,
+        sinks,
+        settings,
+        on_result=lambda result: print(format_result(result), file=sys.stderr),  # noqa: T201
+    )
+    text = json.dumps(report, indent=4)
+    if args.out is None:
+        print(text)  # noqa: T201
+    else:
+        args.out.write_text(text)
+
+    if baseline is None:
+        return 0
+    regressions = find_regressions(report, baseline, args.tolerance)
+    for regression in regressions:
+        _logger.error(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = _create_parser()
+    args = parser.parse_args(argv)
+    if args.command == "bench":
+        return bench(args, parser)
+    return run(args, parser)
@@ -0,0 +1,9 @@
+from pyautolab.core.acquisition.block import Block
+from pyautolab.core.acquisition.engine import AcquisitionEngine
+from pyautolab.core.acquisition.frame import FrameBuilder, FrameSchema
+from pyautolab.core.acquisition.journal import JOURNAL_SUFFIX, JournalError, JournalReader, JournalTail, JournalWriter
+from pyautolab.core.acquisition.poller import MISSING, DevicePoller, Measurer
+from pyautolab.core.acquisition.profiler import Histogram, Profiler, Stage
+from pyautolab.core.acquisition.ring_buffer import ConsumerPolicy, ConsumerStats, RingReader, SharedRingBuffer
+from pyautolab.core.acquisition.scheduler import DeadlineScheduler, OverrunPolicy, SchedulerStats, Tick
+from pyautolab.core.acquisition.trigger import Slope, Trigger, TriggeredCapture, TriggerMode
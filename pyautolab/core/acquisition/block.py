@@ -0,0 +1,56 @@
+"""
+pyautolab sample blocks of streaming devices
+This file only deals with non-GUI measurement features
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE, FrameSchema
+
+
+@dataclass(frozen=True, eq=False)
+class Block:
+    """The samples a streaming device measured since its previous block, e.g. the buffer of a DAQ or a scope trace.
+
+    A streaming device returns a block from ``measure`` instead of a dict of scalars. Every channel is a 1-D array of
+    the same length, and the times of the samples are given by exactly one of ``sample_rate`` and ``times``. The
+    runner places the samples on the time axis of the run and carries them as arrays to the storage and the plots.
+
+    Parameters
+    ----------
+    channels : dict[str, np.ndarray]
+        The samples of each parameter.
+    sample_rate : float | None, default None
+        Unit is hertz. The samples are evenly spaced at this rate and continue the previous block of the device.
+    times : np.ndarray | None, default None
+        Unit is second. The time of each sample on the clock of the device, e.g. its hardware timestamps.
+    """
+
+    channels: dict[str, np.ndarray]
+    sample_rate: float | None = None
+    times: np.ndarray | None = None
+
+    def __post_init__(self) -> None:
+        if (self.sample_rate is None) == (self.times is None):
+            raise ValueError("A block needs exactly one of sample_rate and times.")
+        lengths = {len(samples) for samples in self.channels.values()}
+        if self.times is not None:
+            lengths.add(len(self.times))
+        if len(lengths) > 1:
+            raise ValueError(f"The channels and times of a block have different lengths: {sorted(lengths)}.")
+
+    def __len__(self) -> int:
+        if self.times is not None:
+            return len(self.times)
+        return len(next(iter(self.channels.values()), ()))
+
+    def to_frame(self, schema: FrameSchema) -> np.ndarray:
+        """Return the samples as a frame of ``schema``, with ``times`` in the time column. Parameters that are not in
+        the schema are ignored and the other parameters are NaN."""
+        frame = schema.empty(len(self))
+        frame[:, 0] = self.times if self.times is not None else np.arange(len(self), dtype=DTYPE) / self.sample_rate
+        for parameter, samples in self.channels.items():
+            if parameter in schema.columns:
+                frame[:, schema.index(parameter)] = samples
+        return frame
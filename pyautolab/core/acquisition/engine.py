@@ -0,0 +1,264 @@
+"""
+pyautolab acquisition engine
+This file only deals with non-GUI measurement features
+"""
+import heapq
+import math
+import threading
+import time
+from collections import deque
+from time import perf_counter_ns
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import FrameBuilder, FrameSchema
+from pyautolab.core.acquisition.journal import JournalWriter
+from pyautolab.core.acquisition.poller import DevicePoller
+from pyautolab.core.acquisition.profiler import Profiler, Stage
+from pyautolab.core.acquisition.ring_buffer import SharedRingBuffer
+from pyautolab.core.acquisition.scheduler import DeadlineScheduler, OverrunPolicy, SchedulerStats
+from pyautolab.core.utils.system import create_logger
+
+_logger = create_logger("pyautolab.acquisition")
+
+
+class _RateGroup:
+    """The devices that share a sampling interval, polled on their own thread and scheduler."""
+
+    def __init__(self, poller: DevicePoller, interval: float, overrun_policy: OverrunPolicy) -> None:
+        self.poller = poller
+        self.scheduler = DeadlineScheduler(round(interval * 1e9), overrun_policy)
+        self.watermark = 0.0
+        """Unit is second. No sample of this group that is not pending yet is older than this."""
+        self.thread: threading.Thread | None = None
+
+
+class AcquisitionEngine:
+    """Run the measure loop on dedicated threads with their own schedulers.
+
+    The engine never touches the GUI. Samples are gathered into frames of ``schema`` and every frame is written once
+    to a shared ring buffer that the consumers read, so repaints, plot updates and dialogs on the Qt event loop no
+    longer delay or drop ticks. Ticks fire on absolute deadlines of a `DeadlineScheduler` and each sample is stamped
+    with the time its tick actually fired.
+
+    The time column and the device timestamps of `DevicePoller` are relative to the start of the run, whose wall clock
+    time is `epoch_ns`.
+
+    Devices with their own `Measurer.interval` are sampled at their own rate: the measurers of each interval are
+    polled on their own thread, and all schedulers share the same start time. A sample holds the parameters of the
+    devices of one tick, so each parameter carries its own timestamps in the time column and is NaN in the rows of
+    the other devices. The samples of all threads are merged in time order before they are sent. Frames are sent
+    outside the lock of the merge, so a blocking consumer or a slow journal only holds up the thread that sends them,
+    and the devices of the other intervals keep their rates.
+
+    The blocks of streaming devices are sent as frames of their own, in time order with the other samples, so their
+    arrays are never unpacked sample by sample. Their rows hold the times of the block samples and are NaN for the
+    parameters of the other devices.
+
+    Parameters
+    ----------
+    poller : DevicePoller
+        The devices to measure every tick.
+    schema : FrameSchema
+        The column order of the frames. The first column is the time.
+    interval : float
+        Unit is second. The measuring interval of the devices that have no interval of their own.
+    buffer : SharedRingBuffer
+        The ring buffer to write the frames to.
+    overrun_policy : OverrunPolicy, default OverrunPolicy.SKIP
+        How to handle ticks that passed while the devices were still measuring.
+    frame_size : int, default 100
+        The maximum number of samples in a frame.
+    frame_latency : float, default 0.05
+        Unit is second. The maximum time a sample waits in the engine before its frame is sent.
+    journal : JournalWriter | None, default None
+        The journal every frame is appended to before it is written to the buffer.
+    max_samples : int | None, default None
+        Stop the run after exactly this many samples. If None, the run continues until `stop` is called.
+    profiler : Profiler | None, default None
+        The profiler to record the time the engine builds, journals and writes frames to. The devices record to the
+        profiler of ``poller``.
+    """
+
+    def __init__(
+        self,
+        poller: DevicePoller,
+        schema: FrameSchema,
+        interval: float,
+        buffer: SharedRingBuffer,
+        overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+        frame_size: int = 100,
+        frame_latency: float = 0.05,
+        journal: JournalWriter | None = None,
+        max_samples: int | None = None,
+        profiler: Profiler | None = None,
+    ) -> None:
+        self._groups = [
+            _RateGroup(group_poller, group_interval, overrun_policy)
+            for group_interval, group_poller in poller.split(interval).items()
+        ]
+        self._buffer = buffer
+        self._journal = journal
+        # A frame never waits for a tick that comes after its latency deadline.
+        fastest_interval = self._groups[0].scheduler.interval_ns / 1e9
+        frame_size = min(frame_size, max(1, int(frame_latency / fastest_interval)))
+        self._frame_builder = FrameBuilder(schema, frame_size, frame_latency)
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._outbox: deque[np.ndarray] = deque()
+        """The frames to send, in order. Filled with ``_lock`` held and emptied with ``_publish_lock`` held."""
+        self._pending: list[tuple[float, int, dict[str, float] | np.ndarray]] = []
+        self._parameters = set(schema.columns[1:])
+        self._sequence = 0
+        self._running = 0
+        self._max_samples = max_samples
+        self._profiler = profiler
+        self.number_of_samples = 0
+        """The number of samples sent so far."""
+        self.schema = schema
+        self.epoch_ns = 0
+        """The wall clock time of the start of the run in nanoseconds since the epoch. Set when the engine starts."""
+        self.start_ns = 0
+        """The `time.perf_counter_ns` time of the start of the run, which the time column is relative to."""
+        self.stop_event = threading.Event()
+
+    @property
+    def intervals(self) -> list[float]:
+        """Unit is second. The sampling intervals of the devices, fastest first."""
+        return [group.scheduler.interval_ns / 1e9 for group in self._groups]
+
+    @property
+    def stats(self) -> SchedulerStats:
+        """The live jitter and overrun statistics of the scheduler of the fastest devices."""
+        return self._groups[0].scheduler.stats
+
+    @property
+    def group_stats(self) -> list[SchedulerStats]:
+        """The live jitter and overrun statistics of the scheduler of each sampling interval, fastest first."""
+        return [group.scheduler.stats for group in self._groups]
+
+    @property
+    def is_running(self) -> bool:
+        return any(group.thread is not None and group.thread.is_alive() for group in self._groups)
+
+    def start(self) -> None:
+        # The wall clock anchors the monotonic times of the run, which are relative to its start.
+        self.epoch_ns, self.start_ns = time.time_ns(), perf_counter_ns()
+        start_ns = self.start_ns
+        if self._journal is not None:
+            self._journal.update_metadata({"epochNs": self.epoch_ns})
+        self._running = len(self._groups)
+        for i, group in enumerate(self._groups):
+            group.poller.origin_ns = start_ns
+            group.scheduler.start(start_ns)
+            name = "pyautolab-acquisition" if i == 0 else f"pyautolab-acquisition-{i}"
+            group.thread = threading.Thread(target=self._run, args=(group,), name=name, daemon=True)
+            group.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        for group in self._groups:
+            if group.thread is not None and group.thread.is_alive() and group.thread is not threading.current_thread():
+                group.thread.join()
+
+    def _publish(self, frame: np.ndarray) -> None:
+        # The clock is only read while the stages are profiled, which keeps the publishing path lean otherwise.
+        if self._journal is not None:
+            start_ns = perf_counter_ns() if self._profiler is not None else 0
+            try:
+                self._journal.append(frame)
+            except OSError:
+                _logger.exception("The journal is disabled because it could not be written.")
+                self._journal = None
+            if self._profiler is not None:
+                self._profiler.record(Stage.JOURNAL, "engine", perf_counter_ns() - start_ns)
+        start_ns = perf_counter_ns() if self._profiler is not None else 0
+        self._buffer.write(frame)
+        if self._profiler is not None:
+            self._profiler.record(Stage.BUFFER, "engine", perf_counter_ns() - start_ns)
+
+    def _send(self, wait: bool = False) -> None:
+        """Publish the frames of the outbox in order. Call this without the lock held. If another thread is publishing,
+        it sends the frames too, so this only waits for it if ``wait`` is True."""
+        while self._outbox and self._publish_lock.acquire(blocking=wait):
+            try:
+                while self._outbox:
+                    self._publish(self._outbox.popleft())
+            finally:
+                self._publish_lock.release()
+
+    def _release(self) -> None:
+        """Move the pending samples that no thread can precede anymore to the outbox. Call this with the lock held."""
+        watermark = min(group.watermark for group in self._groups)
+        while self._pending and self._pending[0][0] <= watermark:
+            _, sequence, sample = heapq.heappop(self._pending)
+            if self._max_samples is not None and self.number_of_samples >= self._max_samples:
+                # Samples measured after the last one of a finite run are dropped.
+                continue
+            if isinstance(sample, np.ndarray):
+                # The samples of a block after the watermark or the next pending sample wait, so the rows stay in
+                # time order.
+                limit = min(watermark, self._pending[0][0]) if self._pending else watermark
+                split = max(1, int(np.searchsorted(sample[:, 0], limit, "right")))
+                if split < len(sample):
+                    heapq.heappush(self._pending, (sample[split, 0], sequence, sample[split:]))
+                self._release_block(sample[:split])
+            else:
+                self.number_of_samples += 1
+                start_ns = perf_counter_ns() if self._profiler is not None else 0
+                frame = self._frame_builder.append(sample)
+                if self._profiler is not None:
+                    self._profiler.record(Stage.FRAME, "samples", perf_counter_ns() - start_ns)
+                if frame is not None:
+                    self._outbox.append(frame)
+            if self.number_of_samples == self._max_samples:
+                self.stop_event.set()
+
+    def _release_block(self, block: np.ndarray) -> None:
+        if self._max_samples is not None:
+            block = block[: self._max_samples - self.number_of_samples]
+        # The samples gathered before the block are sent first.
+        if (frame := self._frame_builder.flush()) is not None:
+            self._outbox.append(frame)
+        # A chunk never exceeds the buffer, so blocking consumers can keep up with a long block.
+        for start in range(0, len(block), self._buffer.capacity):
+            self._outbox.append(block[start : start + self._buffer.capacity])
+        self.number_of_samples += len(block)
+
+    def _run(self, group: _RateGroup) -> None:
+        time_column = self.schema.columns[0]
+        while (tick := group.scheduler.wait(self.stop_event)) is not None:
+            measurements = {time_column: tick.elapsed}
+            try:
+                measurements.update(group.poller.poll())
+            except Exception:
+                _logger.exception("Measurement stopped because a device raised an exception.")
+                self.stop_event.set()
+                break
+            blocks = [block for block in group.poller.take_blocks() if len(block)]
+            with self._lock:
+                # A tick of streaming devices only has a row if it measured a parameter besides the blocks.
+                if not blocks or not self._parameters.isdisjoint(measurements):
+                    heapq.heappush(self._pending, (tick.elapsed, self._sequence, measurements))
+                    self._sequence += 1
+                for block in blocks:
+                    start_ns = perf_counter_ns() if self._profiler is not None else 0
+                    frame = block.to_frame(self.schema)
+                    if self._profiler is not None:
+                        self._profiler.record(Stage.FRAME, "blocks", perf_counter_ns() - start_ns)
+                    heapq.heappush(self._pending, (block.times[0], self._sequence, frame))
+                    self._sequence += 1
+                # The next tick of this group fires at its next deadline or later, and its blocks continue the streams.
+                group.watermark = min(
+                    (group.scheduler.next_deadline_ns - group.scheduler.start_ns) / 1e9, group.poller.stream_watermark
+                )
+                self._release()
+            self._send()
+        with self._lock:
+            group.watermark = math.inf
+            self._release()
+            self._running -= 1
+            if self._running == 0 and (frame := self._frame_builder.flush()) is not None:
+                self._outbox.append(frame)
+        # Every frame is sent before the last thread ends.
+        self._send(wait=True)
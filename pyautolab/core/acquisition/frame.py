@@ -0,0 +1,88 @@
+"""
+pyautolab columnar sample frames
+This file only deals with non-GUI measurement features
+"""
+import math
+from dataclasses import dataclass
+from time import perf_counter
+
+import numpy as np
+
+DTYPE = np.float64
+
+
+@dataclass(frozen=True)
+class FrameSchema:
+    """The column order of frames, agreed once at the start of a run.
+
+    A frame is a C-contiguous 2-D float64 array. Each row is a sample and each column is a parameter of ``columns``.
+    Because every party knows the schema, frames are shared as raw rows without pickling.
+    """
+
+    columns: tuple[str, ...]
+    units: tuple[str, ...]
+
+    @classmethod
+    def from_descriptions(cls, data_descriptions: dict[str, str]) -> "FrameSchema":
+        return cls(tuple(data_descriptions), tuple(data_descriptions.values()))
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def index(self, column: str) -> int:
+        return self.columns.index(column)
+
+    def empty(self, rows: int) -> np.ndarray:
+        return np.full((rows, len(self.columns)), math.nan, dtype=DTYPE)
+
+
+class FrameBuilder:
+    """Gather samples into frames of a `FrameSchema`.
+
+    A frame is complete when it holds ``max_samples`` samples or its oldest sample is ``max_latency`` seconds old.
+    Parameters that a sample does not contain are NaN, and parameters that are not in the schema are ignored.
+
+    Parameters
+    ----------
+    schema : FrameSchema
+        The column order of the frames.
+    max_samples : int
+        The maximum number of samples in one frame.
+    max_latency : float
+        Unit is second. The maximum age of the oldest sample in a frame before it is flushed.
+    """
+
+    def __init__(self, schema: FrameSchema, max_samples: int, max_latency: float) -> None:
+        self.schema = schema
+        self.max_samples = max(1, max_samples)
+        self.max_latency = max_latency
+        self._indexes = {column: i for i, column in enumerate(schema.columns)}
+        self._buffer = schema.empty(self.max_samples)
+        self._count = 0
+        self._first_sample_time = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, sample: dict[str, float]) -> np.ndarray | None:
+        """Append a sample and return the frame if it is complete."""
+        now = perf_counter()
+        if self._count == 0:
+            self._first_sample_time = now
+        row = self._buffer[self._count]
+        for column, value in sample.items():
+            if (i := self._indexes.get(column)) is not None:
+                row[i] = value
+        self._count += 1
+        if self._count >= self.max_samples or now - self._first_sample_time >= self.max_latency:
+            return self.flush()
+        return None
+
+    def flush(self) -> np.ndarray | None:
+        """Return the samples gathered so far as a frame, or None if there are none."""
+        if self._count == 0:
+            return None
+        frame = self._buffer[: self._count]
+        self._buffer = self.schema.empty(self.max_samples)
+        self._count = 0
+        return frame
@@ -0,0 +1,237 @@
+"""
+pyautolab acquisition journal
+This file only deals with non-GUI measurement features
+
+A journal is an append-only file of records. The acquisition engine appends every frame to it before any consumer
+sees the frame, so a run can be rebuilt from its journal when the process dies before the files are written::
+
+    header : magic (8 bytes) | version (uint32)
+    record : kind (uint8) | padding (3 bytes) | payload size (uint32) | CRC-32 of the payload (uint32) | payload
+
+The first record is the JSON metadata of the run and the following records are frames of float64 rows, or metadata
+that is known only after the run started and updates the first one. A torn or corrupted record marks the end of the
+journal.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import abc
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE, FrameSchema
+
+_MAGIC = b"PYALJRN\x00"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<8sI")
+_RECORD = struct.Struct("<B3xII")
+_METADATA = 0
+_FRAME = 1
+
+JOURNAL_SUFFIX = ".aljournal"
+
+
+class JournalError(Exception):
+    """This error raise when a file is not a journal or has an unsupported version."""
+
+
+class JournalWriter:
+    """Append frames to a journal.
+
+    Each frame is written with one system call, so it reaches the OS as soon as it is appended. A background thread
+    fsyncs the journal at most once every ``sync_interval`` seconds, which bounds both the cost of the journal and
+    the data a power loss can destroy.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the journal. An existing file is overwritten.
+    schema : FrameSchema
+        The columns of the run.
+    metadata : dict[str, Any] | None, default None
+        Additional metadata of the run, used to rebuild it.
+    sync_interval : float, default 1.0
+        Unit is second. The minimum time between two fsyncs. If 0, the journal is never fsynced during the run.
+    """
+
+    def __init__(
+        self, path: Path, schema: FrameSchema, metadata: dict[str, Any] | None = None, sync_interval: float = 1.0
+    ) -> None:
+        self.path = path
+        self.schema = schema
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        self._sync_interval = sync_interval
+        self._is_dirty = False
+        self._closed = threading.Event()
+        self._sync_thread = threading.Thread(target=self._sync, name="pyautolab-journal", daemon=True)
+
+        header = {
+            "columns": [{"name": name, "unit": unit} for name, unit in zip(schema.columns, schema.units)],
+            **(metadata or {}),
+        }
+        self._write(_PREAMBLE.pack(_MAGIC, _VERSION))
+        self._append(_METADATA, json.dumps(header).encode("utf-8"))
+        os.fsync(self._fd)
+
+    def start(self) -> None:
+        """Start fsyncing in the background."""
+        if self._sync_interval > 0:
+            self._sync_thread.start()
+
+    def _write(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view) :]
+
+    def _append(self, kind: int, payload: bytes) -> None:
+        self._write(_RECORD.pack(kind, len(payload), zlib.crc32(payload)) + payload)
+        self._is_dirty = True
+
+    def append(self, frame: np.ndarray) -> None:
+        self._append(_FRAME, np.ascontiguousarray(frame, DTYPE).tobytes())
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        """Append ``metadata`` that updates the metadata of the run."""
+        self._append(_METADATA, json.dumps(metadata).encode("utf-8"))
+
+    def _sync(self) -> None:
+        while not self._closed.wait(self._sync_interval):
+            if self._is_dirty:
+                self._is_dirty = False
+                os.fsync(self._fd)
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._sync_thread.is_alive():
+            self._sync_thread.join()
+        os.fsync(self._fd)
+        os.close(self._fd)
+
+    def discard(self) -> None:
+        """Close and delete the journal after the run was saved."""
+        self._closed.set()
+        if self._sync_thread.is_alive():
+            self._sync_thread.join()
+        os.close(self._fd)
+        self.path.unlink(missing_ok=True)
+
+
+class JournalReader:
+    """Read a journal, which may end with a torn record. The journal is memory mapped and read frame by frame.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the journal.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            if path.stat().st_size < _PREAMBLE.size:
+                raise JournalError(f"{path} is not a journal.")
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = _PREAMBLE.unpack_from(self._data)
+        if magic != _MAGIC or version > _VERSION:
+            self.close()
+            raise JournalError(f"{path} is not a journal or has an unsupported version {version}.")
+        if (metadata := next(self._records(), None)) is None or metadata[0] != _METADATA:
+            self.close()
+            raise JournalError(f"{path} has no metadata.")
+        self.metadata: dict[str, Any] = json.loads(metadata[1])
+        self.columns: tuple[str, ...] = tuple(column["name"] for column in self.metadata["columns"])
+        self.units: tuple[str, ...] = tuple(column["unit"] for column in self.metadata["columns"])
+        self.schema = FrameSchema(self.columns, self.units)
+        self.is_torn = False
+        """Whether the journal ends with a torn or corrupted record. Set after the frames are read."""
+
+    def _records(self) -> abc.Iterator[tuple[int, bytes]]:
+        offset = _PREAMBLE.size
+        while offset + _RECORD.size <= len(self._data):
+            kind, size, checksum = _RECORD.unpack_from(self._data, offset)
+            payload = self._data[offset + _RECORD.size : offset + _RECORD.size + size]
+            if len(payload) < size or zlib.crc32(payload) != checksum:
+                self.is_torn = True
+                return
+            yield kind, payload
+            offset += _RECORD.size + size
+        self.is_torn = offset != len(self._data)
+
+    def frames(self) -> abc.Iterator[np.ndarray]:
+        """Yield the frames of the journal. Metadata records between them update `metadata`."""
+        columns = len(self.schema)
+        records = self._records()
+        # The metadata record was read when the journal was opened.
+        next(records)
+        for kind, payload in records:
+            if kind == _FRAME:
+                yield np.frombuffer(payload, DTYPE).reshape(-1, columns)
+            elif kind == _METADATA:
+                self.metadata.update(json.loads(payload))
+
+    def read(self) -> np.ndarray:
+        """Return every intact row of the journal."""
+        frames = list(self.frames())
+        return np.concatenate(frames) if frames else self.schema.empty(0)
+
+    def close(self) -> None:
+        self._data.close()
+
+
+class JournalTail:
+    """Read rows of a journal that is still being written, by their index in the run.
+
+    Rows are requested in increasing order, e.g. by a consumer that lost them from the ring buffer and recovers them
+    from the journal, so the journal is scanned once from its start and records before the requested rows are
+    skipped without reading their payload.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the journal.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._file = path.open("rb")
+        magic, version = _PREAMBLE.unpack(self._file.read(_PREAMBLE.size))
+        kind, size, _ = _RECORD.unpack(self._file.read(_RECORD.size))
+        if magic != _MAGIC or version > _VERSION or kind != _METADATA:
+            self._file.close()
+            raise JournalError(f"{path} is not a journal or has an unsupported version {version}.")
+        metadata = json.loads(self._file.read(size))
+        self._row_size = len(metadata["columns"]) * np.dtype(DTYPE).itemsize
+        self._columns = len(metadata["columns"])
+        self._offset = self._file.tell()
+        self._row = 0
+
+    def read_rows(self, start: int, stop: int) -> np.ndarray:
+        """Return the rows ``[start, stop)`` of the run that are already in the journal."""
+        blocks = []
+        while self._row < stop:
+            self._file.seek(self._offset)
+            record = self._file.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                break
+            kind, size, checksum = _RECORD.unpack(record)
+            rows = size // self._row_size if kind == _FRAME else 0
+            if self._row + rows > start:
+                payload = self._file.read(size)
+                if len(payload) < size or zlib.crc32(payload) != checksum:
+                    break
+                frame = np.frombuffer(payload, DTYPE).reshape(-1, self._columns)
+                blocks.append(frame[max(0, start - self._row) : stop - self._row])
+                if self._row + rows > stop:
+                    # The rest of this record is read by the next request.
+                    break
+            self._offset += _RECORD.size + size
+            self._row += rows
+        return np.concatenate(blocks) if blocks else np.empty((0, self._columns), dtype=DTYPE)
+
+    def close(self) -> None:
+        self._file.close()
@@ -0,0 +1,308 @@
+"""
+pyautolab device polling
+This file only deals with non-GUI measurement features
+"""
+
+import asyncio
+import inspect
+import math
+import threading
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import perf_counter, perf_counter_ns
+
+import numpy as np
+
+from pyautolab.core.acquisition.block import Block
+from pyautolab.core.acquisition.profiler import Profiler, Stage
+
+MISSING = math.nan
+
+
+@dataclass(eq=False)
+class Measurer:
+    """A device measure function and the parameters it is expected to return.
+
+    Parameters
+    ----------
+    name : str
+        The name of the device. Used for the worker thread name and error messages.
+    measure : Callable[[], dict[str, float]] | Callable[[], Awaitable[dict[str, float]]]
+        The blocking measure function of the device, or the coroutine function of an `AsyncDevice`.
+    parameters : list[str]
+        The parameter names ``measure`` returns. A late device records ``MISSING`` for each of them.
+    timeout : float | None, default None
+        Unit is second. The deadline of this device measured from the start of the tick. If None, the poller's
+        default timeout is used.
+    interval : float | None, default None
+        Unit is second. The sampling interval of this device. If None, the interval of the engine is used.
+    streaming : bool, default False
+        Whether ``measure`` returns a `Block` of samples instead of a dict of scalars.
+    """
+
+    name: str
+    measure: Callable[[], dict[str, float]] | Callable[[], Awaitable[dict[str, float]]]
+    parameters: list[str]
+    timeout: float | None = None
+    interval: float | None = None
+    streaming: bool = False
+    missed: int = 0
+    _future: Future | asyncio.Future | None = field(default=None, repr=False)
+    _stream_offset: float | None = field(default=None, repr=False)
+    _stream_samples: int = field(default=0, repr=False)
+    _stream_end: float | None = field(default=None, repr=False)
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.measure)
+
+    @property
+    def timestamp_columns(self) -> tuple[str, str]:
+        """The parameters of the times just before and just after ``measure`` returned."""
+        return f"{self.name} Start", f"{self.name} End"
+
+
+class DevicePoller:
+    """Poll every measurer once per tick and merge the results into one sample.
+
+    In sequential mode, measurers are called one after another on the calling thread, so the tick time is the sum of
+    all devices. In concurrent mode, all measurers start on a thread pool at the same time and each one has its own
+    deadline, so the tick time is the slowest device. In asynchronous mode, all measurers start on one asyncio event
+    loop with the same deadlines: coroutine measurers wait for their I/O concurrently on the thread of the loop and
+    blocking ones run on a thread pool. A device that misses its deadline, or is still busy with a previous tick,
+    records ``MISSING`` for its parameters.
+
+    Every measurement of a device that is not streaming also holds the integer nanosecond times of a monotonic clock,
+    relative to ``origin_ns``, just before and just after the device measured, as the `Measurer.timestamp_columns`
+    parameters.
+
+    The blocks of streaming devices are not part of the measurements. They are placed on the time axis of the run and
+    returned by `take_blocks`. The samples keep the spacing of the device clock, so the stream does not jitter with the
+    polling. The last sample of the first block of a device is taken to be measured when the device returned, which
+    aligns the clock of the device to the run. The samples a device buffered before ``origin_ns`` are dropped.
+
+    Parameters
+    ----------
+    measurers : list[Measurer]
+        Devices to poll.
+    concurrent : bool, default False
+        Whether to poll the devices concurrently.
+    timeout : float | None, default None
+        Unit is second. The default per-device deadline in concurrent and asynchronous mode. None means no deadline.
+    asynchronous : bool, default False
+        Whether to poll the devices on an asyncio event loop. Always True if a measurer is a coroutine function.
+    event_loop : asyncio.AbstractEventLoop | None, default None
+        The running event loop of asynchronous mode. If None, the poller runs its own loop on a dedicated thread.
+    profiler : Profiler | None, default None
+        The profiler to record the time each device measures to, as the `Stage.MEASURE` stage of the device.
+    """
+
+    def __init__(
+        self,
+        measurers: list[Measurer],
+        concurrent: bool = False,
+        timeout: float | None = None,
+        asynchronous: bool = False,
+        event_loop: asyncio.AbstractEventLoop | None = None,
+        profiler: Profiler | None = None,
+    ) -> None:
+        self.measurers = measurers
+        self._profiler = profiler
+        self._asynchronous = len(measurers) > 0 and (asynchronous or any(measurer.is_async for measurer in measurers))
+        self._concurrent = (concurrent and len(measurers) > 0) or self._asynchronous
+        self._timeout = timeout
+        self._children: list[DevicePoller] = []
+        self._blocks: deque[Block] = deque()
+        self.origin_ns = 0
+        """The `time.perf_counter_ns` time the timestamps are relative to, usually the start of the run."""
+        blocking_measurers = [measurer for measurer in measurers if not measurer.is_async]
+        self._executor = (
+            ThreadPoolExecutor(max_workers=len(blocking_measurers), thread_name_prefix="pyautolab-measure")
+            if self._concurrent and blocking_measurers
+            else None
+        )
+        self._event_loop = event_loop
+        self._event_loop_thread: threading.Thread | None = None
+        if self._asynchronous and event_loop is None:
+            self._event_loop = asyncio.new_event_loop()
+            self._event_loop_thread = threading.Thread(
+                target=self._event_loop.run_forever, name="pyautolab-asyncio", daemon=True
+            )
+            self._event_loop_thread.start()
+
+    @property
+    def is_concurrent(self) -> bool:
+        return self._concurrent
+
+    @property
+    def is_asynchronous(self) -> bool:
+        return self._asynchronous
+
+    def poll(self) -> dict[str, float]:
+        if self._event_loop is not None and self._asynchronous:
+            return asyncio.run_coroutine_threadsafe(self._poll_asynchronously(), self._event_loop).result()
+        if self._executor is None:
+            measurements: dict[str, float] = {}
+            for measurer in self.measurers:
+                measurements.update(self._measure(measurer))
+            return measurements
+        return self._poll_concurrently(self._executor)
+
+    def _poll_concurrently(self, executor: ThreadPoolExecutor) -> dict[str, float]:
+        tick_start = perf_counter()
+        started: list[Measurer] = []
+        measurements: dict[str, float] = {}
+        for measurer in self.measurers:
+            # A device still busy with a previous tick must not be called again, the port is not reentrant.
+            if measurer._future is not None and not measurer._future.done():
+                measurements.update(self._missing(measurer))
+                continue
+            measurer._future = executor.submit(self._measure, measurer)
+            started.append(measurer)
+
+        for measurer in sorted(started, key=self._get_timeout):
+            future = measurer._future
+            assert future is not None
+            timeout = self._get_timeout(measurer)
+            remaining = None if timeout == math.inf else max(0.0, tick_start + timeout - perf_counter())
+            try:
+                measurements.update(future.result(timeout=remaining))
+            except TimeoutError:
+                measurements.update(self._missing(measurer))
+        return measurements
+
+    async def _poll_asynchronously(self) -> dict[str, float]:
+        loop = asyncio.get_running_loop()
+        tick_start = loop.time()
+        started: list[Measurer] = []
+        measurements: dict[str, float] = {}
+        for measurer in self.measurers:
+            if measurer._future is not None and not measurer._future.done():
+                measurements.update(self._missing(measurer))
+                continue
+            if measurer.is_async:
+                measurer._future = loop.create_task(self._measure_asynchronously(measurer))
+            else:
+                # Blocking devices are adapted through the thread pool, so they do not block the loop.
+                measurer._future = loop.run_in_executor(self._executor, self._measure, measurer)
+            started.append(measurer)
+
+        for measurer in sorted(started, key=self._get_timeout):
+            future = measurer._future
+            assert isinstance(future, asyncio.Future)
+            timeout = self._get_timeout(measurer)
+            remaining = None if timeout == math.inf else max(0.0, tick_start + timeout - loop.time())
+            done, _ = await asyncio.wait({future}, timeout=remaining)
+            measurements.update(future.result() if done else self._missing(measurer))
+        return measurements
+
+    def _measure(self, measurer: Measurer) -> dict[str, float]:
+        start_ns = perf_counter_ns()
+        measurements = measurer.measure()
+        end_ns = perf_counter_ns()
+        return self._stamp(measurer, measurements, start_ns, end_ns)  # type: ignore
+
+    async def _measure_asynchronously(self, measurer: Measurer) -> dict[str, float]:
+        start_ns = perf_counter_ns()
+        measurements = await measurer.measure()  # type: ignore
+        end_ns = perf_counter_ns()
+        return self._stamp(measurer, measurements, start_ns, end_ns)
+
+    def _stamp(
+        self, measurer: Measurer, measurements: dict[str, float] | Block, start_ns: int, end_ns: int
+    ) -> dict[str, float]:
+        if self._profiler is not None:
+            self._profiler.record(Stage.MEASURE, measurer.name, end_ns - start_ns)
+        if isinstance(measurements, Block):
+            # A block that arrives after the deadline of its tick is kept, its samples have their own times.
+            self._blocks.append(self._place(measurer, measurements, end_ns))
+            return {}
+        start_column, end_column = measurer.timestamp_columns
+        return {**measurements, start_column: start_ns - self.origin_ns, end_column: end_ns - self.origin_ns}
+
+    def _place(self, measurer: Measurer, block: Block, end_ns: int) -> Block:
+        """Return ``block`` with the times of its samples in seconds since ``origin_ns``, without the samples before
+        it."""
+        if block.times is not None:
+            times = np.asarray(block.times, dtype=np.float64)
+        else:
+            times = (measurer._stream_samples + np.arange(len(block), dtype=np.float64)) / block.sample_rate
+            measurer._stream_samples += len(block)
+        if len(block) == 0:
+            return Block(block.channels, times=times)
+        if measurer._stream_offset is None:
+            measurer._stream_offset = (end_ns - self.origin_ns) / 1e9 - times[-1]
+        times = times + measurer._stream_offset
+        measurer._stream_end = times[-1]
+        if times[0] < 0:
+            kept = times >= 0
+            channels = {parameter: np.asarray(samples)[kept] for parameter, samples in block.channels.items()}
+            return Block(channels, times=times[kept])
+        return Block(block.channels, times=times)
+
+    @property
+    def stream_watermark(self) -> float:
+        """Unit is second. The blocks the streaming devices return later hold no sample older than this, as each
+        stream continues after its last sample."""
+        return min(
+            (measurer._stream_end for measurer in self.measurers if measurer._stream_end is not None), default=math.inf
+        )
+
+    def take_blocks(self) -> list[Block]:
+        """Return the blocks of the streaming devices measured since the previous call, with the times of the run."""
+        blocks = []
+        while self._blocks:
+            blocks.append(self._blocks.popleft())
+        return blocks
+
+    def _get_timeout(self, measurer: Measurer) -> float:
+        timeout = self._timeout if measurer.timeout is None else measurer.timeout
+        return math.inf if timeout is None else timeout
+
+    @staticmethod
+    def _missing(measurer: Measurer) -> dict[str, float]:
+        measurer.missed += 1
+        if measurer.streaming:
+            # The samples of a late block are not lost, they come with the block.
+            return {}
+        return {parameter: MISSING for parameter in measurer.parameters}
+
+    def split(self, interval: float) -> dict[float, "DevicePoller"]:
+        """Return a poller for each sampling interval of the measurers, with the settings of this poller.
+
+        Measurers without an interval are sampled every ``interval`` seconds. If every measurer has the same interval,
+        this poller is returned. Otherwise the new pollers are closed with this one. In asynchronous mode, they share
+        the event loop of this poller.
+        """
+        groups: dict[float, list[Measurer]] = {}
+        for measurer in self.measurers:
+            groups.setdefault(interval if measurer.interval is None else measurer.interval, []).append(measurer)
+        if len(groups) <= 1:
+            return {next(iter(groups), interval): self}
+        pollers = {
+            group_interval: DevicePoller(
+                measurers, self._concurrent, self._timeout, self._asynchronous, self._event_loop, self._profiler
+            )
+            for group_interval, measurers in sorted(groups.items())
+        }
+        self._children.extend(pollers.values())
+        return pollers
+
+    def close(self) -> None:
+        for poller in self._children:
+            poller.close()
+        if self._event_loop_thread is not None:
+            assert self._event_loop is not None
+            # Devices still busy with a late tick finish their I/O as the thread pool does.
+            asyncio.run_coroutine_threadsafe(self._wait_busy_measurers(), self._event_loop).result()
+            self._event_loop.call_soon_threadsafe(self._event_loop.stop)
+            self._event_loop_thread.join()
+            self._event_loop.close()
+            self._event_loop_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _wait_busy_measurers(self) -> None:
+        await asyncio.gather(*asyncio.all_tasks() - {asyncio.current_task()}, return_exceptions=True)
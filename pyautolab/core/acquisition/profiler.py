@@ -0,0 +1,170 @@
+"""
+pyautolab pipeline profiler
+This file only deals with non-GUI measurement features
+"""
+import json
+import multiprocessing as mp
+from collections.abc import MutableSequence
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+_SUB_BUCKETS = 4
+"""The number of buckets per power of two, so a bucket is at most 25% wide."""
+_NUMBER_OF_BUCKETS = 64 * _SUB_BUCKETS
+_COUNT, _TOTAL, _MIN, _MAX = range(4)
+_HEADER = 4
+
+
+class Stage(Enum):
+    """A stage of the measurement pipeline, in the order a sample passes through them."""
+
+    MEASURE = "measure"
+    """A device measures, including its I/O. Recorded per device."""
+    FRAME = "frame"
+    """The engine gathers the samples of a tick or the arrays of a block into a frame."""
+    JOURNAL = "journal"
+    """The engine appends a frame to the journal."""
+    BUFFER = "buffer"
+    """The engine writes a frame to the shared ring buffer, including the time it waits for blocking consumers."""
+    WRITE = "write"
+    """A save process writes a frame to its file. Recorded per sink."""
+    FLUSH = "flush"
+    """A save process flushes its file. Recorded per sink."""
+    DISPLAY = "display"
+    """The GUI draws a frame. Recorded for the graph and the console."""
+
+
+def _get_bucket(duration_ns: int) -> int:
+    if duration_ns < _SUB_BUCKETS:
+        return max(0, duration_ns)
+    shift = duration_ns.bit_length() - 3
+    return (shift + 1) * _SUB_BUCKETS + ((duration_ns >> shift) & (_SUB_BUCKETS - 1))
+
+
+def _get_bucket_bounds(bucket: int) -> tuple[int, int]:
+    """Return the lowest duration of ``bucket`` and the lowest duration of the next bucket."""
+    if bucket < _SUB_BUCKETS:
+        return bucket, bucket + 1
+    shift = bucket // _SUB_BUCKETS - 1
+    lower = (_SUB_BUCKETS + bucket % _SUB_BUCKETS) << shift
+    return lower, lower + (1 << shift)
+
+
+class Histogram:
+    """A histogram of nanosecond durations with logarithmic buckets.
+
+    Recording is a few integer operations and never allocates, so probes can stay in the hot path of the run. The
+    counts are held in ``counts``, a flat sequence of integers, which can be shared memory to record in another
+    process, see `create_shared`. A histogram must be recorded from one thread at a time.
+    """
+
+    size = _HEADER + _NUMBER_OF_BUCKETS
+    """The length of the sequence of the counts."""
+
+    def __init__(self, counts: MutableSequence[int] | None = None) -> None:
+        self.counts = [0] * self.size if counts is None else counts
+
+    @classmethod
+    def create_shared(cls) -> "Histogram":
+        """Return a histogram in shared memory, which a process started after it was created records to."""
+        return cls(mp.Array("q", cls.size, lock=False))  # type: ignore
+
+    @property
+    def count(self) -> int:
+        return self.counts[_COUNT]
+
+    @property
+    def total_ns(self) -> int:
+        return self.counts[_TOTAL]
+
+    @property
+    def min_ns(self) -> int:
+        return self.counts[_MIN]
+
+    @property
+    def max_ns(self) -> int:
+        return self.counts[_MAX]
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def record(self, duration_ns: int) -> None:
+        counts = self.counts
+        if counts[_COUNT] == 0 or duration_ns < counts[_MIN]:
+            counts[_MIN] = duration_ns
+        if duration_ns > counts[_MAX]:
+            counts[_MAX] = duration_ns
+        counts[_COUNT] += 1
+        counts[_TOTAL] += duration_ns
+        counts[_HEADER + _get_bucket(duration_ns)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Return the duration in nanoseconds below which ``q`` percent of the recorded durations are, to within the
+        width of a bucket."""
+        counts = self.counts[:]
+        if counts[_COUNT] == 0:
+            return 0.0
+        rank, cumulative = q / 100 * counts[_COUNT], 0
+        for bucket, count in enumerate(counts[_HEADER:]):
+            cumulative += count
+            if count and cumulative >= rank:
+                lower, upper = _get_bucket_bounds(bucket)
+                return float(min(max((lower + upper) / 2, counts[_MIN]), counts[_MAX]))
+        return float(counts[_MAX])
+
+    def get_buckets(self) -> dict[int, int]:
+        """Return the count of every bucket that is not empty, by the lowest duration of the bucket."""
+        return {_get_bucket_bounds(bucket)[0]: count for bucket, count in enumerate(self.counts[_HEADER:]) if count}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "totalNs": self.total_ns,
+            "meanNs": self.mean_ns,
+            "minNs": self.min_ns,
+            "p50Ns": self.percentile(50),
+            "p90Ns": self.percentile(90),
+            "p99Ns": self.percentile(99),
+            "maxNs": self.max_ns,
+            "buckets": self.get_buckets(),
+        }
+
+
+class Profiler:
+    """Histograms of the time each stage of the pipeline takes, per device or per consumer.
+
+    The parts of the pipeline record to the profiler they are given, and record nothing if they are given None, so
+    profiling costs nothing when it is switched off. The histograms of stages that are recorded in a save process
+    must be created with ``shared=True`` before the process starts.
+    """
+
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[Stage, str], Histogram] = {}
+
+    def histogram(self, stage: Stage, name: str, shared: bool = False) -> Histogram:
+        """Return the histogram of ``stage`` for ``name``, a device or a consumer. It is created if it does not
+        exist."""
+        if (histogram := self._histograms.get((stage, name))) is None:
+            histogram = Histogram.create_shared() if shared else Histogram()
+            histogram = self._histograms.setdefault((stage, name), histogram)
+        return histogram
+
+    def record(self, stage: Stage, name: str, duration_ns: int) -> None:
+        self.histogram(stage, name).record(duration_ns)
+
+    def get_histograms(self) -> dict[tuple[Stage, str], Histogram]:
+        """Return the histograms in the order of the stages."""
+        return dict(sorted(self._histograms.items(), key=lambda item: list(Stage).index(item[0][0])))
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, Any]]]:
+        stages: dict[str, dict[str, dict[str, Any]]] = {}
+        for (stage, name), histogram in self.get_histograms().items():
+            stages.setdefault(stage.value, {})[name] = histogram.to_dict()
+        return stages
+
+    def save(self, path: Path, metadata: dict[str, Any] | None = None) -> None:
+        """Write the performance report of the run to ``path`` as JSON, with ``metadata`` next to the stages."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**(metadata or {}), "stages": self.to_dict()}, f, indent=4)
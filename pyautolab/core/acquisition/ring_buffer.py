@@ -0,0 +1,330 @@
+"""
+pyautolab shared memory ring buffer
+This file only deals with non-GUI measurement features
+"""
+import multiprocessing as mp
+from dataclasses import dataclass
+from enum import Enum
+from multiprocessing import resource_tracker
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from time import monotonic, perf_counter_ns, sleep
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE
+
+# Header layout (int64):
+# [write count, notify count, writing count, (cursor, overflow, recovered, decimated, blocked) * consumers]
+_WRITE = 0
+_NOTIFY = 1
+_WRITING = 2
+_HEADER = 3
+_CURSOR = 0
+_OVERFLOW = 1
+_RECOVERED = 2
+_DECIMATED = 3
+_BLOCKED = 4
+_FIELDS = 5
+# The producer polls a blocking consumer's cursor with this period.
+_BLOCK_POLL_INTERVAL = 0.0005
+
+
+class ConsumerPolicy(Enum):
+    """What the producer does when a consumer has no room for new samples."""
+
+    DROP_OLDEST = "dropOldest"
+    """Overwrite the oldest unread samples of the consumer."""
+    BLOCK = "block"
+    """Wait until the consumer reads, at most for the block timeout of the buffer, then overwrite."""
+
+
+@dataclass(frozen=True)
+class ConsumerStats:
+    name: str
+    lag: int
+    """The number of samples written but not read yet."""
+    overflow: int
+    """The number of samples this consumer lost, overwritten before it read them or discarded by its policy."""
+    recovered: int = 0
+    """The number of lost samples the consumer recovered from elsewhere, e.g. a journal."""
+    decimated: int = 0
+    """The number of samples the consumer skipped on purpose to keep up."""
+    blocked: float = 0.0
+    """Unit is second. The total time the producer waited for this consumer."""
+
+    @property
+    def dropped(self) -> int:
+        return self.overflow - self.recovered
+
+    def to_dict(self) -> dict[str, int | float]:
+        return {
+            "lag": self.lag,
+            "dropped": self.dropped,
+            "recovered": self.recovered,
+            "decimated": self.decimated,
+            "blocked": self.blocked,
+        }
+
+
+class SharedRingBuffer:
+    """A single-producer/multi-consumer ring buffer of samples in shared memory.
+
+    The producer writes each frame once and every consumer reads it through its own cursor, so no data is copied per
+    consumer and the buffer can be shared with other processes by pickling it. Neither side takes a lock: the
+    producer publishes rows by advancing the write count after copying them, and a consumer owns its cursor. Before
+    copying, the producer advances the writing count to the write count it is about to reach, so a consumer that
+    copied rows while they were overwritten finds them behind that count and counts them as overflow.
+
+    By default the producer never waits for consumers. When a consumer falls more than ``capacity`` samples behind,
+    the oldest samples are overwritten and counted as its overflow, so a slow consumer is visible instead of growing
+    a backlog. A consumer with the `ConsumerPolicy.BLOCK` policy applies backpressure instead: the producer waits up
+    to ``block_timeout`` seconds for it to make room. A consumer that has nothing to read can block in
+    `RingReader.wait`, the producer wakes it after every write.
+
+    Parameters
+    ----------
+    columns : int
+        The number of columns of a sample.
+    capacity : int
+        The number of samples the buffer holds.
+    consumers : list[str]
+        The names of the consumers. A consumer is identified by its index in this list.
+    policies : list[ConsumerPolicy] | None, default None
+        The policy of each consumer. If None, every consumer drops the oldest samples.
+    block_timeout : float, default 1.0
+        Unit is second. The longest time the producer waits for a blocking consumer on one write.
+    context : BaseContext | None, default None
+        The multiprocessing context of the processes the consumers read in. If None, the default context is used.
+    """
+
+    def __init__(
+        self,
+        columns: int,
+        capacity: int,
+        consumers: list[str],
+        policies: list[ConsumerPolicy] | None = None,
+        block_timeout: float = 1.0,
+        context: BaseContext | None = None,
+        _name: str | None = None,
+        _events: list | None = None,
+    ) -> None:
+        self.columns = columns
+        self.capacity = capacity
+        self.consumers = consumers
+        self.policies = [ConsumerPolicy.DROP_OLDEST] * len(consumers) if policies is None else policies
+        self.block_timeout = block_timeout
+        if _events is None:
+            _events = [(mp if context is None else context).Event() for _ in consumers]
+        self._events = _events
+        header_size = (_HEADER + _FIELDS * len(consumers)) * 8
+        data_size = capacity * columns * np.dtype(DTYPE).itemsize
+        self._owner = _name is None
+        if _name is None:
+            self._shm = SharedMemory(create=True, size=header_size + data_size)
+        else:
+            self._shm = SharedMemory(name=_name)
+            # Only the owner unlinks the block. Python 3.11 registers attached blocks too, see bpo-39959.
+            resource_tracker.unregister(self._shm._name, "shared_memory")  # type: ignore
+        self._header = np.ndarray((_HEADER + _FIELDS * len(consumers),), dtype=np.int64, buffer=self._shm.buf)
+        self._data = np.ndarray((capacity, columns), dtype=DTYPE, buffer=self._shm.buf, offset=header_size)
+        if self._owner:
+            self._header[:] = 0
+
+    def __reduce__(self):
+        return SharedRingBuffer, (
+            self.columns,
+            self.capacity,
+            self.consumers,
+            self.policies,
+            self.block_timeout,
+            None,
+            self._shm.name,
+            self._events,
+        )
+
+    def _field(self, consumer: int, field: int) -> int:
+        return _HEADER + _FIELDS * consumer + field
+
+    @property
+    def write_count(self) -> int:
+        return int(self._header[_WRITE])
+
+    def write(self, frame: np.ndarray) -> None:
+        """Write the samples of ``frame``. Only one producer may call this method."""
+        self._wait_for_consumers(min(len(frame), self.capacity))
+        # Samples beyond the capacity would be overwritten right away, consumers count them as overflow.
+        dropped = max(0, len(frame) - self.capacity)
+        frame = frame[dropped:]
+        size = len(frame)
+        write_count = self.write_count + dropped + size
+        start = (write_count - size) % self.capacity
+        first = min(size, self.capacity - start)
+        self._header[_WRITING] = write_count
+        self._data[start : start + first] = frame[:first]
+        self._data[: size - first] = frame[first:]
+        self._header[_WRITE] = write_count
+        self._wake()
+
+    def _wait_for_consumers(self, rows: int) -> None:
+        header = self._header
+        for consumer, policy in enumerate(self.policies):
+            if policy is not ConsumerPolicy.BLOCK:
+                continue
+            cursor = self._field(consumer, _CURSOR)
+            if self.write_count + rows - int(header[cursor]) <= self.capacity:
+                continue
+            start_ns = perf_counter_ns()
+            timeout_ns = start_ns + round(self.block_timeout * 1e9)
+            while self.write_count + rows - int(header[cursor]) > self.capacity and perf_counter_ns() < timeout_ns:
+                sleep(_BLOCK_POLL_INTERVAL)
+            header[self._field(consumer, _BLOCKED)] += perf_counter_ns() - start_ns
+
+    def notify(self) -> None:
+        """Return every consumer blocked in `RingReader.wait`, e.g. to let it see that the run stopped."""
+        self._header[_NOTIFY] += 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for event in self._events:
+            event.set()
+
+    def reader(self, consumer: int | str) -> "RingReader":
+        return RingReader(self, consumer if isinstance(consumer, int) else self.consumers.index(consumer))
+
+    def stats(self) -> list[ConsumerStats]:
+        write_count = self.write_count
+        header = self._header
+        return [
+            ConsumerStats(
+                name,
+                min(self.capacity, write_count - int(header[self._field(i, _CURSOR)])),
+                int(header[self._field(i, _OVERFLOW)]),
+                int(header[self._field(i, _RECOVERED)]),
+                int(header[self._field(i, _DECIMATED)]),
+                int(header[self._field(i, _BLOCKED)]) / 1e9,
+            )
+            for i, name in enumerate(self.consumers)
+        ]
+
+    def close(self) -> None:
+        del self._header, self._data
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view returned by RingReader.peek is still alive, the mapping is released with it.
+            pass
+        if self._owner:
+            self._shm.unlink()
+
+
+class RingReader:
+    """The read cursor of one consumer of a `SharedRingBuffer`."""
+
+    def __init__(self, buffer: SharedRingBuffer, consumer: int) -> None:
+        self._buffer = buffer
+        self._consumer = consumer
+        self._event = buffer._events[consumer]
+        self._cursor_index = buffer._field(consumer, _CURSOR)
+        self._overflow_index = buffer._field(consumer, _OVERFLOW)
+        self._notify_count = int(buffer._header[_NOTIFY])
+
+    @property
+    def buffer(self) -> SharedRingBuffer:
+        return self._buffer
+
+    @property
+    def _cursor(self) -> int:
+        return int(self._buffer._header[self._cursor_index])
+
+    @property
+    def cursor(self) -> int:
+        """The index in the run of the next sample this consumer reads."""
+        return self._cursor
+
+    @property
+    def lag(self) -> int:
+        return min(self._buffer.capacity, self._buffer.write_count - self._cursor)
+
+    @property
+    def overflow(self) -> int:
+        return int(self._buffer._header[self._overflow_index])
+
+    def stats(self) -> ConsumerStats:
+        return self._buffer.stats()[self._consumer]
+
+    def count_dropped(self, rows: int) -> None:
+        """Count ``rows`` read samples that the consumer discarded as lost."""
+        self._buffer._header[self._overflow_index] += rows
+
+    def count_recovered(self, rows: int) -> None:
+        """Count ``rows`` lost samples that the consumer recovered."""
+        self._buffer._header[self._buffer._field(self._consumer, _RECOVERED)] += rows
+
+    def count_decimated(self, rows: int) -> None:
+        """Count ``rows`` read samples that the consumer skipped on purpose."""
+        self._buffer._header[self._buffer._field(self._consumer, _DECIMATED)] += rows
+
+    def wait(self, timeout: float | None = None, min_rows: int = 1) -> bool:
+        """Block until there are ``min_rows`` unread samples, the buffer is notified or ``timeout`` seconds passed.
+        Return False on timeout."""
+        header = self._buffer._header
+        min_rows = min(max(1, min_rows), self._buffer.capacity)
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            self._event.clear()
+            # A notification is returned once even if it came before this call, so it is never lost.
+            if (notify_count := int(header[_NOTIFY])) != self._notify_count:
+                self._notify_count = notify_count
+                return True
+            if self._buffer.write_count - self._cursor >= min_rows:
+                return True
+            remaining = None if deadline is None else max(0.0, deadline - monotonic())
+            if not self._event.wait(remaining):
+                return False
+
+    def peek(self, max_rows: int | None = None) -> list[np.ndarray]:
+        """Return zero-copy views of the unread samples, oldest first.
+
+        The views are split in two when the unread samples wrap around the end of the buffer. They stay valid until
+        the producer overwrites them, so consume them before calling `advance`. Unlike `read`, this method can not
+        tell whether the producer overwrote the views while they were consumed.
+        """
+        buffer = self._buffer
+        header = buffer._header
+        available = buffer.write_count - self._cursor
+        if available > buffer.capacity:
+            lost = available - buffer.capacity
+            header[self._overflow_index] += lost
+            header[self._cursor_index] += lost
+            available = buffer.capacity
+        if max_rows is not None:
+            available = min(available, max_rows)
+        if available <= 0:
+            return []
+        start = self._cursor % buffer.capacity
+        first = min(available, buffer.capacity - start)
+        views = [buffer._data[start : start + first]]
+        if first < available:
+            views.append(buffer._data[: available - first])
+        return views
+
+    def advance(self, rows: int) -> None:
+        """Mark ``rows`` samples returned by `peek` as read."""
+        self._buffer._header[self._cursor_index] += rows
+
+    def read(self, max_rows: int | None = None) -> np.ndarray:
+        """Return a copy of the unread samples and mark them as read."""
+        views = self.peek(max_rows)
+        if not views:
+            return np.empty((0, self._buffer.columns), dtype=DTYPE)
+        cursor = self._cursor
+        frame = np.concatenate(views)
+        self.advance(len(frame))
+        # The producer may have lapped the cursor while the samples were copied, or be overwriting them now. The rows
+        # before the writing count minus the capacity can not be trusted.
+        if (overwritten := int(self._buffer._header[_WRITING]) - self._buffer.capacity - cursor) > 0:
+            overwritten = min(overwritten, len(frame))
+            self._buffer._header[self._overflow_index] += overwritten
+            frame = frame[overwritten:]
+        return frame
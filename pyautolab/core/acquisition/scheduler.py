@@ -0,0 +1,137 @@
+"""
+pyautolab absolute deadline scheduler
+This file only deals with non-GUI timing features
+"""
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from time import perf_counter_ns, sleep
+
+
+class OverrunPolicy(Enum):
+    SKIP = "skip"
+    """Drop the deadlines that passed while the previous tick was running and wait for the next future one."""
+    FLAG = "flag"
+    """Fire once immediately, flagged as an overrun. The other passed deadlines are dropped, not replayed."""
+
+
+@dataclass(frozen=True)
+class Tick:
+    index: int
+    """The index ``k`` of the deadline ``start + k * interval``."""
+    deadline_ns: int
+    fired_ns: int
+    elapsed: float
+    """Unit is second. The time from the start of the scheduler to when this tick fired."""
+    overrun: bool
+    """Whether deadlines were dropped or the tick fired more than one interval late."""
+
+
+@dataclass
+class SchedulerStats:
+    """Live statistics of a `DeadlineScheduler`. Jitter is the lateness of a tick against its deadline."""
+
+    ticks: int = 0
+    overruns: int = 0
+    skipped: int = 0
+    last_jitter_ns: int = 0
+    last_overrun: bool = False
+    """Whether the latest tick was an overrun."""
+    max_jitter_ns: int = 0
+    _sum_jitter_ns: int = 0
+
+    @property
+    def mean_jitter_ns(self) -> float:
+        return self._sum_jitter_ns / self.ticks if self.ticks else 0.0
+
+    def record(self, jitter_ns: int, overrun: bool) -> None:
+        self.ticks += 1
+        self.overruns += overrun
+        self.last_jitter_ns = jitter_ns
+        self.last_overrun = overrun
+        self.max_jitter_ns = max(self.max_jitter_ns, jitter_ns)
+        self._sum_jitter_ns += jitter_ns
+
+
+class DeadlineScheduler:
+    """Fire on absolute deadlines ``start + k * interval`` of a monotonic nanosecond clock.
+
+    Because every deadline is computed from the start time, a late tick does not shift the following ones and the
+    period does not drift. When a tick is handled for longer than the interval, the passed deadlines are skipped or
+    the next tick is flagged as an overrun according to ``overrun_policy``, so the lag never accumulates.
+
+    Parameters
+    ----------
+    interval_ns : int
+        The interval of the deadlines in nanoseconds.
+    overrun_policy : OverrunPolicy, default OverrunPolicy.SKIP
+        How to handle deadlines that passed while the previous tick was running.
+    spin_ns : int, default 200_000
+        `wait` sleeps until this much time before the deadline and then spins, so the tick does not depend on the
+        resolution of the OS sleep.
+    """
+
+    def __init__(
+        self, interval_ns: int, overrun_policy: OverrunPolicy = OverrunPolicy.SKIP, spin_ns: int = 200_000
+    ) -> None:
+        if interval_ns <= 0:
+            raise ValueError("The interval must be positive.")
+        self.interval_ns = interval_ns
+        self.overrun_policy = overrun_policy
+        self.spin_ns = spin_ns
+        self.stats = SchedulerStats()
+        self.start_ns = 0
+        self._index = 0
+        self._overrun = False
+
+    def start(self, start_ns: int | None = None, immediate: bool = True) -> None:
+        """Start the schedule. If ``immediate`` is False, the first deadline is one interval after the start."""
+        self.start_ns = perf_counter_ns() if start_ns is None else start_ns
+        self._index = 0 if immediate else 1
+        self._overrun = False
+        self.stats = SchedulerStats()
+
+    @property
+    def next_deadline_ns(self) -> int:
+        return self.start_ns + self._index * self.interval_ns
+
+    def _first_future_index(self, now_ns: int) -> int:
+        return (now_ns - self.start_ns) // self.interval_ns + 1
+
+    def arm(self, now_ns: int | None = None) -> int:
+        """Apply the overrun policy to the next deadline and return the nanoseconds left until it."""
+        now_ns = perf_counter_ns() if now_ns is None else now_ns
+        if now_ns > self.next_deadline_ns and self._index > 0:
+            self._overrun = True
+            if self.overrun_policy == OverrunPolicy.SKIP:
+                index = self._first_future_index(now_ns)
+                self.stats.skipped += index - self._index
+                self._index = index
+        return max(0, self.next_deadline_ns - now_ns)
+
+    def tick(self, now_ns: int | None = None) -> Tick:
+        """Consume the next deadline and return the tick. Call this when the tick fired."""
+        now_ns = perf_counter_ns() if now_ns is None else now_ns
+        deadline_ns = self.next_deadline_ns
+        jitter_ns = max(0, now_ns - deadline_ns)
+        overrun = self._overrun or jitter_ns >= self.interval_ns
+        self.stats.record(jitter_ns, overrun)
+        tick = Tick(self._index, deadline_ns, now_ns, (now_ns - self.start_ns) / 1e9, overrun)
+
+        # Never replay deadlines that passed while this tick was late.
+        index = max(self._index + 1, self._first_future_index(now_ns))
+        self.stats.skipped += index - self._index - 1
+        self._index = index
+        self._overrun = False
+        return tick
+
+    def wait(self, stop_event: threading.Event) -> Tick | None:
+        """Block until the next deadline and return the tick. Return None when ``stop_event`` is set."""
+        remaining_ns = self.arm()
+        if remaining_ns > self.spin_ns and stop_event.wait((remaining_ns - self.spin_ns) / 1e9):
+            return None
+        while perf_counter_ns() < self.next_deadline_ns:
+            sleep(0)
+        if stop_event.is_set():
+            return None
+        return self.tick()
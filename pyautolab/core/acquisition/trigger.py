@@ -0,0 +1,200 @@
+"""
+pyautolab triggered capture
+This file only deals with non-GUI measurement features
+"""
+import math
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE, FrameSchema
+
+
+class TriggerMode(Enum):
+    LEVEL = "level"
+    """Every sample at or above the level meets the condition, or at or below it for a falling slope."""
+    EDGE = "edge"
+    """The sample that crosses the level in the direction of the slope meets the condition."""
+    WINDOW = "window"
+    """Every sample outside the window between the level and the upper level meets the condition."""
+
+
+class Slope(Enum):
+    RISING = "rising"
+    FALLING = "falling"
+    EITHER = "either"
+
+
+@dataclass(frozen=True)
+class Trigger:
+    """A condition on one channel of a run and the samples to keep around the samples that meet it.
+
+    A capture keeps the ``pre_samples`` samples before a sample that meets the condition, and lasts until
+    ``post_samples`` samples after the last sample that met it. Samples in which the channel was not measured are NaN,
+    and never meet the condition.
+    """
+
+    channel: str
+    mode: TriggerMode
+    level: float
+    upper: float | None = None
+    """The upper level of a window trigger."""
+    slope: Slope = Slope.RISING
+    """The direction of an edge, or the side of the level a level trigger fires on. A window trigger ignores it."""
+    pre_samples: int = 0
+    post_samples: int = 0
+
+    def __post_init__(self) -> None:
+        if self.pre_samples < 0 or self.post_samples < 0:
+            raise ValueError("The numbers of pre-trigger and post-trigger samples must not be negative.")
+        if self.mode is TriggerMode.LEVEL and self.slope is Slope.EITHER:
+            raise ValueError("A level trigger needs a rising or falling slope.")
+        if self.mode is TriggerMode.WINDOW and (self.upper is None or self.upper < self.level):
+            raise ValueError("A window trigger needs an upper level that is not below the level.")
+
+    @classmethod
+    def from_dict(cls, conf: dict[str, Any]) -> "Trigger":
+        """Return the trigger of the ``trigger`` section of the run configuration."""
+        mode = TriggerMode(conf.get("mode", "edge"))
+        return cls(
+            conf["channel"],
+            mode,
+            float(conf.get("level", 0.0)),
+            float(conf["upper"]) if mode is TriggerMode.WINDOW else None,
+            Slope(conf.get("slope", "rising")),
+            int(conf.get("preSamples", 0)),
+            int(conf.get("postSamples", 0)),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "mode": self.mode.value,
+            "level": self.level,
+            "upper": self.upper,
+            "slope": self.slope.value,
+            "preSamples": self.pre_samples,
+            "postSamples": self.post_samples,
+        }
+
+    def evaluate(self, values: np.ndarray, previous: float = math.nan) -> np.ndarray:
+        """Return whether each of ``values`` meets the condition. ``previous`` is the last measured value before them,
+        which an edge at the first value crosses from."""
+        valid = ~np.isnan(values)
+        if self.mode is TriggerMode.WINDOW:
+            return valid & ((values < self.level) | (values > self.upper))  # type: ignore
+        if self.mode is TriggerMode.LEVEL:
+            return valid & (values >= self.level if self.slope is Slope.RISING else values <= self.level)
+
+        # An edge is measured against the previous measured value, however many samples without the channel are
+        # between them.
+        measured = values[valid]
+        before = np.concatenate([[previous], measured[:-1]])
+        rising = (before < self.level) & (measured >= self.level)
+        falling = (before > self.level) & (measured <= self.level)
+        fired = np.zeros(len(values), dtype=bool)
+        if self.slope is Slope.RISING:
+            fired[valid] = rising
+        elif self.slope is Slope.FALLING:
+            fired[valid] = falling
+        else:
+            fired[valid] = rising | falling
+        return fired
+
+
+class TriggeredCapture:
+    """Keep only the samples around the events of a `Trigger`, from frames in the order they were measured.
+
+    The condition is evaluated on whole frames at once. The last ``pre_samples`` samples that were not kept wait in a
+    ring buffer of a fixed size, so the samples before an event are kept even if they arrived in earlier frames. An
+    event starts at a sample that meets the condition more than ``post_samples`` samples after the previous one.
+
+    Parameters
+    ----------
+    trigger : Trigger
+        The condition and the numbers of samples to keep around it.
+    schema : FrameSchema
+        The column order of the frames. It must contain the channel of the trigger.
+    """
+
+    def __init__(self, trigger: Trigger, schema: FrameSchema) -> None:
+        self.trigger = trigger
+        self._column = schema.index(trigger.channel)
+        self._time_column = schema.index("Time") if "Time" in schema.columns else None
+        self._pre_buffer = np.empty((trigger.pre_samples, len(schema)), dtype=DTYPE)
+        self._pre_count = 0
+        self._pre_position = 0
+        self._post_remaining = 0
+        self._previous = math.nan
+        self._samples = 0
+        self._last_fired = -trigger.post_samples - 1
+        self.event_times: list[float] = []
+        """The time of the sample that started each event, or its index in the run if the frames have no time."""
+
+    @property
+    def events(self) -> int:
+        return len(self.event_times)
+
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        """Return the samples of ``frame`` and of the pre-trigger buffer that belong to a capture, in their order."""
+        pre, post, rows = self.trigger.pre_samples, self.trigger.post_samples, len(frame)
+        if rows == 0:
+            return frame
+        values = frame[:, self._column]
+        fired_indexes = np.flatnonzero(self.trigger.evaluate(values, self._previous))
+        measured = values[~np.isnan(values)]
+        if len(measured):
+            self._previous = float(measured[-1])
+
+        # A row is kept if it is in the window of a sample that met the condition, or in the post-trigger window of a
+        # capture of the previous frames.
+        counts = np.zeros(rows + 1, dtype=np.int64)
+        if carried := min(self._post_remaining, rows):
+            counts[0] += 1
+            counts[carried] -= 1
+        np.add.at(counts, np.maximum(fired_indexes - pre, 0), 1)
+        np.add.at(counts, np.minimum(fired_indexes + post + 1, rows), -1)
+        kept = np.cumsum(counts[:rows]) > 0
+
+        history = self._pre_buffer[:0]
+        if len(fired_indexes):
+            self._count_events(frame, fired_indexes)
+            needed = min(self._pre_count, pre - int(fired_indexes[0]))
+            if needed > 0:
+                history = self._pre_buffer.take(np.arange(self._pre_position - needed, self._pre_position) % pre, 0)
+            self._post_remaining = max(int(fired_indexes[-1]) + post + 1 - rows, 0)
+        else:
+            self._post_remaining = max(self._post_remaining - rows, 0)
+        self._samples += rows
+
+        # Only the samples after the last kept one can come before a later event.
+        kept_indexes = np.flatnonzero(kept)
+        if len(kept_indexes):
+            self._pre_count = 0
+        self._push(frame[kept_indexes[-1] + 1 :] if len(kept_indexes) else frame)
+        if len(history):
+            return np.concatenate([history, frame[kept]])
+        return frame[kept]
+
+    def _count_events(self, frame: np.ndarray, fired_indexes: np.ndarray) -> None:
+        positions = fired_indexes + self._samples
+        gaps = np.diff(positions, prepend=self._last_fired)
+        starts = fired_indexes[gaps > self.trigger.post_samples]
+        if self._time_column is None:
+            self.event_times.extend((starts + self._samples).astype(float).tolist())
+        else:
+            self.event_times.extend(frame[starts, self._time_column].tolist())
+        self._last_fired = int(positions[-1])
+
+    def _push(self, rows: np.ndarray) -> None:
+        """Append ``rows`` to the pre-trigger buffer, which holds the latest ``pre_samples`` of them."""
+        capacity = self.trigger.pre_samples
+        if capacity == 0 or len(rows) == 0:
+            return
+        rows = rows[-capacity:]
+        indexes = np.arange(self._pre_position, self._pre_position + len(rows)) % capacity
+        self._pre_buffer[indexes] = rows
+        self._pre_position = (self._pre_position + len(rows)) % capacity
+        self._pre_count = min(self._pre_count + len(rows), capacity)
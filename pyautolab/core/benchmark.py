@@ -0,0 +1,202 @@
+"""
+pyautolab acquisition benchmark
+This file only deals with non-GUI benchmark features
+
+Measure the pipeline of `RunSession` with synthetic devices at rising sampling rates and channel counts: the
+acquisition engine, the shared ring buffer that the display and the save processes read, and the storage sinks. A
+display reader in the benchmark process stands in for the graph, so the benchmark runs without Qt::
+
+    python -m pyautolab bench --intervals 10 1 0.1 --channels 1 16 128 --out benchmark.json
+"""
+import os
+import platform
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import psutil
+
+from pyautolab.core.acquisition import Measurer
+from pyautolab.core.runner import RunSession
+from pyautolab.core.storage import Sink
+from pyautolab.core.utils.conf import Configuration
+
+_LATENCY_PERCENTILES = (50, 90, 99)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    interval: float
+    """Unit is second. The measuring interval of the synthetic device."""
+    channels: int
+    """The number of parameters the synthetic device returns every tick."""
+    duration: float
+    """Unit is second. How long the run measures."""
+
+    @property
+    def key(self) -> str:
+        return f"{self.interval * 1000:g}ms-{self.channels}ch"
+
+
+def _create_synthetic_measurer(channels: int) -> tuple[Measurer, dict[str, str]]:
+    parameters = [f"Channel {i + 1}" for i in range(channels)]
+    count = 0
+
+    def measure() -> dict[str, float]:
+        nonlocal count
+        count += 1
+        return dict.fromkeys(parameters, float(count))
+
+    return Measurer("Synthetic", measure, parameters), dict.fromkeys(parameters, "V")
+
+
+class _LatencyProbe:
+    """Read the display consumer as fast as it can and record how long after its tick each sample arrived."""
+
+    def __init__(self, session: RunSession) -> None:
+        assert session.display_reader is not None
+        self._session = session
+        self._reader = session.display_reader
+        self._latencies: list[np.ndarray] = []
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._read, name="pyautolab-benchmark", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> np.ndarray:
+        self._stop_event.set()
+        self._thread.join()
+        return np.concatenate(self._latencies) if self._latencies else np.empty(0)
+
+    def _read(self) -> None:
+        while not self._stop_event.is_set():
+            if not self._reader.wait(0.05):
+                continue
+            frame = self._reader.read()
+            now = (time.perf_counter_ns() - self._session.start_ns) / 1e9
+            self._latencies.append(now - frame[:, 0])
+
+
+def _get_cpu_time(process: psutil.Process) -> float:
+    try:
+        times = process.cpu_times()
+    except psutil.Error:
+        return 0.0
+    return times.user + times.system
+
+
+def run_scenario(scenario: Scenario, sinks: list[type[Sink]], settings: Configuration, folder: Path) -> dict[str, Any]:
+    """Measure one run of ``scenario`` and return its results. The files of the run are saved in ``folder``."""
+    measurer, units = _create_synthetic_measurer(scenario.channels)
+    session = RunSession([measurer], units, folder / scenario.key, settings, scenario.interval, sinks, display=True)
+    probe = _LatencyProbe(session)
+    probe.start()
+    session.start()
+    processes = {"acquisition": psutil.Process(os.getpid())}
+    processes.update({name: psutil.Process(pid) for name, pid in session.save_process_ids.items() if pid is not None})
+    start_cpu_times = {name: _get_cpu_time(process) for name, process in processes.items()}
+    start = time.perf_counter()
+
+    session.stop_event.wait(scenario.duration)
+    # The processes are measured before they stop, since psutil can not read the times of an exited process.
+    elapsed = time.perf_counter() - start
+    number_of_samples = session.number_of_samples
+    cpu = {
+        name: 100 * (_get_cpu_time(process) - start_cpu_times[name]) / elapsed for name, process in processes.items()
+    }
+    stats = session.scheduler_stats
+    is_saved = session.stop()
+    latencies = probe.stop()
+    consumers = {consumer.name: consumer.to_dict() for consumer in session.get_consumer_stats()}
+    session.close()
+
+    return {
+        "scenario": scenario.key,
+        "interval": scenario.interval,
+        "channels": scenario.channels,
+        "duration": elapsed,
+        "sinks": [sink.name for sink in sinks],
+        "samples": number_of_samples,
+        "targetSamplesPerSecond": 1 / scenario.interval,
+        "samplesPerSecond": number_of_samples / elapsed,
+        "valuesPerSecond": number_of_samples * scenario.channels / elapsed,
+        "latency": {
+            **{f"p{q}": float(np.percentile(latencies, q)) if len(latencies) else None for q in _LATENCY_PERCENTILES},
+            "max": float(latencies.max()) if len(latencies) else None,
+        },
+        "jitter": {
+            "ticks": stats.ticks,
+            "meanNs": stats.mean_jitter_ns,
+            "maxNs": stats.max_jitter_ns,
+            "overruns": stats.overruns,
+            "skipped": stats.skipped,
+        },
+        "cpuPercent": cpu,
+        "consumers": consumers,
+        "stages": None if session.profiler is None else session.profiler.to_dict(),
+        "saved": is_saved,
+    }
+
+
+def run_benchmark(
+    scenarios: list[Scenario],
+    sinks: list[type[Sink]],
+    settings: Configuration,
+    folder: Path | None = None,
+    on_result: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Run every scenario and return the report. The files of the runs are deleted unless ``folder`` is given.
+    ``on_result`` is called with the result of each scenario as soon as it finished, e.g. to show the progress."""
+    with tempfile.TemporaryDirectory(prefix="pyautolab-benchmark-") as temporary_folder:
+        results = []
+        for scenario in scenarios:
+            result = run_scenario(scenario, sinks, settings, Path(temporary_folder) if folder is None else folder)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "system": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "settings": {props.title: settings.get(props.title) for props in settings.get_all_props().get("Runner", [])},
+        "results": results,
+    }
+
+
+def format_result(result: dict[str, Any]) -> str:
+    latency = result["latency"]
+    p99 = "-" if latency["p99"] is None else f"{latency['p99'] * 1000:.2f} ms"
+    return (
+        f"{result['scenario']:>14}: {result['samplesPerSecond']:10.0f} samples/s "
+        f"({result['samplesPerSecond'] / result['targetSamplesPerSecond']:6.1%} of target), "
+        f"p99 latency {p99}, max jitter {result['jitter']['maxNs'] / 1e6:.2f} ms"
+    )
+
+
+def find_regressions(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    """Return a message for every scenario of ``report`` that is slower than in ``baseline`` by more than
+    ``tolerance``, a fraction. Throughput must not drop and the 99th percentile latency must not rise."""
+    baseline_results = {result["scenario"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in report["results"]:
+        if (baseline_result := baseline_results.get(result["scenario"])) is None:
+            continue
+        rate, baseline_rate = result["samplesPerSecond"], baseline_result["samplesPerSecond"]
+        if rate < baseline_rate * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: {rate:.0f} samples/s, baseline {baseline_rate:.0f} samples/s")
+        latency, baseline_latency = result["latency"]["p99"], baseline_result["latency"]["p99"]
+        if latency is not None and baseline_latency is not None and latency > baseline_latency * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}: p99 latency {latency * 1000:.2f} ms, "
+                f"baseline {baseline_latency * 1000:.2f} ms"
+            )
+    return regressions
@@ -1,2 +1,13 @@
-from pyautolab.core.plugin.device import Controller, Device, DeviceStatus, DeviceTab
+from typing import Any
+
+from pyautolab.core.plugin.device import AsyncDevice, Device, DeviceStatus, StreamingDevice
 from pyautolab.core.plugin.plugin import Plugin, get_plugins
+
+
+def __getattr__(name: str) -> Any:
+    # The Qt classes are imported on first use, so the headless runner never loads Qt.
+    if name in ("Controller", "DeviceTab"):
+        from pyautolab.core.plugin import device_tab
+
+        return getattr(device_tab, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
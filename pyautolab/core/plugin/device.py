@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Any, Type
+from typing import TYPE_CHECKING, Any, Type
 
-from qtpy.QtCore import QObject
-from qtpy.QtWidgets import QWidget
+if TYPE_CHECKING:
+    from pyautolab.core.acquisition import Block
+    from pyautolab.core.plugin.device_tab import DeviceTab
 
 
 class Device(ABC):
@@ -32,38 +33,34 @@ class Device(ABC):
         pass
 
 
-class Controller(QObject):
-    _counter = 0
-    is_controllable = True
+class AsyncDevice(Device):
+    """A device whose I/O is awaited on an asyncio event loop.
 
-    def __init__(self) -> None:
-        super().__init__()
-        Controller._counter += 1
-        Controller.is_controllable = True
-
-    def start(self) -> None:
-        raise NotImplementedError
+    A measurable async device defines ``async def measure(self) -> dict[str, float]``. The runner measures async
+    devices concurrently on one event loop, so many slow instruments share a thread while they wait for their
+    replies. ``open``, ``close``, ``send`` and ``reset_buffer`` stay blocking.
 
-    def stop(self) -> None:
-        Controller._counter -= 1
-        if Controller._counter == 0:
-            Controller.is_controllable = False
+    The coroutines are not always awaited on the same loop: the communication monitor reads on a loop of its own,
+    and each run polls on the loop of its poller. A device must not keep loop-bound objects, such as the streams of
+    ``asyncio.open_connection``, locks or futures, between calls, or must create them again for a new running loop.
+    """
 
+    @abstractmethod
+    async def receive(self) -> str:  # type: ignore[override]
+        pass
 
-class DeviceTab(QWidget):
-    def __init__(self, device: Device) -> None:
-        super().__init__()
-        self.device = device
-        self.device_enable = True
 
-    def get_controller(self) -> Controller | None:
-        return None
+class StreamingDevice(Device):
+    """A device that measures faster than the runner polls it, e.g. a buffered DAQ or an oscilloscope.
 
-    def setup_settings(self) -> None:
-        return None
+    ``measure`` returns a `Block` of the samples measured since its previous call. The parameters of the device tab
+    name the channels of the block. An async streaming device also derives from `AsyncDevice` and defines
+    ``async def measure``.
+    """
 
-    def get_parameters(self) -> dict[str, str] | None:
-        return None
+    @abstractmethod
+    def measure(self) -> "Block":
+        pass
 
 
 @dataclass
@@ -71,5 +68,5 @@ class DeviceStatus:
     name: str
     device: Device
     device_properties: dict[str, Any]
-    tab: Type[DeviceTab] | None
+    tab: Type["DeviceTab"] | None
     is_connected: bool
@@ -0,0 +1,68 @@
+from qtpy.QtCore import QObject
+from qtpy.QtWidgets import QWidget
+
+from pyautolab.core.acquisition import Tick
+from pyautolab.core.plugin.device import Device
+
+
+class Controller(QObject):
+    """Control devices while a run measures.
+
+    A controller either sets `interval` and overrides `control`, which is then called on the absolute deadlines of a
+    `DeadlineScheduler` with late ticks reported as overruns, or overrides `start` and `stop` and drives itself, e.g.
+    with timers. The controllers of a run live on a dedicated thread with its own Qt event loop unless the
+    ``runner.controller.thread`` setting is off, so redrawing the graphs does not delay them. A controller must
+    therefore have no parent and must not touch widgets: read the settings of its tab in `DeviceTab.get_controller`.
+    Qt can not move a controller that has a parent, so all the controllers of such a run stay on the GUI thread.
+    """
+
+    _counter = 0
+    is_controllable = True
+    interval: int | None = None
+    """Unit is millisecond. The period `control` is called at. If None, `control` is never called."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        Controller._counter += 1
+        Controller.is_controllable = True
+
+    def start(self) -> None:
+        """Called on the controller thread when the run starts."""
+        return None
+
+    def control(self, tick: Tick) -> None:
+        """Called on the controller thread every `interval` milliseconds while the run measures. ``tick.overrun`` is
+        True if the previous call made this one late."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Called on the controller thread when the run stops. Overrides must call this method."""
+        Controller._counter -= 1
+        if Controller._counter == 0:
+            Controller.is_controllable = False
+
+
+class DeviceTab(QWidget):
+    def __init__(self, device: Device) -> None:
+        super().__init__()
+        self.device = device
+        self.device_enable = True
+
+    def get_controller(self) -> Controller | None:
+        return None
+
+    def setup_settings(self) -> None:
+        return None
+
+    def get_parameters(self) -> dict[str, str] | None:
+        return None
+
+    def get_measure_timeout(self) -> int | None:
+        """Return the deadline of ``device.measure`` in milliseconds for concurrent measuring. If None, the
+        ``runner.measure.timeout`` setting is used."""
+        return None
+
+    def get_measuring_interval(self) -> int | None:
+        """Return the sampling interval of ``device.measure`` in milliseconds. If None, the measuring interval of the
+        run configuration is used."""
+        return None
@@ -10,6 +10,7 @@ from types import ModuleType
 from typing import Any, Literal
 
 from pyautolab.core.plugin.device import DeviceStatus
+from pyautolab.core.storage import Sink
 from pyautolab.core.utils.conf import AbstractConf, ConfProps
 
 # Constants
@@ -105,7 +106,9 @@ class Plugin:
         entry_module = import_module(module)
         return getattr(entry_module, attr)
 
-    def get_device_statuses(self) -> list[DeviceStatus]:
+    def get_device_statuses(self, with_tabs: bool = True) -> list[DeviceStatus]:
+        """Return the devices of the plugin. If ``with_tabs`` is False, the tab classes, which need Qt, are not
+        imported."""
         if (devices := self._conf.get("device")) is None:
             return []
         device_statuses = []
@@ -114,7 +117,7 @@ class Plugin:
             if device_class_name is None:
                 continue
             device = Plugin._getattr_from_specifier(device_class_name)()
-            device_tab_name = device_conf.get("tabClass")
+            device_tab_name = device_conf.get("tabClass") if with_tabs else None
 
             device_statuses.append(
                 DeviceStatus(
@@ -127,6 +130,12 @@ class Plugin:
             )
         return device_statuses
 
+    def get_sinks(self) -> list[type[Sink]]:
+        sink_class_names: list[str] | None = self._conf.get("sinks")
+        if sink_class_names is None:
+            return []
+        return [Plugin._getattr_from_specifier(name) for name in sink_class_names]
+
     def get_commands(self) -> list[_Command]:
         command_infos = self._conf.get("commands")
         if command_infos is None:
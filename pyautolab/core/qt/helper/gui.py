@@ -58,8 +58,9 @@ def timer(
     enable_count: bool = False,
     enable_clock: bool = False,
     timer_type: Qt.TimerType | None = None,
+    absolute_deadline: bool = False,
 ):
-    timer = AutoLabTimer(parent, enable_count, enable_clock)
+    timer = AutoLabTimer(parent, enable_count, enable_clock, absolute_deadline)
     if timeout is not None:
         timer.timeout.connect(timeout)  # type: ignore
     if timer_type is not None:
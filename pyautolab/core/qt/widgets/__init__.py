@@ -1,7 +1,19 @@
 from pyautolab.core.qt.widgets.alert import Alert
 from pyautolab.core.qt.widgets.combobox import CheckCombobox, FlexiblePopupCombobox, PortCombobox
 from pyautolab.core.qt.widgets.plot_widget import MultiplePlotWidget
-from pyautolab.core.qt.widgets.status import BaseTimerStatus, CPUStatus, MemoryStatus, StatusBar, StatusBarWidget
+from pyautolab.core.qt.widgets.status import (
+    BaseRunStatus,
+    BaseTimerStatus,
+    CPUStatus,
+    DroppedSamplesStatus,
+    MemoryStatus,
+    OverrunStatus,
+    QueueDepthStatus,
+    SampleRateStatus,
+    StatusBar,
+    StatusBarWidget,
+    WriterLagStatus,
+)
 from pyautolab.core.qt.widgets.switch import Switch
 from pyautolab.core.qt.widgets.table import ListTableView
 from pyautolab.core.qt.widgets.utility_widgets import IconLineEdit, IntSlider
@@ -12,6 +12,7 @@ class _RealTimeCurve:
     array: np.ndarray
     max: int
     counter: int
+    times: np.ndarray | None = None
 
 
 class FlowLayout(QLayout):
@@ -122,7 +123,10 @@ class MultiplePlotWidget(QScrollArea):
         x_max: int = 100,
         line_width: int = 1,
         is_showgrid: bool = True,
+        time_axis: bool = False,
     ) -> None:
+        """Create a graph of the last ``x_max`` values. If ``time_axis`` is True, the values are plotted against the
+        times given to `extend`, otherwise against their index."""
         # Initialize PlotWidget
         plot = PlotWidget(parent=self._parent, title=title)
         plot.setLabel("bottom", x_label, units=x_unit)
@@ -131,7 +135,10 @@ class MultiplePlotWidget(QScrollArea):
         plot.setMinimumSize(300, 300)
 
         plot.enableAutoRange(axis="y", enable=True)
-        plot.setXRange(0, x_max)
+        if time_axis:
+            plot.enableAutoRange(axis="x", enable=True)
+        else:
+            plot.setXRange(0, x_max)
 
         # Initialize PlotDataItem
         pen = pg.mkPen(color="r", width=line_width)
@@ -139,7 +146,7 @@ class MultiplePlotWidget(QScrollArea):
 
         self._plots[title] = plot
         array = np.empty(x_max)
-        self._curves[title] = _RealTimeCurve(curve, array, x_max, 0)
+        self._curves[title] = _RealTimeCurve(curve, array, x_max, 0, np.empty(x_max) if time_axis else None)
 
         # Layout
         self._layout.addWidget(plot)
@@ -157,3 +164,26 @@ class MultiplePlotWidget(QScrollArea):
                 curve.array[:-1] = curve.array[1:]
                 curve.array[-1] = num
                 curve.curve.setData(curve.array)
+
+    def extend(self, data: dict[str, np.ndarray], times: dict[str, np.ndarray] | None = None) -> None:
+        """Append values to the curves. ``times`` holds the time of each value for the curves with a time axis."""
+        for name, values in data.items():
+            curve = self._curves.get(name)
+            if curve is None:
+                continue
+            arrays = [(curve.array, values[-curve.max :])]
+            if curve.times is not None and times is not None:
+                arrays.append((curve.times, times[name][-curve.max :]))
+            size = len(arrays[0][1])
+            for array, new_values in arrays:
+                if curve.counter + size <= curve.max:
+                    array[curve.counter : curve.counter + size] = new_values
+                else:
+                    keep = curve.max - size
+                    array[:keep] = array[curve.counter - keep : curve.counter]
+                    array[keep:] = new_values
+            curve.counter = min(curve.counter + size, curve.max)
+            if curve.times is not None:
+                curve.curve.setData(curve.times[: curve.counter], curve.array[: curve.counter])
+            else:
+                curve.curve.setData(curve.array[: curve.counter])
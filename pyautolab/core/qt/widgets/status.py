@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import TYPE_CHECKING
 
 from qtpy.QtCore import QMargins, QPoint, Signal  # type: ignore
 from qtpy.QtGui import QAction, QContextMenuEvent, QIcon
@@ -7,6 +8,9 @@ from qtpy.QtWidgets import QHBoxLayout, QMainWindow, QMenu, QStatusBar, QWidget
 from pyautolab.core.qt import helper
 from pyautolab.core.utils.system import cpu_usage, physics_mem_usage
 
+if TYPE_CHECKING:
+    from pyautolab.core.runner import RunTelemetry
+
 
 class StatusBarWidget(QWidget):
     """The StatusBarWidget class provides a status bar widget for use status bars.
@@ -190,6 +194,144 @@ class CPUStatus(BaseTimerStatus):
         return f"{cpu_usage()}%"
 
 
+class BaseRunStatus(StatusBarWidget):
+    """The BaseRunStatus class provides a status bar widget that displays the health
+    of the running measurement. Unlike `BaseTimerStatus`, it polls nothing itself: the
+    runner publishes `RunTelemetry` snapshots and each one is passed to
+    `update_telemetry`. The text turns red while the run falls behind.
+
+    Parameters
+    ----------
+    status_name : str
+        The name of the status. This name is used in the widget list that appears
+        when you right-click on the status bar.
+    permanent_text : str
+        The text that describes what the status is.
+    tool_tip : str, default None
+        The tool tip text when hover widget.
+
+    See Also
+    --------
+    SampleRateStatus : Class inherited by this class.
+    QueueDepthStatus : Class inherited by this class.
+    WriterLagStatus : Class inherited by this class.
+    DroppedSamplesStatus : Class inherited by this class.
+    OverrunStatus : Class inherited by this class.
+    """
+
+    def __init__(self, status_name: str, permanent_text: str, tool_tip: str | None = None):
+        super().__init__(status_name, tool_tip)
+        self.update_permanent_text(permanent_text)
+        self.reset()
+
+    def reset(self) -> None:
+        """Show that no measurement is running."""
+        self._tool_btn.setStyleSheet("")
+        self.update_temporary_text("-")
+
+    def update_telemetry(self, telemetry: "RunTelemetry") -> None:
+        """Update temporary text with a snapshot of the running measurement.
+
+        Parameters
+        ----------
+        telemetry : RunTelemetry
+            The latest snapshot the runner published.
+        """
+        self._tool_btn.setStyleSheet("color: #e53935;" if self.is_falling_behind(telemetry) else "")
+        self.update_temporary_text(self.get_text(telemetry))
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        """Return whether the status should be highlighted."""
+        return False
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        """Return formatted text value of ``telemetry``.
+
+        Raises
+        ------
+        NotImplementedError
+        """
+        raise NotImplementedError
+
+
+class SampleRateStatus(BaseRunStatus):
+    """The SampleRateStatus class provides a status bar widget for use status bars.
+    It displays the achieved sample rate against the configured rate."""
+
+    def __init__(self) -> None:
+        super().__init__("Sample Rate", "Rate: ", "The achieved sample rate / the configured sample rate")
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        # The first snapshot is taken before the first ticks are measured.
+        return telemetry.elapsed >= 1 and telemetry.sample_rate < 0.95 * telemetry.target_rate
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        return f"{_format_rate(telemetry.sample_rate)} / {_format_rate(telemetry.target_rate)}"
+
+
+class QueueDepthStatus(BaseRunStatus):
+    """The QueueDepthStatus class provides a status bar widget for use status bars.
+    It displays the number of samples waiting for the slowest consumer of the run."""
+
+    def __init__(self) -> None:
+        super().__init__("Queue Depth", "Queue: ", "The samples in the buffer that a consumer has not read yet")
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        return telemetry.queue_depth > telemetry.queue_capacity / 2
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        return f"{telemetry.queue_depth / telemetry.queue_capacity:.0%}"
+
+
+class WriterLagStatus(BaseRunStatus):
+    """The WriterLagStatus class provides a status bar widget for use status bars.
+    It displays how far the slowest file writer is behind the measurement."""
+
+    def __init__(self) -> None:
+        super().__init__("Writer Lag", "Lag: ", "How far the slowest file writer is behind the measurement")
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        return telemetry.writer_lag >= 1
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        return f"{telemetry.writer_lag:.2f} s"
+
+
+class DroppedSamplesStatus(BaseRunStatus):
+    """The DroppedSamplesStatus class provides a status bar widget for use status bars.
+    It displays the number of samples lost by the file writers."""
+
+    def __init__(self) -> None:
+        super().__init__("Dropped Samples", "Dropped: ", "The samples the file writers lost")
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        return telemetry.dropped > 0
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        return f"{telemetry.dropped}"
+
+
+class OverrunStatus(BaseRunStatus):
+    """The OverrunStatus class provides a status bar widget for use status bars.
+    It displays whether the last tick overran and the number of overruns so far."""
+
+    def __init__(self) -> None:
+        super().__init__("Overrun", "Overrun: ", "Whether the last tick overran / the overruns / the skipped ticks")
+
+    def is_falling_behind(self, telemetry: "RunTelemetry") -> bool:
+        return telemetry.last_tick_overrun
+
+    def get_text(self, telemetry: "RunTelemetry") -> str:
+        last = "yes" if telemetry.last_tick_overrun else "no"
+        return f"{last} ({telemetry.overruns} total, {telemetry.skipped} skipped)"
+
+
+def _format_rate(rate: float) -> str:
+    if rate >= 1000:
+        return f"{rate / 1000:.1f} kHz"
+    return f"{rate:.1f} Hz"
+
+
 class StatusBar(QStatusBar):
     """The QStatusBar class provides a horizontal bar suitable for presenting status
     information. Right-clicking on the status bar will display a list of statuses that
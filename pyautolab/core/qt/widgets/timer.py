@@ -1,26 +1,48 @@
+import math
 from time import perf_counter
 
 from qtpy.QtCore import QObject, QTimer, QTimerEvent
 
+from pyautolab.core.acquisition.scheduler import DeadlineScheduler, OverrunPolicy, SchedulerStats, Tick
+
 
 class AutoLabTimer(QTimer):
     """This timer remembers the number of timeouts and execution time of this timer. You can check the `counter`
     property for checking the current count property and the `time` property for checking the current execution time.
     The count and time resets when the timer stops.
 
+    In absolute deadline mode, the timer fires on the deadlines ``start + k * interval`` of a monotonic nanosecond
+    clock instead of re-arming the same interval, so the period does not drift with the event loop load. Overruns
+    are handled with `overrun_policy` and the jitter and overrun statistics are available from the `stats` property.
+
     Parameters
     ----------
     QObject : QObject
         Parent of this timer., by default None.
+    absolute_deadline : bool, default False
+        Whether to fire on absolute deadlines.
+    overrun_policy : OverrunPolicy, default OverrunPolicy.SKIP
+        How to handle deadlines that passed while the event loop was busy. Only used in absolute deadline mode.
     """
 
-    def __init__(self, parent: QObject | None = None, enable_count: bool = False, enable_clock: bool = False) -> None:
+    def __init__(
+        self,
+        parent: QObject | None = None,
+        enable_count: bool = False,
+        enable_clock: bool = False,
+        absolute_deadline: bool = False,
+        overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+    ) -> None:
         super().__init__(parent=parent)
         self._counter = 0
         self._time = 0
         self._start_time = 0
         self._enable_count = enable_count
         self._enable_clock = enable_clock
+        self._absolute_deadline = absolute_deadline
+        self._overrun_policy = overrun_policy
+        self._scheduler: DeadlineScheduler | None = None
+        self._tick: Tick | None = None
 
     @property
     def counter(self) -> int:
@@ -30,6 +52,16 @@ class AutoLabTimer(QTimer):
     def time(self) -> float:
         return self._time
 
+    @property
+    def stats(self) -> SchedulerStats | None:
+        """The jitter and overrun statistics in absolute deadline mode. None in the other mode."""
+        return None if self._scheduler is None else self._scheduler.stats
+
+    @property
+    def tick(self) -> Tick | None:
+        """The tick of the latest timeout in absolute deadline mode. None in the other mode."""
+        return self._tick
+
     def start(self, msec: int) -> None:
         """Override Qt method to set the starting time[sec]. This start time is used to measure the time since the
         timer started.
@@ -39,19 +71,42 @@ class AutoLabTimer(QTimer):
         msec : int
             Timeout interval of milliseconds.
         """
+        if self._absolute_deadline:
+            self._scheduler = DeadlineScheduler(msec * 1_000_000, self._overrun_policy, spin_ns=0)
+            self._scheduler.start(immediate=False)
+            self.setSingleShot(True)
+            self._arm(self._scheduler)
+            return
         super().start(msec)
         if self._enable_clock:
             self._start_time = perf_counter()
 
+    def _arm(self, scheduler: DeadlineScheduler) -> None:
+        # Qt counts whole milliseconds, so the interval is rounded up to never fire before the deadline.
+        super().start(math.ceil(scheduler.arm() / 1_000_000))
+
     def stop(self) -> None:
         """Override Qt method to reset attribute."""
         super().stop()
         self._counter = 0
         self._time = 0
         self._start_time = 0
+        self._scheduler = None
+        self._tick = None
 
     def timerEvent(self, event: QTimerEvent) -> None:
         """Override Qt method to update parameter"""
+        if (scheduler := self._scheduler) is not None:
+            tick = self._tick = scheduler.tick()
+            if self._enable_count:
+                self._counter += 1
+            if self._enable_clock:
+                self._time = tick.elapsed
+            super().timerEvent(event)
+            # Re-arm after the timeout handlers ran, unless one of them stopped or restarted this timer.
+            if self._scheduler is scheduler:
+                self._arm(scheduler)
+            return
         if self._enable_count:
             self._counter += 1
         if self._enable_clock:
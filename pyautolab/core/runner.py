@@ -0,0 +1,559 @@
+"""
+pyautolab runner
+This file only deals with non-GUI runner features
+"""
+import asyncio
+import ctypes
+import json
+import multiprocessing as mp
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic, perf_counter_ns
+from typing import Any
+
+import numpy as np
+
+from pyautolab.core.acquisition import (
+    JOURNAL_SUFFIX,
+    AcquisitionEngine,
+    ConsumerPolicy,
+    ConsumerStats,
+    DevicePoller,
+    FrameSchema,
+    JournalTail,
+    JournalWriter,
+    Measurer,
+    OverrunPolicy,
+    Profiler,
+    RingReader,
+    SchedulerStats,
+    SharedRingBuffer,
+    Stage,
+    Trigger,
+    TriggeredCapture,
+)
+from pyautolab.core.storage import (
+    Compression,
+    FlushPolicy,
+    MetadataFile,
+    SegmentedSink,
+    SegmentPolicy,
+    Sink,
+    get_process_metadata,
+    get_sink,
+    get_sinks,
+    get_trigger_events_path,
+    recover_interrupted_runs,
+)
+from pyautolab.core.utils.conf import Configuration
+from pyautolab.core.utils.system import create_logger, get_pyautolab_data_folder_path
+
+_logger = create_logger("pyautolab.runner")
+
+
+class SaveWorker:
+    """Write the samples of a storage reader to a sink in its own process.
+
+    If ``journal_path`` is given, samples the reader lost because it fell behind are read back from the journal of the
+    run, so the file stays complete while the producer never waits for the worker. ``metadata`` is stored in the file
+    when it is created, and ``epoch_ns`` is a shared value the runner sets to the wall clock time of the start of the
+    run, which is stored when the run stops. Sinks whose format has no place for metadata store it in a `MetadataFile`
+    next to their file. If the run has ``max_rows`` samples, the file is preallocated. If ``profiler`` is given, the
+    time the sink writes and flushes is recorded to its shared histograms. If ``trigger`` is given, only the samples
+    around its events are written. When the run stops, the number of events is stored in the metadata and their
+    times in `get_trigger_events_path`, since a long run can have more events than the header of a file holds.
+    """
+
+    def __init__(
+        self,
+        sink: type[Sink],
+        schema: FrameSchema,
+        reader: RingReader,
+        save_file_path: Path,
+        flush_policy: FlushPolicy = FlushPolicy(),
+        segment_policy: SegmentPolicy = SegmentPolicy(),
+        journal_path: Path | None = None,
+        metadata: dict[str, Any] | None = None,
+        epoch_ns: ctypes.c_int64 | None = None,
+        max_rows: int | None = None,
+        profiler: Profiler | None = None,
+        trigger: Trigger | None = None,
+    ) -> None:
+        super().__init__()
+        self._sink = sink
+        self._reader = reader
+        self._schema = schema
+        self.stop_event = mp.Event()
+        self._save_file_path = save_file_path
+        self._flush_policy = flush_policy if sink.flush_policy is None else sink.flush_policy
+        self._segment_policy = segment_policy
+        self._journal_path = journal_path
+        self._journal_tail: JournalTail | None = None
+        self._metadata = metadata
+        self._epoch_ns = epoch_ns
+        self._max_rows = max_rows
+        self._profiler = profiler
+        self._trigger = trigger
+        self._metadata_file: MetadataFile | None = None
+
+    def _record(self, stage: Stage, start_ns: int) -> None:
+        if self._profiler is not None:
+            self._profiler.record(stage, self._sink.name, perf_counter_ns() - start_ns)
+
+    def _update_metadata(self, sink: Sink | SegmentedSink, metadata: dict[str, Any]) -> None:
+        sink.update_metadata(metadata)
+        if self._metadata_file is not None:
+            self._metadata_file.update_metadata(metadata)
+
+    def _read(self) -> np.ndarray:
+        start = self._reader.cursor
+        frame = self._reader.read()
+        if self._journal_path is None or (lost := self._reader.cursor - len(frame) - start) <= 0:
+            return frame
+        if self._journal_tail is None:
+            self._journal_tail = JournalTail(self._journal_path)
+        recovered_frame = self._journal_tail.read_rows(start, start + lost)
+        self._reader.count_recovered(len(recovered_frame))
+        return np.concatenate([recovered_frame, frame])
+
+    def _open_sink(self) -> Sink | SegmentedSink:
+        sink: Sink | SegmentedSink
+        if self._segment_policy.is_enabled:
+            sink = SegmentedSink(self._sink, self._save_file_path, self._schema, self._segment_policy)
+        else:
+            sink = self._sink(self._save_file_path, self._schema)
+            # A triggered run keeps a fraction of its samples, so the file is not preallocated.
+            if self._max_rows is not None and self._trigger is None:
+                sink.reserve(self._max_rows)
+            if not self._sink.stores_metadata:
+                self._metadata_file = MetadataFile(self._save_file_path)
+        if self._metadata:
+            self._update_metadata(sink, self._metadata)
+        return sink
+
+    def _wait(self, flush_deadline: float | None) -> None:
+        """Block until there are samples to write, gathered as the sink prefers, or until the `monotonic` time
+        ``flush_deadline``."""
+        if self._reader.lag == 0:
+            self._reader.wait(None if flush_deadline is None else max(0.0, flush_deadline - monotonic()))
+        if 0 < self._reader.lag < self._sink.batch_rows:
+            self._reader.wait(self._sink.batch_latency, self._sink.batch_rows)
+
+    def _flush(self, sink: Sink | SegmentedSink) -> None:
+        start_ns = perf_counter_ns() if self._profiler is not None else 0
+        sink.flush(self._flush_policy.fsync)
+        self._record(Stage.FLUSH, start_ns)
+
+    def _close_sink(self, sink: Sink | SegmentedSink, capture: TriggeredCapture | None) -> None:
+        metadata: dict[str, Any] = {
+            "consumers": {stats.name: stats.to_dict() for stats in self._reader.buffer.stats()}
+        }
+        if self._epoch_ns is not None and self._epoch_ns.value:
+            metadata["epochNs"] = self._epoch_ns.value
+        try:
+            if capture is not None:
+                get_trigger_events_path(self._save_file_path).write_text(json.dumps(capture.event_times))
+                metadata["triggerEventCount"] = capture.events
+            self._update_metadata(sink, metadata)
+        finally:
+            # The samples are saved even if the metadata could not be.
+            sink.flush(self._flush_policy.fsync)
+            sink.close()
+            if self._journal_tail is not None:
+                self._journal_tail.close()
+
+    def start(self) -> None:
+        """Write samples to the sink until the run stops. The worker blocks while there is nothing to write, gathers
+        samples as the sink prefers, and drains the buffer before it returns."""
+        policy = self._flush_policy
+        sink = self._open_sink()
+        capture = None if self._trigger is None else TriggeredCapture(self._trigger, self._schema)
+        unflushed_rows, first_unflushed_time = 0, 0.0
+        while True:
+            stopping = self.stop_event.is_set()
+            if not stopping:
+                is_flush_timed = unflushed_rows > 0 and policy.interval > 0
+                self._wait(first_unflushed_time + policy.interval if is_flush_timed else None)
+
+            # The samples are copied out of the buffer first, so the producer can not overwrite them while the sink
+            # writes them.
+            frame = self._read()
+            is_read = len(frame) > 0
+            if capture is not None and is_read:
+                frame = capture.process(frame)
+            if len(frame):
+                start_ns = perf_counter_ns() if self._profiler is not None else 0
+                sink.write(frame)
+                self._record(Stage.WRITE, start_ns)
+                if unflushed_rows == 0:
+                    first_unflushed_time = monotonic()
+                unflushed_rows += len(frame)
+            elif stopping and not is_read:
+                break
+
+            if unflushed_rows and policy.is_due(unflushed_rows, monotonic() - first_unflushed_time):
+                self._flush(sink)
+                unflushed_rows = 0
+        self._close_sink(sink, capture)
+
+
+def get_active_sinks(names: list[str] | None) -> list[type[Sink]]:
+    """Return the registered sinks of ``names``. Unknown names are ignored and CSV is used if none is left."""
+    sinks = []
+    for name in names or []:
+        if (sink := get_sink(name)) is None:
+            _logger.warning(f'The storage sink "{name}" is not registered.')
+        elif sink not in sinks:
+            sinks.append(sink)
+    if not sinks and (sink := get_sink("csv")) is not None:
+        sinks.append(sink)
+    return sinks
+
+
+def _get_stem_path(save_path: Path) -> Path:
+    if save_path.suffix in {sink.suffix for sink in get_sinks().values()}:
+        return save_path.with_suffix("")
+    return save_path
+
+
+def get_sink_path(save_path: Path, sink: type[Sink]) -> Path:
+    """Return the file path of ``sink`` for the path chosen in the save dialog. All sinks share its stem."""
+    stem_path = _get_stem_path(save_path)
+    return stem_path.with_name(stem_path.name + sink.suffix)
+
+
+def get_profile_path(save_path: Path) -> Path:
+    """Return the path of the performance report of a run, next to the files of its sinks."""
+    stem_path = _get_stem_path(save_path)
+    return stem_path.with_name(stem_path.name + ".profile.json")
+
+
+def get_journal_folder_path() -> Path:
+    folder_path = get_pyautolab_data_folder_path() / "journal"
+    folder_path.mkdir(exist_ok=True)
+    return folder_path
+
+
+def recover_runs() -> list[Path]:
+    """Rebuild the files of the runs that were interrupted before they were saved."""
+    return recover_interrupted_runs(get_journal_folder_path())
+
+
+@dataclass(frozen=True)
+class RunTelemetry:
+    """A snapshot of the health of a running measurement, see `RunSession.get_telemetry`."""
+
+    elapsed: float
+    """Unit is second. The time since the run started."""
+    samples: int
+    """The number of samples measured so far."""
+    sample_rate: float
+    """Unit is hertz. The samples measured per second since the previous snapshot."""
+    target_rate: float
+    """Unit is hertz. The ticks per second of the configured intervals. Streamed blocks add samples to it."""
+    queue_depth: int
+    """The number of samples in the ring buffer that the slowest consumer has not read yet."""
+    queue_capacity: int
+    writer_lag: float
+    """Unit is second. How far the slowest save process is behind the acquisition, at the average sample rate."""
+    dropped: int
+    """The number of samples a save process lost and could not recover from the journal."""
+    overruns: int
+    """The number of ticks that fired late or after skipped deadlines."""
+    skipped: int
+    """The number of deadlines that passed without a tick."""
+    last_tick_overrun: bool
+    """Whether the latest tick of any sampling interval was an overrun."""
+
+
+class RunSession:
+    """Measure devices and save their samples, without a GUI.
+
+    A session owns the acquisition engine, the shared ring buffer, the journal and one save process per sink. The GUI
+    runner adds the display and the controllers of the device tabs to it, and the command-line runner uses it alone.
+
+    Parameters
+    ----------
+    measurers : list[Measurer]
+        The devices to measure.
+    units : dict[str, str]
+        The unit of each parameter of the measurers.
+    save_path : Path
+        The path chosen for the run. Each sink writes a file with the suffix of its format, see `get_sink_path`.
+    settings : Configuration
+        The settings of the runner.
+    interval : float
+        Unit is second. The measuring interval of the devices without an interval of their own.
+    sinks : list[type[Sink]]
+        The sinks to write the run to.
+    max_samples : int | None, default None
+        The number of samples of a finite run. If None, the run continues until it is stopped.
+    display : bool, default False
+        Whether the buffer has a ``display`` consumer, see `display_reader`.
+    trigger : Trigger | None, default None
+        If given, the sinks only save the samples around the events of the trigger. The display and the journal
+        still get every sample.
+    event_loop : asyncio.AbstractEventLoop | None, default None
+        The running event loop to await the async devices on, e.g. the loop they were opened and probed on. If None,
+        the poller runs its own loop, see `DevicePoller`.
+    """
+
+    def __init__(
+        self,
+        measurers: list[Measurer],
+        units: dict[str, str],
+        save_path: Path,
+        settings: Configuration,
+        interval: float,
+        sinks: list[type[Sink]],
+        max_samples: int | None = None,
+        display: bool = False,
+        trigger: Trigger | None = None,
+        event_loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        self.max_samples = max_samples
+        self.trigger = trigger
+        self.sampling_intervals: dict[str, float] = {}
+        """Unit is second. The sampling interval of each measured parameter."""
+        for measurer in measurers:
+            for parameter in measurer.parameters:
+                self.sampling_intervals[parameter] = interval if measurer.interval is None else measurer.interval
+        self.streaming_parameters = [
+            parameter for measurer in measurers if measurer.streaming for parameter in measurer.parameters
+        ]
+        """The parameters measured in blocks, which carry the times of their own samples."""
+        self.profiler = Profiler() if settings.get("runner.profile.enabled") else None
+        """The histograms of the time each stage of the pipeline takes, or None if profiling is switched off. The
+        report is saved next to the files when the run stops, see `get_profile_path`."""
+        self._profile_path = get_profile_path(save_path)
+        self._poller = DevicePoller(
+            measurers,
+            concurrent=settings.get("runner.measure.concurrent"),
+            timeout=settings.get("runner.measure.timeout") / 1000,
+            asynchronous=settings.get("runner.measure.asyncio"),
+            event_loop=event_loop,
+            profiler=self.profiler,
+        )
+
+        # multiprocessing
+        self.data_descriptions = {"Time": "sec", **units}
+        self.timestamp_columns: list[str] = []
+        """The columns of the nanosecond times before and after each device that is not streaming measured."""
+        if settings.get("runner.measure.timestamps"):
+            # The samples of streaming devices carry their own times.
+            for measurer in (measurer for measurer in measurers if not measurer.streaming):
+                self.timestamp_columns.extend(measurer.timestamp_columns)
+            self.data_descriptions.update(dict.fromkeys(self.timestamp_columns, "ns"))
+        self.schema = FrameSchema.from_descriptions(self.data_descriptions)
+        if trigger is not None and trigger.channel not in self.data_descriptions:
+            raise ValueError(f'The trigger channel "{trigger.channel}" is not measured.')
+
+        # journal
+        self._journal: JournalWriter | None = None
+        if settings.get("runner.journal.enabled"):
+            journal_metadata = {
+                "files": {sink.name: str(get_sink_path(save_path, sink)) for sink in sinks},
+                "started": time.time(),
+                "samplingIntervals": self.sampling_intervals,
+                **get_process_metadata(),
+            }
+            # The journal keeps every sample, so a recovered run applies the trigger itself.
+            if trigger is not None:
+                journal_metadata["trigger"] = trigger.to_dict()
+            self._journal = JournalWriter(
+                get_journal_folder_path() / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{JOURNAL_SUFFIX}",
+                self.schema,
+                journal_metadata,
+                settings.get("runner.journal.syncInterval") / 1000,
+            )
+
+        # Storage keeps every sample: it spills to the journal, or blocks the acquisition without a journal.
+        spills = self._journal is not None and settings.get("runner.save.backpressure") == "spill"
+        storage_policy = ConsumerPolicy.DROP_OLDEST if spills else ConsumerPolicy.BLOCK
+        consumers = [sink.name for sink in sinks]
+        policies = [storage_policy for _ in sinks]
+        if display:
+            consumers.insert(0, "display")
+            policies.insert(0, ConsumerPolicy.DROP_OLDEST)
+        # The buffer of a finite run holds all its samples, so it never wraps.
+        self._buffer = SharedRingBuffer(
+            len(self.schema),
+            settings.get("runner.buffer.capacity") if max_samples is None else max_samples,
+            consumers,
+            policies,
+            settings.get("runner.save.blockTimeout") / 1000,
+        )
+        self.display_reader: RingReader | None = self._buffer.reader("display") if display else None
+        self._closed_stats: list[ConsumerStats] | None = None
+        flush_policy = FlushPolicy(
+            settings.get("runner.save.flushRows"),
+            settings.get("runner.save.flushInterval") / 1000,
+            settings.get("runner.save.fsync"),
+        )
+        segment_policy = SegmentPolicy(
+            settings.get("runner.save.segment.maxSize") * 1024**2,
+            settings.get("runner.save.segment.maxDuration") * 60,
+            Compression(settings.get("runner.save.segment.compression")),
+            settings.get("runner.save.segment.maxSegments"),
+        )
+        self._epoch_ns = mp.Value("q", 0, lock=False)
+        self._save_workers: list[SaveWorker] = []
+        self._save_processes: list[mp.Process] = []
+        metadata: dict[str, Any] = {"samplingIntervals": self.sampling_intervals}
+        if trigger is not None:
+            metadata["trigger"] = trigger.to_dict()
+        for sink in sinks:
+            if self.profiler is not None:
+                for stage in (Stage.WRITE, Stage.FLUSH):
+                    self.profiler.histogram(stage, sink.name, shared=True)
+            save_worker = SaveWorker(
+                sink,
+                self.schema,
+                self._buffer.reader(sink.name),
+                get_sink_path(save_path, sink),
+                flush_policy,
+                segment_policy,
+                self._journal.path if spills else None,  # type: ignore
+                metadata,
+                self._epoch_ns,
+                max_samples,
+                self.profiler,
+                trigger,
+            )
+            self._save_workers.append(save_worker)
+            self._save_processes.append(mp.Process(target=save_worker.start, daemon=True))
+
+        # acquisition
+        self._engine = AcquisitionEngine(
+            self._poller,
+            self.schema,
+            interval,
+            self._buffer,
+            OverrunPolicy(settings.get("runner.scheduler.overrunPolicy")),
+            settings.get("runner.frame.maxSamples"),
+            settings.get("runner.frame.maxLatency") / 1000,
+            self._journal,
+            max_samples,
+            self.profiler,
+        )
+        self.stop_event = self._engine.stop_event
+        self._sink_names = {sink.name for sink in sinks}
+        self._telemetry_origin = (0, 0)
+        self._stop_ns = 0
+
+    @property
+    def number_of_samples(self) -> int:
+        """The number of samples measured so far."""
+        return self._engine.number_of_samples
+
+    @property
+    def start_ns(self) -> int:
+        """The `time.perf_counter_ns` time of the start of the run, which the time column is relative to."""
+        return self._engine.start_ns
+
+    @property
+    def scheduler_stats(self) -> SchedulerStats:
+        """The live jitter and overrun statistics of the scheduler of the fastest devices."""
+        return self._engine.stats
+
+    @property
+    def save_process_ids(self) -> dict[str, int | None]:
+        """The process id of the save process of each sink, or None before the run starts."""
+        return {worker._sink.name: process.pid for worker, process in zip(self._save_workers, self._save_processes)}
+
+    def is_finished(self) -> bool:
+        """Whether the acquisition ended by itself, because a finite run measured all its samples or a device
+        failed. Call `stop` to save the files."""
+        return self.stop_event.is_set() and not self._engine.is_running
+
+    def start(self) -> None:
+        for save_process in self._save_processes:
+            save_process.start()
+        if self._journal is not None:
+            self._journal.start()
+        self._engine.start()
+        self._epoch_ns.value = self._engine.epoch_ns
+        self._telemetry_origin = (self.start_ns, 0)
+
+    def stop(self) -> bool:
+        """Stop measuring and wait until every file is saved. Return whether every file was saved."""
+        self._engine.stop()
+        self._stop_ns = perf_counter_ns()
+        for save_worker in self._save_workers:
+            save_worker.stop_event.set()
+        self._buffer.notify()
+        for save_process in self._save_processes:
+            save_process.join()
+        is_saved = all(save_process.exitcode == 0 for save_process in self._save_processes)
+        if self._journal is not None:
+            if is_saved:
+                self._journal.discard()
+            else:
+                self._journal.close()
+                _logger.error(f"A file writer failed. The run is recovered from {self._journal.path} on next start.")
+        self._poller.close()
+        for stats in self.get_consumer_stats():
+            if stats.dropped:
+                _logger.warning(f"The {stats.name} consumer fell behind and lost {stats.dropped} samples.")
+        if self.profiler is not None:
+            self._save_profile()
+        return is_saved
+
+    def _save_profile(self) -> None:
+        assert self.profiler is not None
+        stats = self.scheduler_stats
+        metadata = {
+            "epochNs": self._engine.epoch_ns,
+            "samples": self.number_of_samples,
+            "scheduler": {
+                "ticks": stats.ticks,
+                "meanJitterNs": stats.mean_jitter_ns,
+                "maxJitterNs": stats.max_jitter_ns,
+                "overruns": stats.overruns,
+                "skipped": stats.skipped,
+            },
+            "consumers": {stats.name: stats.to_dict() for stats in self.get_consumer_stats()},
+        }
+        try:
+            self.profiler.save(self._profile_path, metadata)
+        except OSError:
+            _logger.exception(f"The performance report could not be saved to {self._profile_path}.")
+
+    def get_telemetry(self) -> RunTelemetry:
+        """Return a snapshot of the counters the pipeline keeps up to date. It only reads counters, so it is cheap
+        enough to call a few times per second. The sample rate is measured since the previous call, or over the whole
+        run once it stopped."""
+        now_ns, samples = self._stop_ns or perf_counter_ns(), self.number_of_samples
+        origin_ns, origin_samples = (self.start_ns, 0) if self._stop_ns else self._telemetry_origin
+        self._telemetry_origin = (now_ns, samples)
+        elapsed = (now_ns - self.start_ns) / 1e9 if self.start_ns else 0.0
+        consumer_stats = self.get_consumer_stats()
+        sink_lag = max((stats.lag for stats in consumer_stats if stats.name in self._sink_names), default=0)
+        group_stats = self._engine.group_stats
+        return RunTelemetry(
+            elapsed,
+            samples,
+            (samples - origin_samples) / ((now_ns - origin_ns) / 1e9) if self.start_ns and now_ns > origin_ns else 0.0,
+            sum(1 / interval for interval in self._engine.intervals),
+            max((stats.lag for stats in consumer_stats), default=0),
+            self._buffer.capacity,
+            sink_lag / (samples / elapsed) if samples and elapsed else 0.0,
+            sum(stats.dropped for stats in consumer_stats if stats.name in self._sink_names),
+            sum(stats.overruns for stats in group_stats),
+            sum(stats.skipped for stats in group_stats),
+            any(stats.last_overrun for stats in group_stats),
+        )
+
+    def get_consumer_stats(self) -> list[ConsumerStats]:
+        """Return the live backpressure counters of the display and every storage sink, or the last ones if the buffer
+        was released."""
+        if self._closed_stats is not None:
+            return self._closed_stats
+        return self._buffer.stats()
+
+    def close(self) -> None:
+        """Release the shared buffer. Call this after every reader stopped."""
+        self._closed_stats = self._buffer.stats()
+        self._buffer.close()
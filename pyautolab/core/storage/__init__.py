@@ -0,0 +1,27 @@
+from pyautolab.core.storage.csv_file import CsvFileWriter
+from pyautolab.core.storage.npy_file import NpyFileWriter
+from pyautolab.core.storage.recovery import get_process_metadata, recover_interrupted_runs, recover_journal
+from pyautolab.core.storage.runfile import RunFileError, RunFileReader, RunFileWriter
+from pyautolab.core.storage.segment import (
+    Compression,
+    Segment,
+    SegmentedSink,
+    SegmentManifest,
+    SegmentPolicy,
+    get_manifest_path,
+)
+from pyautolab.core.storage.sink import (
+    FlushPolicy,
+    MetadataFile,
+    Sink,
+    get_metadata_path,
+    get_sink,
+    get_sinks,
+    get_trigger_events_path,
+    preallocate,
+    register_sink,
+)
+from pyautolab.core.storage.sqlite_file import SqliteFileWriter, SqliteRunReader
+
+for _sink in (CsvFileWriter, RunFileWriter, NpyFileWriter, SqliteFileWriter):
+    register_sink(_sink)
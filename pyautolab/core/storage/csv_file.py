@@ -0,0 +1,49 @@
+"""
+pyautolab CSV file
+This file only deals with non-GUI storage features
+"""
+import csv
+import os
+from pathlib import Path
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import FrameSchema
+from pyautolab.core.storage.sink import Sink
+
+_WRITE_BUFFER_SIZE = 1 << 20
+
+
+class CsvFileWriter(Sink):
+    """Write frames to a UTF-8 CSV file with a ``name[unit]`` header.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the CSV file. An existing file is overwritten.
+    schema : FrameSchema
+        The columns of the run.
+    """
+
+    name = "csv"
+    title = "CSV UTF-8"
+    suffix = ".csv"
+
+    def __init__(self, path: Path, schema: FrameSchema) -> None:
+        self.path = path
+        self._f = path.open("w", encoding="utf-8-sig", newline="", buffering=_WRITE_BUFFER_SIZE)
+        header = [f"{name}[{unit}]" for name, unit in zip(schema.columns, schema.units)]
+        self._f.write(",".join(header) + "\n")
+        self._writer = csv.writer(self._f)
+
+    def write(self, frame: np.ndarray) -> None:
+        self._writer.writerows(frame.tolist())
+
+    def flush(self, fsync: bool = False) -> None:
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        self._f.close()
@@ -0,0 +1,80 @@
+"""
+pyautolab NPY file
+This file only deals with non-GUI storage features
+"""
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE, FrameSchema
+from pyautolab.core.storage.sink import Sink, preallocate
+
+_MAGIC = b"\x93NUMPY"
+_ALIGNMENT = 64
+
+
+class NpyFileWriter(Sink):
+    """Append frames to a NPY file, which `numpy.load` reads as a structured array.
+
+    Each column is a field named after the parameter, titled like the CSV header ``name[unit]``. The rows are appended
+    as raw bytes and the shape in the header is rewritten on every flush, so the file stays loadable during the run.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the NPY file. An existing file is overwritten.
+    schema : FrameSchema
+        The columns of the run.
+    """
+
+    name = "npy"
+    title = "NumPy array"
+    suffix = ".npy"
+
+    def __init__(self, path: Path, schema: FrameSchema) -> None:
+        self.path = path
+        # Field titles must be unique, so they include the name of the parameter.
+        self._descr = [
+            ((f"{name}[{unit}]", name), np.dtype(DTYPE).str) for name, unit in zip(schema.columns, schema.units)
+        ]
+        self._rows = 0
+        self._row_size = len(schema) * np.dtype(DTYPE).itemsize
+        # Reserve room for the largest shape so the header size never changes.
+        self._header_size = len(self._header(np.iinfo(np.int64).max))
+        self._f = path.open("w+b")
+        self._write_header()
+
+    def _header(self, rows: int, header_size: int | None = None) -> bytes:
+        header = repr({"descr": self._descr, "fortran_order": False, "shape": (rows,)}).encode("latin1")
+        version, length_format = (1, "<H") if len(header) < 65000 else (2, "<I")
+        preamble_size = len(_MAGIC) + 2 + struct.calcsize(length_format)
+        if header_size is None:
+            header_size = -(-(preamble_size + len(header) + 1) // _ALIGNMENT) * _ALIGNMENT
+        header = header.ljust(header_size - preamble_size - 1) + b"\n"
+        return _MAGIC + bytes([version, 0]) + struct.pack(length_format, len(header)) + header
+
+    def _write_header(self) -> None:
+        self._f.seek(0)
+        self._f.write(self._header(self._rows, self._header_size))
+        self._f.seek(self._header_size + self._rows * self._row_size)
+
+    def write(self, frame: np.ndarray) -> None:
+        self._f.write(np.ascontiguousarray(frame, dtype=DTYPE).tobytes())
+        self._rows += len(frame)
+
+    def flush(self, fsync: bool = False) -> None:
+        self._write_header()
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+
+    def reserve(self, rows: int) -> None:
+        preallocate(self._f, self._header_size + rows * self._row_size)
+
+    def close(self) -> None:
+        self.flush()
+        # Reserved rows of a run that stopped early are not part of the array.
+        self._f.truncate(self._header_size + self._rows * self._row_size)
+        self._f.close()
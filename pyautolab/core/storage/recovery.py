@@ -0,0 +1,103 @@
+"""
+pyautolab run recovery
+This file only deals with non-GUI storage features
+"""
+import json
+from pathlib import Path
+from typing import Any
+
+import psutil
+
+from pyautolab.core.acquisition.journal import JOURNAL_SUFFIX, JournalError, JournalReader
+from pyautolab.core.acquisition.trigger import Trigger, TriggeredCapture
+from pyautolab.core.storage.csv_file import CsvFileWriter
+from pyautolab.core.storage.sink import MetadataFile, Sink, get_sink, get_trigger_events_path
+from pyautolab.core.utils.system import create_logger
+
+_logger = create_logger("pyautolab.storage")
+
+_RUN_METADATA_KEYS = ("samplingIntervals", "epochNs", "trigger")
+
+
+def get_process_metadata() -> dict[str, float]:
+    """Return the metadata that identifies the running process in a journal."""
+    process = psutil.Process()
+    return {"pid": process.pid, "processCreateTime": process.create_time()}
+
+
+def _is_process_running(metadata: dict) -> bool:
+    try:
+        return psutil.Process(metadata["pid"]).create_time() == metadata["processCreateTime"]
+    except (psutil.Error, KeyError):
+        return False
+
+
+def recover_journal(path: Path) -> list[Path]:
+    """Rebuild the files of the run of a journal and delete the journal.
+
+    Every file listed in the ``files`` metadata of the journal is rewritten with the sink of its name. A file whose
+    sink is not registered is rebuilt as a CSV file. The metadata of the run is stored as the run would have stored
+    it, in a `MetadataFile` for sinks that have no place for it. If the run had a trigger, only the samples around its
+    events are written, and their times are stored in `get_trigger_events_path`. A segmented run is rebuilt as a
+    single file, since the journal does not record where its segments started.
+
+    Returns
+    -------
+    list[Path]
+        The rebuilt files.
+    """
+    reader = JournalReader(path)
+    writers: list[Sink] = []
+    recovered_paths: list[Path] = []
+    for name, file in reader.metadata.get("files", {}).items():
+        file_path = Path(file)
+        if (sink := get_sink(name)) is None:
+            sink = CsvFileWriter
+            file_path = file_path.with_suffix(sink.suffix)
+        writers.append(sink(file_path, reader.schema))
+        recovered_paths.append(file_path)
+    capture = None
+    if "trigger" in reader.metadata:
+        capture = TriggeredCapture(Trigger.from_dict(reader.metadata["trigger"]), reader.schema)
+    for frame in reader.frames():
+        if capture is not None:
+            frame = capture.process(frame)
+        for writer in writers:
+            writer.write(frame)
+    # Some metadata is appended to the journal after the run started.
+    metadata: dict[str, Any] = {key: reader.metadata[key] for key in _RUN_METADATA_KEYS if key in reader.metadata}
+    if capture is not None:
+        metadata["triggerEventCount"] = capture.events
+    for writer, file_path in zip(writers, recovered_paths):
+        if capture is not None:
+            get_trigger_events_path(file_path).write_text(json.dumps(capture.event_times))
+        if writer.stores_metadata:
+            writer.update_metadata(metadata)
+        else:
+            MetadataFile(file_path).update_metadata(metadata)
+        writer.close()
+    reader.close()
+    if reader.is_torn:
+        _logger.warning(f"{path} ends with a torn record. The run was recovered up to it.")
+    path.unlink()
+    return recovered_paths
+
+
+def recover_interrupted_runs(folder: Path) -> list[Path]:
+    """Recover the runs of the journals in ``folder`` whose process is no longer running.
+
+    Returns
+    -------
+    list[Path]
+        The rebuilt files.
+    """
+    recovered_paths = []
+    for path in sorted(folder.glob(f"*{JOURNAL_SUFFIX}")):
+        try:
+            reader = JournalReader(path)
+            reader.close()
+            if not _is_process_running(reader.metadata):
+                recovered_paths.extend(recover_journal(path))
+        except (JournalError, OSError) as e:
+            _logger.error(f"Failed to recover {path}: {e}")
+    return recovered_paths
@@ -0,0 +1,233 @@
+"""
+pyautolab native run file
+This file only deals with non-GUI storage features
+
+Layout of a run file::
+
+    header  : magic (8 bytes) | version (uint32) | metadata size (uint32) | data offset (uint64) | metadata (JSON)
+    chunk 0 : rows (int64) | first time (float64) | last time (float64) | reserved (int64) | columns
+    chunk 1 : ...
+
+The header is padded to ``data_offset`` so the metadata can be updated in place. Every chunk has the same size and
+stores ``chunk_rows`` rows column by column, so chunk ``k`` starts at ``data_offset + k * chunk size`` and the file
+maps onto a numpy structured array. The first and last time of each chunk form a sparse time index.
+"""
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import DTYPE, FrameSchema
+from pyautolab.core.storage.sink import Sink, preallocate
+
+_MAGIC = b"PYALRUN\x00"
+_VERSION = 1
+_PREAMBLE = struct.Struct("<8sIIQ")
+_HEADER_ALIGNMENT = 4096
+# Room left in the header to update the metadata at the end of a run.
+_METADATA_SLACK = 4096
+
+
+class RunFileError(Exception):
+    """This error raise when a run file is broken or has an unsupported version."""
+
+
+def _chunk_dtype(columns: int, chunk_rows: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("rows", "<i8"),
+            ("first_time", "<f8"),
+            ("last_time", "<f8"),
+            ("reserved", "<i8"),
+            ("data", DTYPE, (columns, chunk_rows)),
+        ]
+    )
+
+
+class RunFileWriter(Sink):
+    """Append frames to a run file.
+
+    Rows are gathered into the current chunk. `flush` writes the current chunk to its slot in the file even when it
+    is not full, so readers see every flushed row, and the chunk is completed in place by later writes.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the run file. An existing file is overwritten.
+    schema : FrameSchema
+        The columns of the run. The first column is the time used by the index.
+    chunk_rows : int, default 4096
+        The number of rows of a chunk.
+    metadata : dict[str, Any] | None, default None
+        Additional metadata of the run, stored as JSON in the header.
+    """
+
+    name = "alrun"
+    title = "pyAutoLab run file"
+    suffix = ".alrun"
+    stores_metadata = True
+
+    def __init__(
+        self, path: Path, schema: FrameSchema, chunk_rows: int = 4096, metadata: dict[str, Any] | None = None
+    ) -> None:
+        self.path = path
+        self.schema = schema
+        self.chunk_rows = chunk_rows
+        self._metadata = {
+            "columns": [{"name": name, "unit": unit} for name, unit in zip(schema.columns, schema.units)],
+            "chunkRows": chunk_rows,
+            "dtype": np.dtype(DTYPE).str,
+            **(metadata or {}),
+        }
+        self._chunk_dtype = _chunk_dtype(len(schema), chunk_rows)
+        self._chunk = np.zeros(1, dtype=self._chunk_dtype)[0]
+        self._chunk_index = 0
+        self._dirty = False
+
+        self._f = path.open("w+b")
+        metadata_bytes = json.dumps(self._metadata).encode()
+        size = _PREAMBLE.size + len(metadata_bytes) + _METADATA_SLACK
+        self._data_offset = -(-size // _HEADER_ALIGNMENT) * _HEADER_ALIGNMENT
+        self._write_header(metadata_bytes)
+        self._reset_chunk()
+
+    def _write_header(self, metadata_bytes: bytes) -> None:
+        if _PREAMBLE.size + len(metadata_bytes) > self._data_offset:
+            raise RunFileError("The metadata does not fit in the header of the run file.")
+        self._f.seek(0)
+        self._f.write(_PREAMBLE.pack(_MAGIC, _VERSION, len(metadata_bytes), self._data_offset))
+        self._f.write(metadata_bytes.ljust(self._data_offset - _PREAMBLE.size, b"\x00"))
+
+    def _reset_chunk(self) -> None:
+        self._chunk["rows"] = 0
+        self._chunk["data"][:] = np.nan
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        self._metadata.update(metadata)
+        self._write_header(json.dumps(self._metadata).encode())
+
+    def write(self, frame: np.ndarray) -> None:
+        data = self._chunk["data"]
+        while len(frame):
+            rows = int(self._chunk["rows"])
+            size = min(len(frame), self.chunk_rows - rows)
+            data[:, rows : rows + size] = frame[:size].T
+            if rows == 0:
+                self._chunk["first_time"] = frame[0, 0]
+            self._chunk["last_time"] = frame[size - 1, 0]
+            self._chunk["rows"] = rows + size
+            self._dirty = True
+            frame = frame[size:]
+            if rows + size == self.chunk_rows:
+                self._write_chunk()
+                self._chunk_index += 1
+                self._reset_chunk()
+
+    def _write_chunk(self) -> None:
+        self._f.seek(self._data_offset + self._chunk_index * self._chunk_dtype.itemsize)
+        self._f.write(self._chunk.tobytes())
+        self._dirty = False
+
+    def flush(self, fsync: bool = False) -> None:
+        if self._dirty:
+            self._write_chunk()
+        self._f.flush()
+        if fsync:
+            os.fsync(self._f.fileno())
+
+    def reserve(self, rows: int) -> None:
+        chunks = -(-rows // self.chunk_rows)
+        preallocate(self._f, self._data_offset + chunks * self._chunk_dtype.itemsize)
+
+    def close(self) -> None:
+        self.flush()
+        # Reserved chunks of a run that stopped early are not part of the run.
+        chunks = self._chunk_index + (self._chunk["rows"] > 0)
+        self._f.truncate(self._data_offset + chunks * self._chunk_dtype.itemsize)
+        self._f.close()
+
+
+class RunFileReader:
+    """Read a run file through a memory map. Opening a file only reads its header.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the run file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            magic, version, metadata_size, data_offset = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != _MAGIC:
+                raise RunFileError(f"{path} is not a run file.")
+            if version > _VERSION:
+                raise RunFileError(f"{path} has an unsupported version {version}.")
+            self.metadata: dict[str, Any] = json.loads(f.read(metadata_size))
+        self.columns: tuple[str, ...] = tuple(column["name"] for column in self.metadata["columns"])
+        self.units: tuple[str, ...] = tuple(column["unit"] for column in self.metadata["columns"])
+        self.schema = FrameSchema(self.columns, self.units)
+        self.chunk_rows: int = self.metadata["chunkRows"]
+
+        chunk_dtype = _chunk_dtype(len(self.columns), self.chunk_rows)
+        # A torn chunk at the end of the file of an interrupted run is ignored.
+        number_of_chunks = max(0, (path.stat().st_size - data_offset) // chunk_dtype.itemsize)
+        if number_of_chunks:
+            self._chunks = np.memmap(path, chunk_dtype, "r", data_offset, (number_of_chunks,))
+        else:
+            self._chunks = np.zeros(0, dtype=chunk_dtype)
+        # Chunks reserved for a finite run that is still running are empty.
+        if len(used_chunks := np.flatnonzero(self._chunks["rows"])) < len(self._chunks):
+            self._chunks = self._chunks[: used_chunks[-1] + 1 if len(used_chunks) else 0]
+        self._rows = np.asarray(self._chunks["rows"])
+        self._offsets = np.concatenate(([0], np.cumsum(self._rows)))
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    @property
+    def time_range(self) -> tuple[float, float] | None:
+        if len(self) == 0:
+            return None
+        return float(self._chunks["first_time"][0]), float(self._chunks["last_time"][self._rows > 0][-1])
+
+    def _chunk_rows(self, index: int, start: int = 0, stop: int | None = None) -> np.ndarray:
+        stop = int(self._rows[index]) if stop is None else stop
+        return self._chunks["data"][index][:, start:stop].T
+
+    def read(self, start_time: float | None = None, end_time: float | None = None) -> np.ndarray:
+        """Return the rows whose time is in ``[start_time, end_time]``.
+
+        The sparse time index finds the first and last chunk with a binary search, so only the chunks of the range
+        are read from the disk.
+        """
+        if len(self) == 0:
+            return self.schema.empty(0)
+        first, last = 0, len(self._rows) - 1
+        if start_time is not None:
+            first = int(np.searchsorted(self._chunks["last_time"][: last + 1], start_time, "left"))
+        if end_time is not None:
+            last = int(np.searchsorted(self._chunks["first_time"][: last + 1], end_time, "right")) - 1
+        blocks = []
+        for index in range(first, last + 1):
+            block = self._chunk_rows(index)
+            if index == first and start_time is not None:
+                block = block[np.searchsorted(block[:, 0], start_time, "left") :]
+            if index == last and end_time is not None:
+                block = block[: np.searchsorted(block[:, 0], end_time, "right")]
+            blocks.append(block)
+        if not blocks:
+            return self.schema.empty(0)
+        return np.concatenate(blocks)
+
+    def column(self, name: str) -> np.ndarray:
+        index = self.schema.index(name)
+        return np.concatenate([self._chunks["data"][i][index, :rows] for i, rows in enumerate(self._rows)])
+
+    def close(self) -> None:
+        if isinstance(self._chunks, np.memmap):
+            self._chunks._mmap.close()  # type: ignore
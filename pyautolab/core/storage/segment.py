@@ -0,0 +1,273 @@
+"""
+pyautolab segmented storage
+This file only deals with non-GUI storage features
+
+A long run can be split into segment files that rotate by size or duration. The segments of ``run.csv`` are
+``run-0001.csv``, ``run-0002.csv``, ... and every segment is a complete file of its sink. Closed segments are
+compressed in a background thread and the manifest ``run.segments.json`` lists the segments with their time
+ranges::
+
+    {"columns": [...], "metadata": {...}, "segments": [{"file": "run-0001.csv.gz", "rows": 36000, ...}, ...]}
+"""
+import gzip
+import json
+import lzma
+import os
+import queue
+import shutil
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import IO, Any
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import FrameSchema
+from pyautolab.core.storage.sink import Sink
+from pyautolab.core.utils.system import create_logger
+
+_logger = create_logger("pyautolab.storage")
+
+_MANIFEST_SUFFIX = ".segments.json"
+
+
+class Compression(Enum):
+    """How closed segments are compressed. zlib writes gzip files, which standard tools can read."""
+
+    NONE = "none"
+    ZLIB = "zlib"
+    LZMA = "lzma"
+
+    @property
+    def suffix(self) -> str:
+        return {"none": "", "zlib": ".gz", "lzma": ".xz"}[self.value]
+
+    @classmethod
+    def of(cls, path: Path) -> "Compression":
+        return {".gz": cls.ZLIB, ".xz": cls.LZMA}.get(path.suffix, cls.NONE)
+
+    def open(self, path: Path, mode: str = "rb") -> IO[bytes]:
+        if self is Compression.ZLIB:
+            return gzip.open(path, mode, compresslevel=6)  # type: ignore
+        if self is Compression.LZMA:
+            return lzma.open(path, mode)  # type: ignore
+        return path.open(mode)  # type: ignore
+
+
+@dataclass(frozen=True)
+class SegmentPolicy:
+    """When a run rotates to a new segment file. A value of 0 disables the rule."""
+
+    max_bytes: int = 0
+    """Rotate when the file of the segment reaches this size. The size is checked after each write and flush."""
+    max_duration: float = 0.0
+    """Unit is second. Rotate when the segment spans this much time of the time column."""
+    compression: Compression = Compression.ZLIB
+    """How closed segments are compressed."""
+    max_segments: int = 0
+    """Delete the oldest segments so that at most this many are kept. Bounds the disk use of endless runs."""
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.max_bytes > 0 or self.max_duration > 0
+
+
+@dataclass(eq=False)
+class Segment:
+    file: str
+    """The file name of the segment, in the directory of the manifest."""
+    rows: int = 0
+    first_time: float | None = None
+    last_time: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"file": self.file, "rows": self.rows, "firstTime": self.first_time, "lastTime": self.last_time}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Segment":
+        return cls(data["file"], data["rows"], data["firstTime"], data["lastTime"])
+
+
+def get_manifest_path(path: Path) -> Path:
+    """Return the manifest path of the segments of ``path``."""
+    return path.with_name(path.stem + _MANIFEST_SUFFIX)
+
+
+class SegmentedSink:
+    """Write a run to rotating segment files of ``sink``.
+
+    Parameters
+    ----------
+    sink : type[Sink]
+        The sink that writes each segment.
+    path : Path
+        The path of the run. Segment files are numbered after its stem.
+    schema : FrameSchema
+        The columns of the run. The first column is the time.
+    policy : SegmentPolicy
+        When to rotate and how to compress the segments.
+    """
+
+    def __init__(self, sink: type[Sink], path: Path, schema: FrameSchema, policy: SegmentPolicy) -> None:
+        self.path = path
+        self.policy = policy
+        self.manifest_path = get_manifest_path(path)
+        self._sink = sink
+        self._schema = schema
+        self._segments: list[Segment] = []
+        self._metadata: dict[str, Any] = {}
+        self._number_of_segments = 0
+        self._writer: Sink | None = None
+        self._lock = threading.Lock()
+        self._compress_queue: queue.SimpleQueue[Segment | None] = queue.SimpleQueue()
+        self._compressor = threading.Thread(target=self._compress, name="pyautolab-compressor", daemon=True)
+        self._compressor.start()
+        self._open_segment()
+
+    def _segment_path(self, segment: Segment) -> Path:
+        return self.path.with_name(segment.file)
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "columns": [{"name": name, "unit": unit} for name, unit in zip(self._schema.columns, self._schema.units)],
+            "metadata": self._metadata,
+            "segments": [segment.to_dict() for segment in self._segments],
+        }
+        temporary_path = self.manifest_path.with_name(self.manifest_path.name + ".part")
+        temporary_path.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(temporary_path, self.manifest_path)
+
+    def _open_segment(self) -> None:
+        self._number_of_segments += 1
+        segment = Segment(f"{self.path.stem}-{self._number_of_segments:04d}{self.path.suffix}")
+        self._writer = self._sink(self._segment_path(segment), self._schema)
+        with self._lock:
+            self._segments.append(segment)
+            if self.policy.max_segments > 0:
+                for old_segment in self._segments[: -self.policy.max_segments]:
+                    self._segment_path(old_segment).unlink(missing_ok=True)
+                del self._segments[: -self.policy.max_segments]
+            self._write_manifest()
+
+    def _close_segment(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        with self._lock:
+            self._write_manifest()
+        if self.policy.compression is not Compression.NONE:
+            self._compress_queue.put(self._segments[-1])
+
+    def _compress(self) -> None:
+        compression = self.policy.compression
+        while (segment := self._compress_queue.get()) is not None:
+            source = self._segment_path(segment)
+            target = source.with_name(source.name + compression.suffix)
+            temporary_path = target.with_name(target.name + ".part")
+            try:
+                with source.open("rb") as f_source, compression.open(temporary_path, "wb") as f_target:
+                    shutil.copyfileobj(f_source, f_target, 1 << 20)
+            except OSError as e:
+                # The segment stays uncompressed.
+                _logger.error(f"Failed to compress {source}: {e}")
+                temporary_path.unlink(missing_ok=True)
+                continue
+            os.replace(temporary_path, target)
+            with self._lock:
+                if segment in self._segments:
+                    segment.file = target.name
+                    self._write_manifest()
+                else:
+                    target.unlink()
+            source.unlink(missing_ok=True)
+
+    def write(self, frame: np.ndarray) -> None:
+        while len(frame):
+            if self._writer is None:
+                self._open_segment()
+            segment = self._segments[-1]
+            rows = len(frame)
+            if self.policy.max_duration > 0:
+                start_time = frame[0, 0] if segment.first_time is None else segment.first_time
+                rows = int(np.searchsorted(frame[:, 0], start_time + self.policy.max_duration, "left"))
+                if rows == 0:
+                    self._close_segment()
+                    continue
+            block, frame = frame[:rows], frame[rows:]
+            self._writer.write(block)  # type: ignore
+            if segment.first_time is None:
+                segment.first_time = float(block[0, 0])
+            segment.last_time = float(block[-1, 0])
+            segment.rows += rows
+            if len(frame) or self._is_full(segment):
+                self._close_segment()
+
+    def _is_full(self, segment: Segment) -> bool:
+        return self.policy.max_bytes > 0 and self._segment_path(segment).stat().st_size >= self.policy.max_bytes
+
+    def flush(self, fsync: bool = False) -> None:
+        if self._writer is None:
+            return
+        self._writer.flush(fsync)
+        # Buffered sinks only reach their size on the disk when they are flushed.
+        if self._is_full(self._segments[-1]):
+            self._close_segment()
+        else:
+            with self._lock:
+                self._write_manifest()
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        self._metadata.update(metadata)
+        if self._writer is not None:
+            self._writer.update_metadata(metadata)
+        with self._lock:
+            self._write_manifest()
+
+    def close(self) -> None:
+        """Close the last segment and wait until every segment is compressed."""
+        self._close_segment()
+        self._compress_queue.put(None)
+        self._compressor.join()
+
+
+class SegmentManifest:
+    """Read the manifest of a segmented run.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the manifest, or the path of the run.
+    """
+
+    def __init__(self, path: Path) -> None:
+        if not path.name.endswith(_MANIFEST_SUFFIX):
+            path = get_manifest_path(path)
+        self.path = path
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        self.columns: tuple[str, ...] = tuple(column["name"] for column in manifest["columns"])
+        self.units: tuple[str, ...] = tuple(column["unit"] for column in manifest["columns"])
+        self.metadata: dict[str, Any] = manifest.get("metadata", {})
+        self.segments = [Segment.from_dict(segment) for segment in manifest["segments"]]
+
+    def __len__(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+    def select(self, start_time: float | None = None, end_time: float | None = None) -> list[Segment]:
+        """Return the segments that have rows in ``[start_time, end_time]``."""
+        return [
+            segment
+            for segment in self.segments
+            if segment.rows
+            and (start_time is None or segment.last_time >= start_time)  # type: ignore
+            and (end_time is None or segment.first_time <= end_time)  # type: ignore
+        ]
+
+    def get_path(self, segment: Segment) -> Path:
+        return self.path.with_name(segment.file)
+
+    def open(self, segment: Segment) -> IO[bytes]:
+        """Open the file of ``segment`` for reading. A compressed segment is decompressed while it is read."""
+        path = self.get_path(segment)
+        return Compression.of(path).open(path, "rb")
@@ -0,0 +1,142 @@
+"""
+pyautolab storage sink interface
+This file only deals with non-GUI storage features
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, ClassVar
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import FrameSchema
+
+
+@dataclass(frozen=True)
+class FlushPolicy:
+    """When a sink flushes its buffered rows to the file.
+
+    Rows are always flushed when the run stops. A value of 0 disables the rule.
+    """
+
+    rows: int = 1000
+    """Flush every this many rows."""
+    interval: float = 1.0
+    """Unit is second. Flush when the oldest unflushed row is this old."""
+    fsync: bool = False
+    """Whether a flush also forces the OS to write the file to the disk."""
+
+    def is_due(self, rows: int, elapsed: float) -> bool:
+        return (0 < self.rows <= rows) or (0 < self.interval <= elapsed)
+
+
+class Sink(ABC):
+    """A storage backend of a run.
+
+    The runner fans the samples out to every active sink. Each sink runs in its own worker process, which creates
+    the sink with the path and schema of the run and calls `write` with batches of samples. The class attributes
+    declare how the worker batches the samples for this sink.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file to write. Its suffix is `suffix`.
+    schema : FrameSchema
+        The columns of the run.
+    """
+
+    name: ClassVar[str]
+    """The identifier of the sink, used in the run configuration."""
+    title: ClassVar[str]
+    """The name of the file format displayed to users."""
+    suffix: ClassVar[str]
+    """The suffix of the file, including the dot."""
+    batch_rows: ClassVar[int] = 1
+    """The number of samples the worker waits for before it calls `write`."""
+    batch_latency: ClassVar[float] = 0.0
+    """Unit is second. The longest time the worker waits for `batch_rows` samples."""
+    flush_policy: ClassVar[FlushPolicy | None] = None
+    """When the worker calls `flush`. If None, the policy of the runner settings is used."""
+    stores_metadata: ClassVar[bool] = False
+    """Whether `update_metadata` stores the metadata in the file. If not, the worker stores it in a `MetadataFile`
+    next to the file."""
+
+    @abstractmethod
+    def __init__(self, path: Path, schema: FrameSchema) -> None:
+        pass
+
+    @abstractmethod
+    def write(self, frame: np.ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def flush(self, fsync: bool = False) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        """Store ``metadata`` of the run, e.g. the counters of the buffer, if the file format has a place for it."""
+
+    def reserve(self, rows: int) -> None:
+        """Preallocate the file for ``rows`` samples. Called before the first write of a run with a known number of
+        samples, if the file format has a fixed size per sample."""
+
+
+def get_metadata_path(path: Path) -> Path:
+    """Return the path of the metadata file of ``path``, the file of a sink that does not store metadata."""
+    return path.with_name(path.name + ".meta.json")
+
+
+def get_trigger_events_path(path: Path) -> Path:
+    """Return the path of the JSON list of the trigger event times of a triggered run, next to the file of a sink."""
+    return path.with_name(path.name + ".events.json")
+
+
+class MetadataFile:
+    """The metadata of a run, stored as JSON next to the file of a sink whose format has no place for it.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the file of the sink. The metadata is stored in `get_metadata_path`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = get_metadata_path(path)
+        self._metadata: dict[str, Any] = {}
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        self._metadata.update(metadata)
+        # The file is replaced at once, so a reader never sees it half written.
+        temporary_path = self.path.with_name(self.path.name + ".part")
+        temporary_path.write_text(json.dumps(self._metadata, indent=1), encoding="utf-8")
+        os.replace(temporary_path, self.path)
+
+
+def preallocate(file: IO[bytes], size: int) -> None:
+    """Allocate ``size`` bytes of disk space for ``file``, so the following writes neither grow nor fragment it."""
+    try:
+        os.posix_fallocate(file.fileno(), 0, size)  # type: ignore
+    except (AttributeError, OSError):
+        # Not every platform or file system supports it.
+        file.truncate(max(size, file.seek(0, os.SEEK_END)))
+
+
+_sinks: dict[str, type[Sink]] = {}
+
+
+def register_sink(sink: type[Sink]) -> None:
+    _sinks[sink.name] = sink
+
+
+def get_sink(name: str) -> type[Sink] | None:
+    return _sinks.get(name)
+
+
+def get_sinks() -> dict[str, type[Sink]]:
+    return dict(_sinks)
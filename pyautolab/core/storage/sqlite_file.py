@@ -0,0 +1,189 @@
+"""
+pyautolab SQLite file
+This file only deals with non-GUI storage features
+
+A database holds any number of runs. Each run is a table named ``run_<id>`` with one REAL column per parameter and
+an index on its time column, and is described in two tables::
+
+    runs        : id | started | stopped | metadata (JSON)
+    run_columns : run | position | name | unit
+
+The database is in WAL mode, so other processes can query a run while it is being written without blocking the
+writer.
+"""
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from pyautolab.core.acquisition.frame import FrameSchema
+from pyautolab.core.storage.sink import FlushPolicy, Sink
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL, stopped REAL, metadata TEXT);
+CREATE TABLE IF NOT EXISTS run_columns (
+    run INTEGER, position INTEGER, name TEXT, unit TEXT, PRIMARY KEY (run, position)
+);
+"""
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _run_table(run: int) -> str:
+    return f"run_{run}"
+
+
+class SqliteFileWriter(Sink):
+    """Write a run to a new table of a SQLite database.
+
+    Rows are inserted with ``executemany`` as they arrive and committed in one transaction per flush, which the
+    flush policy of the sink issues on a timer. Readers in other processes see every committed row.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the database. The run is added to an existing database.
+    schema : FrameSchema
+        The columns of the run. The first column is the time, which is indexed.
+    """
+
+    name = "sqlite"
+    title = "SQLite database"
+    suffix = ".sqlite"
+    stores_metadata = True
+    batch_rows = 256
+    batch_latency = 0.5
+    flush_policy = FlushPolicy(rows=0, interval=0.5)
+
+    def __init__(self, path: Path, schema: FrameSchema) -> None:
+        self.path = path
+        self._metadata: dict[str, Any] = {}
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode, NORMAL only syncs on checkpoints and a crash can only lose the last commits.
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            # Databases written before the metadata column was added.
+            if "metadata" not in {row[1] for row in self._connection.execute("PRAGMA table_info(runs)")}:
+                self._connection.execute("ALTER TABLE runs ADD COLUMN metadata TEXT")
+            self.run = self._connection.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),)).lastrowid
+            self._connection.executemany(
+                "INSERT INTO run_columns VALUES (?, ?, ?, ?)",
+                [(self.run, i, name, unit) for i, (name, unit) in enumerate(zip(schema.columns, schema.units))],
+            )
+            table = _run_table(self.run)
+            columns = ", ".join(f"{_quote(name)} REAL" for name in schema.columns)
+            self._connection.execute(f"CREATE TABLE {table} ({columns})")
+            self._connection.execute(f"CREATE INDEX {table}_time ON {table} ({_quote(schema.columns[0])})")
+        placeholders = ", ".join("?" * len(schema))
+        self._insert = f"INSERT INTO {table} VALUES ({placeholders})"
+
+    def write(self, frame: np.ndarray) -> None:
+        # sqlite3 stores NaN as NULL.
+        self._connection.executemany(self._insert, frame.tolist())
+
+    def flush(self, fsync: bool = False) -> None:
+        self._connection.commit()
+        if fsync:
+            # The checkpoint syncs the WAL and the database file.
+            self._connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def update_metadata(self, metadata: dict[str, Any]) -> None:
+        self._metadata.update(metadata)
+        self._connection.execute("UPDATE runs SET metadata = ? WHERE id = ?", (json.dumps(self._metadata), self.run))
+
+    def close(self) -> None:
+        with self._connection:
+            self._connection.execute("UPDATE runs SET stopped = ? WHERE id = ?", (time.time(), self.run))
+        self._connection.close()
+
+
+class SqliteRunReader:
+    """Read a run of a SQLite database, which may still be being written by another process.
+
+    The database is opened read-only. Every query sees the rows committed before it started.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the database.
+    run : int | None, default None
+        The id of the run. If None, the latest run is read.
+    """
+
+    def __init__(self, path: Path, run: int | None = None) -> None:
+        self.path = path
+        self._connection = sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)
+        if run is None:
+            (run,) = self._connection.execute("SELECT max(id) FROM runs").fetchone()
+            if run is None:
+                raise ValueError(f"{path} has no runs.")
+        self.run: int = run
+        columns = self._connection.execute(
+            "SELECT name, unit FROM run_columns WHERE run = ? ORDER BY position", (run,)
+        ).fetchall()
+        if not columns:
+            raise ValueError(f"{path} has no run {run}.")
+        self.columns: tuple[str, ...] = tuple(name for name, _ in columns)
+        self.units: tuple[str, ...] = tuple(unit for _, unit in columns)
+        self.schema = FrameSchema(self.columns, self.units)
+        self._table = _run_table(run)
+        self._time = _quote(self.columns[0])
+
+    @staticmethod
+    def runs(path: Path) -> list[tuple[int, float, float | None]]:
+        """Return the id, start time and stop time of every run in the database. The stop time of a run which is
+        still being written is None."""
+        with closing(sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)) as connection:
+            return connection.execute("SELECT id, started, stopped FROM runs ORDER BY id").fetchall()
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        (metadata,) = self._connection.execute("SELECT metadata FROM runs WHERE id = ?", (self.run,)).fetchone()
+        return {} if metadata is None else json.loads(metadata)
+
+    @property
+    def is_running(self) -> bool:
+        (stopped,) = self._connection.execute("SELECT stopped FROM runs WHERE id = ?", (self.run,)).fetchone()
+        return stopped is None
+
+    def __len__(self) -> int:
+        return self._connection.execute(f"SELECT count(*) FROM {self._table}").fetchone()[0]
+
+    @property
+    def time_range(self) -> tuple[float, float] | None:
+        sql = f"SELECT min({self._time}), max({self._time}) FROM {self._table}"
+        first, last = self._connection.execute(sql).fetchone()
+        if first is None:
+            return None
+        return first, last
+
+    def _fetch(self, sql: str, parameters: tuple = ()) -> np.ndarray:
+        rows = self._connection.execute(sql, parameters).fetchall()
+        if not rows:
+            return self.schema.empty(0)
+        # NULL is read back as NaN.
+        return np.array(rows, dtype=float)
+
+    def read(self, start_time: float | None = None, end_time: float | None = None) -> np.ndarray:
+        """Return the rows whose time is in ``[start_time, end_time]``, looked up with the time index."""
+        start_time = -np.inf if start_time is None else start_time
+        end_time = np.inf if end_time is None else end_time
+        return self._fetch(
+            f"SELECT * FROM {self._table} WHERE {self._time} BETWEEN ? AND ? ORDER BY {self._time}",
+            (start_time, end_time),
+        )
+
+    def column(self, name: str) -> np.ndarray:
+        self.schema.index(name)
+        return self._fetch(f"SELECT {_quote(name)} FROM {self._table} ORDER BY rowid")[:, 0]
+
+    def close(self) -> None:
+        self._connection.close()
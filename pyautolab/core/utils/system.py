@@ -25,8 +25,21 @@ def cpu_usage():
     return psutil.cpu_percent(interval=0)
 
 
+_virtual_ports: dict[str, ListPortInfo] = {}
+
+
+def register_virtual_port(port: ListPortInfo) -> None:
+    """Make ``port`` searchable like a hardware port, e.g. the pseudo-terminal of a simulated instrument."""
+    _virtual_ports[port.device] = port
+
+
+def unregister_virtual_port(device: str) -> None:
+    _virtual_ports.pop(device, None)
+
+
 def search_ports(filter: str) -> list[ListPortInfo]:
-    return [port for port in list_ports.comports() if filter in port.description]
+    ports = [*list_ports.comports(), *_virtual_ports.values()]
+    return [port for port in ports if filter in port.description]
 
 
 def get_pyautolab_data_folder_path() -> Path:
@@ -0,0 +1,4 @@
+"""
+pyautolab simulator plugin
+Virtual instruments served on pseudo-terminals, to run and benchmark the measurement pipeline without hardware.
+"""
@@ -0,0 +1,158 @@
+import os
+from typing import ClassVar
+
+import numpy as np
+import serial
+
+from pyautolab.core.acquisition import Block
+from pyautolab.core.plugin import Device, StreamingDevice
+from pyautolab.core.utils.system import register_virtual_port, unregister_virtual_port
+from pyautolab.plugins.simulator.server import InstrumentServer, Waveform
+
+SIMULATED_PORT = "simulated"
+"""The port of a simulated instrument until it is opened and serves its own pseudo-terminal."""
+
+
+def _is_sample(line: bytes) -> bool:
+    try:
+        _, _ = (float(text) for text in line.split())
+    except ValueError:
+        return False
+    return True
+
+
+class SimulatedInstrument(Device):
+    """An instrument of the simulator. An opened instance serves its own virtual instrument on a pseudo-terminal and
+    talks to it through pyserial, so the port is listed and opened like that of a real instrument. The server only
+    runs while the instrument is open."""
+
+    title: ClassVar[str]
+    waveform: ClassVar[Waveform]
+    parameter: ClassVar[str]
+    unit: ClassVar[str] = "V"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.baudrate = "115200"
+        self.frequency = 1.0
+        """Unit is hertz."""
+        self.amplitude = 1.0
+        self.latency = 0
+        """Unit is millisecond. The time the instrument takes to answer a query."""
+        self._serial = serial.Serial()
+        self.server: InstrumentServer | None = None
+        self.port = SIMULATED_PORT
+
+    def open(self) -> None:
+        port = self.port
+        if port == SIMULATED_PORT:
+            # Pseudo-terminals only exist on POSIX systems.
+            if not hasattr(os, "openpty"):
+                raise OSError(f"{self.title} needs pseudo-terminals, which this system does not have.")
+            if self.server is None:
+                self.server = InstrumentServer(self.waveform, self.title)
+                register_virtual_port(self.server.port_info)
+            port = self.server.port
+        self._serial = serial.Serial(port, int(self.baudrate), timeout=1)
+        self.configure()
+
+    def configure(self) -> None:
+        """Send the output settings to the instrument."""
+        self._serial.timeout = 1 + 2 * self.latency / 1000
+        for command in (
+            f"WAVE {self.waveform.value}",
+            f"FREQ {self.frequency}",
+            f"AMPL {self.amplitude}",
+            f"LAT {self.latency}",
+        ):
+            self.send(command)
+
+    def close(self) -> None:
+        self._serial.close()
+        if self.server is not None:
+            unregister_virtual_port(self.server.port)
+            self.server.close()
+            self.server = None
+
+    def receive(self) -> str:
+        if not self._serial.in_waiting:
+            return ""
+        return self._serial.readline().decode().strip()
+
+    def send(self, message: str) -> None:
+        self._serial.write(f"{message}\n".encode())
+
+    def reset_buffer(self) -> None:
+        self._serial.reset_input_buffer()
+        self._serial.reset_output_buffer()
+
+    def measure(self) -> dict[str, float]:
+        self.send("MEAS?")
+        reply = self._serial.readline()
+        if not reply.endswith(b"\n"):
+            raise TimeoutError(f"{self.title} did not answer in {self._serial.timeout} s.")
+        return {self.parameter: float(reply)}
+
+
+class SineGenerator(SimulatedInstrument):
+    title = "Sine Generator"
+    waveform = Waveform.SINE
+    parameter = "Sine"
+
+
+class NoiseGenerator(SimulatedInstrument):
+    title = "Noise Generator"
+    waveform = Waveform.NOISE
+    parameter = "Noise"
+
+
+class StepGenerator(SimulatedInstrument):
+    title = "Step Generator"
+    waveform = Waveform.STEP
+    parameter = "Step"
+
+
+class SimulatedDaq(SimulatedInstrument, StreamingDevice):
+    """A data acquisition device of the simulator that streams its output at ``sample_rate`` and returns the
+    streamed samples in blocks. Samples the pseudo-terminal could not hold are lost, as with a hardware FIFO, so the
+    DAQ must be polled often enough at high rates."""
+
+    title = "Simulated DAQ"
+    waveform = Waveform.SINE
+    parameter = "DAQ"
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.sample_rate = 1000.0
+        """Unit is hertz."""
+        self._pending = b""
+
+    def configure(self) -> None:
+        # The stream restarts, so a run does not get the samples streamed before it. The stream stopped when the
+        # reply to the identification query arrives.
+        self.send("STRM 0")
+        self.send("*IDN?")
+        while not (line := self._serial.readline()).startswith(b"pyAutoLab,"):
+            if not line.endswith(b"\n"):
+                raise TimeoutError(f"{self.title} did not answer in {self._serial.timeout} s.")
+        self._pending = b""
+        super().configure()
+        self.send(f"STRM {self.sample_rate}")
+
+    def close(self) -> None:
+        if self._serial.is_open:
+            self.send("STRM 0")
+        super().close()
+
+    def measure(self) -> Block:
+        data = self._pending + self._serial.read(self._serial.in_waiting)
+        lines, _, self._pending = data.rpartition(b"\n")
+        try:
+            samples = np.array(lines.split(), dtype=np.float64).reshape(-1, 2)
+        except ValueError:
+            # The DAQ was not read in time and the instrument cut off a line, which is skipped.
+            samples = np.array(
+                [line.split() for line in lines.splitlines() if _is_sample(line)], dtype=np.float64
+            ).reshape(-1, 2)
+        # The sample indexes keep the times right when samples were lost.
+        return Block({self.parameter: samples[:, 1]}, times=samples[:, 0] / self.sample_rate)
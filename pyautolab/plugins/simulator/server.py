@@ -0,0 +1,184 @@
+"""
+pyautolab simulated instruments
+This file only deals with non-GUI simulator features
+
+A virtual instrument answers on the slave end of a pseudo-terminal, so clients talk to it through pyserial as to a
+real serial instrument. Commands and replies are lines that end with a newline::
+
+    *IDN?            Reply the identification of the instrument.
+    MEAS?            Reply the output at the current time, after the response latency.
+    WAVE <name>      Set the waveform of the output: sine, noise or step.
+    FREQ <hertz>     Set the frequency of the sine wave and of the steps.
+    AMPL <value>     Set the amplitude of the output.
+    LAT <msec>       Set the response latency of the queries.
+    STRM <hertz>     Stream the output at this sample rate, one "<sample index> <value>" per line. 0 stops the
+                     stream. The index counts from 0, so a client can tell which samples it lost when it fell
+                     behind and the pseudo-terminal overflowed.
+"""
+import os
+import select
+import threading
+import time
+import tty
+from enum import Enum
+
+import numpy as np
+from serial.tools.list_ports_common import ListPortInfo
+
+_POLL_INTERVAL = 0.005
+_WRITE_TIMEOUT = 0.1
+
+
+class Waveform(Enum):
+    SINE = "sine"
+    NOISE = "noise"
+    STEP = "step"
+
+    def values(self, times: np.ndarray, frequency: float, amplitude: float, rng: np.random.Generator) -> np.ndarray:
+        """Return the output at ``times`` in seconds."""
+        if self is Waveform.SINE:
+            return amplitude * np.sin(2 * np.pi * frequency * times)
+        if self is Waveform.NOISE:
+            return rng.normal(0.0, amplitude, len(times))
+        # The output steps between 0 and the amplitude twice per period.
+        return amplitude * (np.floor(2 * frequency * times) % 2)
+
+
+class InstrumentServer:
+    """Serve a virtual instrument on a new pseudo-terminal until `close` is called.
+
+    Parameters
+    ----------
+    waveform : Waveform, default Waveform.SINE
+        The initial waveform of the output.
+    name : str, default "Simulator"
+        The name of the instrument, shown in the description of its port.
+    """
+
+    def __init__(self, waveform: Waveform = Waveform.SINE, name: str = "Simulator") -> None:
+        self.name = name
+        self.waveform = waveform
+        self.frequency = 1.0
+        self.amplitude = 1.0
+        self.latency = 0.0
+        """Unit is second."""
+        self.stream_rate = 0.0
+        """Unit is hertz."""
+        self.dropped = 0
+        """The number of bytes the client did not read in time, like the overflow of a hardware FIFO."""
+        self._is_cut = False
+        self._master, self._slave = os.openpty()
+        # The slave end is kept open, so the master end does not fail while no client has the port open.
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        self._origin = time.perf_counter()
+        self._rng = np.random.default_rng()
+        self._write_lock = threading.RLock()
+        self._stream_changed = threading.Event()
+        self._closed = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._serve, name="pyautolab-simulator", daemon=True),
+            threading.Thread(target=self._stream, name="pyautolab-simulator-stream", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def port_info(self) -> ListPortInfo:
+        info = ListPortInfo(self.port, skip_link_detection=True)
+        info.description = f"{self.name} (simulated)"
+        info.manufacturer = "pyAutoLab Simulator"
+        return info
+
+    def close(self) -> None:
+        self._closed.set()
+        self._stream_changed.set()
+        for thread in self._threads:
+            thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _write(self, data: bytes) -> None:
+        with self._write_lock:
+            if self._is_cut:
+                # The line that was cut off is ended, so the following lines can be read again.
+                data = b"\n" + data
+                self._is_cut = False
+            deadline = time.perf_counter() + _WRITE_TIMEOUT
+            while data:
+                try:
+                    data = data[os.write(self._master, data) :]
+                except BlockingIOError:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not select.select([], [self._master], [], remaining)[1]:
+                        self.dropped += len(data)
+                        self._is_cut = True
+                        return
+
+    def _serve(self) -> None:
+        pending = b""
+        while not self._closed.is_set():
+            if not select.select([self._master], [], [], 0.1)[0]:
+                continue
+            try:
+                pending += os.read(self._master, 4096)
+            except (BlockingIOError, OSError):
+                continue
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if (reply := self._handle(line.decode(errors="replace").strip())) is not None:
+                    self._write(f"{reply}\n".encode())
+
+    def _handle(self, command: str) -> str | None:
+        name, _, argument = command.partition(" ")
+        try:
+            if name == "*IDN?":
+                return f"pyAutoLab,{self.name},0,1.0"
+            if name == "MEAS?":
+                time.sleep(self.latency)
+                times = np.array([time.perf_counter() - self._origin])
+                return repr(float(self.waveform.values(times, self.frequency, self.amplitude, self._rng)[0]))
+            if name == "WAVE":
+                self.waveform = Waveform(argument.lower())
+            elif name == "FREQ":
+                self.frequency = float(argument)
+            elif name == "AMPL":
+                self.amplitude = float(argument)
+            elif name == "LAT":
+                self.latency = float(argument) / 1000
+            elif name == "STRM":
+                rate = max(0.0, float(argument))
+                # No value of the previous stream follows the replies to the commands after this one.
+                with self._write_lock:
+                    self.stream_rate = rate
+                    self._stream_changed.set()
+            elif name:
+                return f"ERR unknown command {name}"
+        except ValueError:
+            return f"ERR invalid argument {argument}"
+        return None
+
+    def _stream(self) -> None:
+        while not self._closed.is_set():
+            self._stream_changed.wait()
+            self._stream_changed.clear()
+            rate = self.stream_rate
+            if rate <= 0:
+                continue
+            start, sent = time.perf_counter(), 0
+            # The samples are evenly spaced on the clock of the instrument, however late the thread wakes up.
+            while not self._stream_changed.wait(_POLL_INTERVAL):
+                due = int((time.perf_counter() - start) * rate)
+                if due <= sent:
+                    continue
+                indexes = np.arange(sent, due)
+                values = self.waveform.values(
+                    indexes / rate + (start - self._origin), self.frequency, self.amplitude, self._rng
+                )
+                lines = "".join(f"{index} {value:.9g}\n" for index, value in zip(indexes.tolist(), values.tolist()))
+                with self._write_lock:
+                    if self._stream_changed.is_set():
+                        break
+                    self._write(lines.encode())
+                sent = due
@@ -0,0 +1,50 @@
+from qtpy.QtWidgets import QDoubleSpinBox, QFormLayout, QSpinBox
+
+from pyautolab import api
+from pyautolab.plugins.simulator.device import SimulatedDaq, SimulatedInstrument
+
+
+class SimulatorTab(api.DeviceTab):
+    def __init__(self, device: SimulatedInstrument) -> None:
+        super().__init__(device)
+        self.device: SimulatedInstrument = device
+        self.spinbox_frequency = QDoubleSpinBox()
+        self.spinbox_amplitude = QDoubleSpinBox()
+        self.spinbox_latency = QSpinBox()
+
+        self.spinbox_frequency.setRange(0.001, 100000)
+        self.spinbox_frequency.setDecimals(3)
+        self.spinbox_frequency.setValue(device.frequency)
+        self.spinbox_amplitude.setRange(0, 1000)
+        self.spinbox_amplitude.setValue(device.amplitude)
+        self.spinbox_latency.setRange(0, 10000)
+        self.spinbox_latency.setValue(device.latency)
+
+        self.form_layout = QFormLayout(self)
+        self.form_layout.addRow("Frequency", api.qt.add_unit(self.spinbox_frequency, "Hz"))
+        self.form_layout.addRow("Amplitude", api.qt.add_unit(self.spinbox_amplitude, device.unit))
+        self.form_layout.addRow("Response latency", api.qt.add_unit(self.spinbox_latency, "msec"))
+
+    def setup_settings(self) -> None:
+        self.device.frequency = self.spinbox_frequency.value()
+        self.device.amplitude = self.spinbox_amplitude.value()
+        self.device.latency = self.spinbox_latency.value()
+        self.device.configure()
+
+    def get_parameters(self) -> dict[str, str] | None:
+        return {self.device.parameter: self.device.unit}
+
+
+class SimulatedDaqTab(SimulatorTab):
+    def __init__(self, device: SimulatedDaq) -> None:
+        super().__init__(device)
+        self.device: SimulatedDaq = device
+        self.spinbox_sample_rate = QDoubleSpinBox()
+
+        self.spinbox_sample_rate.setRange(1, 100000)
+        self.spinbox_sample_rate.setValue(device.sample_rate)
+        self.form_layout.addRow("Sample rate", api.qt.add_unit(self.spinbox_sample_rate, "Hz"))
+
+    def setup_settings(self) -> None:
+        self.device.sample_rate = self.spinbox_sample_rate.value()
+        super().setup_settings()
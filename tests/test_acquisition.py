@@ -0,0 +1,675 @@
+import asyncio
+import json
+import math
+import multiprocessing as mp
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from pyautolab.core.acquisition import (
+    AcquisitionEngine,
+    Block,
+    ConsumerPolicy,
+    DeadlineScheduler,
+    DevicePoller,
+    FrameBuilder,
+    FrameSchema,
+    Histogram,
+    JournalTail,
+    JournalWriter,
+    Measurer,
+    OverrunPolicy,
+    SharedRingBuffer,
+    Slope,
+    Stage,
+    Trigger,
+    TriggeredCapture,
+    TriggerMode,
+)
+from pyautolab.core.benchmark import Scenario, find_regressions, run_benchmark
+from pyautolab.core.runner import RunSession, SaveWorker, get_active_sinks, get_profile_path
+from pyautolab.core.storage import RunFileReader, get_metadata_path, get_trigger_events_path
+from pyautolab.core.utils.conf import Configuration
+
+
+def _measurer(name: str, value: float, delay: float = 0) -> Measurer:
+    def measure() -> dict[str, float]:
+        time.sleep(delay)
+        return {name: value}
+
+    return Measurer(name, measure, [name])
+
+
+def test_poller_sequential() -> None:
+    poller = DevicePoller([_measurer("a", 1), _measurer("b", 2, delay=0.01)])
+    poller.origin_ns = time.perf_counter_ns()
+    measurements = poller.poll()
+    assert {name: measurements[name] for name in "ab"} == {"a": 1, "b": 2}
+    # Each device is stamped in integer nanoseconds just before and after it measured.
+    stamps = [measurements[f"{name} {stamp}"] for name in "ab" for stamp in ("Start", "End")]
+    assert all(isinstance(stamp, int) for stamp in stamps)
+    assert 0 <= stamps[0] <= stamps[1] <= stamps[2] < stamps[3]
+    assert stamps[3] - stamps[2] >= 10_000_000
+    poller.close()
+
+
+def test_poller_concurrent_marks_late_device_missing() -> None:
+    slow = _measurer("slow", 2, delay=0.3)
+    poller = DevicePoller([_measurer("fast", 1, delay=0.05), slow], concurrent=True, timeout=0.1)
+    start = time.perf_counter()
+    measurements = poller.poll()
+    assert time.perf_counter() - start < 0.25
+    assert measurements["fast"] == 1
+    assert math.isnan(measurements["slow"])
+    # The slow device is still busy, so it must not be called again.
+    assert math.isnan(poller.poll()["slow"])
+    assert slow.missed == 2
+    poller.close()
+
+
+def _async_measurer(name: str, value: float, delay: float) -> Measurer:
+    async def measure() -> dict[str, float]:
+        await asyncio.sleep(delay)
+        return {name: value}
+
+    return Measurer(name, measure, [name])
+
+
+def test_poller_asynchronous_overlaps_device_waits() -> None:
+    measurers = [_async_measurer(f"a{i}", i, 0.1) for i in range(20)]
+    poller = DevicePoller([*measurers, _measurer("sync", -1, delay=0.1), _async_measurer("late", 0, 0.3)], timeout=0.2)
+    # A poller with async devices always polls on its event loop.
+    assert poller.is_asynchronous
+    threads = threading.active_count()
+    start = time.perf_counter()
+    measurements = poller.poll()
+    assert time.perf_counter() - start < 0.25
+    assert [measurements[f"a{i}"] for i in range(20)] == list(range(20))
+    assert measurements["sync"] == -1
+    assert math.isnan(measurements["late"])
+    # The async devices share the thread of the loop, only the blocking device has a worker thread.
+    assert threading.active_count() - threads <= 1
+    poller.close()
+
+
+def test_run_session_polls_async_devices_on_the_given_event_loop(tmp_path: Path) -> None:
+    loops = set()
+
+    async def measure() -> dict[str, float]:
+        loops.add(asyncio.get_running_loop())
+        return {"a": 1}
+
+    event_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=event_loop.run_forever, daemon=True)
+    thread.start()
+    session = RunSession(
+        [Measurer("a", measure, ["a"])],
+        {"a": "V"},
+        tmp_path / "run.csv",
+        Configuration(),
+        0.001,
+        get_active_sinks(["csv"]),
+        10,
+        event_loop=event_loop,
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    # The loop belongs to the caller, so it keeps running for the next calls of its devices.
+    assert loops == {event_loop}
+    assert event_loop.is_running()
+    event_loop.call_soon_threadsafe(event_loop.stop)
+    thread.join()
+    event_loop.close()
+
+
+def test_engine_writes_frames_to_buffer() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "a": "V", "b": "A"})
+    buffer = SharedRingBuffer(len(schema), 1024, ["display", "storage"])
+    display, storage = buffer.reader("display"), buffer.reader("storage")
+    engine = AcquisitionEngine(DevicePoller([_measurer("a", 1)]), schema, 0.01, buffer, frame_size=5, frame_latency=1)
+    before_ns = time.time_ns()
+    engine.start()
+    time.sleep(0.2)
+    engine.stop()
+    assert not engine.is_running
+    assert before_ns <= engine.epoch_ns <= time.time_ns()
+    samples = display.read()
+    assert len(samples) >= 10
+    assert np.all(np.diff(samples[:, 0]) > 0)
+    assert np.all(samples[:, 1] == 1)
+    # Parameters that no device returned are missing.
+    assert np.all(np.isnan(samples[:, 2]))
+    # Every consumer reads the same samples through its own cursor.
+    np.testing.assert_array_equal(storage.read(), samples)
+    buffer.close()
+
+
+def test_engine_samples_each_device_at_its_own_interval() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "fast": "V", "slow": "K"})
+    buffer = SharedRingBuffer(len(schema), 1024, ["display"])
+    slow = _measurer("slow", 2, delay=0.03)
+    slow.interval = 0.1
+    poller = DevicePoller([_measurer("fast", 1), slow])
+    engine = AcquisitionEngine(poller, schema, 0.01, buffer, frame_latency=0.02)
+    assert engine.intervals == [0.01, 0.1]
+    engine.start()
+    time.sleep(0.5)
+    engine.stop()
+    poller.close()
+    samples = buffer.reader("display").read()
+    fast, slow_samples = samples[~np.isnan(samples[:, 1])], samples[~np.isnan(samples[:, 2])]
+    # Each device only fills the rows of its own ticks.
+    assert np.all(np.isnan(fast[:, 2])) and np.all(np.isnan(slow_samples[:, 1]))
+    assert 40 <= len(fast) <= 51
+    assert 5 <= len(slow_samples) <= 6
+    # The slow device does not hold back the fast one and the rows stay in time order.
+    assert np.max(np.diff(fast[:, 0])) < 0.03
+    assert np.all(np.diff(samples[:, 0]) >= 0)
+    buffer.close()
+
+
+def test_engine_keeps_the_rates_of_other_intervals_while_a_consumer_blocks() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "fast": "V", "slow": "K"})
+    # The storage consumer never reads, so every write waits for it until the timeout.
+    buffer = SharedRingBuffer(len(schema), 4, ["storage"], [ConsumerPolicy.BLOCK], block_timeout=0.2)
+    slow = _measurer("slow", 2)
+    slow.interval = 0.005
+    poller = DevicePoller([_measurer("fast", 1), slow])
+    engine = AcquisitionEngine(poller, schema, 0.002, buffer, frame_latency=0.1)
+    engine.start()
+    time.sleep(0.6)
+    engine.stop()
+    poller.close()
+    # The thread that writes waits for the consumer, the other one keeps measuring at its rate. Either thread may be
+    # the one that writes, and they can swap when the frames waiting to be written run out.
+    ticks = [stats.ticks / (0.6 / interval) for stats, interval in zip(engine.group_stats, engine.intervals)]
+    assert sum(ticks) > 1
+    buffer.close()
+
+
+def test_engine_stops_after_max_samples() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "a": "V"})
+    buffer = SharedRingBuffer(len(schema), 25, ["display"])
+    engine = AcquisitionEngine(DevicePoller([_measurer("a", 1)]), schema, 0.001, buffer, max_samples=25)
+    engine.start()
+    assert engine.stop_event.wait(5)
+    time.sleep(0.05)
+    assert not engine.is_running
+    assert engine.number_of_samples == 25
+    reader = buffer.reader("display")
+    assert len(reader.read()) == 25 and reader.overflow == 0
+    engine.stop()
+    buffer.close()
+
+
+def test_run_session_saves_without_qt(tmp_path: Path) -> None:
+    session = RunSession(
+        [_measurer("a", 1)], {"a": "V"}, tmp_path / "run.csv", Configuration(), 0.001, get_active_sinks(["csv"]), 20
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    assert session.number_of_samples == 20
+    assert len((tmp_path / "run.csv").read_text(encoding="utf-8-sig").splitlines()) == 21
+    # The command-line runner must work on a machine without a display.
+    code = "import sys, pyautolab.cli; assert not [m for m in sys.modules if m.startswith('qtpy')]"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_run_session_stores_metadata_of_csv_runs_next_to_the_file(tmp_path: Path) -> None:
+    started_ns = time.time_ns()
+    session = RunSession(
+        [_measurer("a", 1)], {"a": "V"}, tmp_path / "run.csv", Configuration(), 0.001, get_active_sinks(["csv"]), 20
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    metadata = json.loads(get_metadata_path(tmp_path / "run.csv").read_text(encoding="utf-8"))
+    # The wall clock anchor of the time column.
+    assert started_ns <= metadata["epochNs"] <= time.time_ns()
+    assert metadata["samplingIntervals"] == {"a": 0.001}
+    assert metadata["consumers"]["csv"]["dropped"] == 0
+
+
+class _ProfiledConfiguration(Configuration):
+    def get(self, setting_name: str) -> Any:
+        return True if setting_name == "runner.profile.enabled" else super().get(setting_name)
+
+
+def test_histogram_percentiles_are_within_a_bucket() -> None:
+    histogram = Histogram()
+    for duration_ns in range(1, 100_001):
+        histogram.record(duration_ns)
+    assert (histogram.count, histogram.min_ns, histogram.max_ns) == (100_000, 1, 100_000)
+    assert histogram.mean_ns == 50_000.5
+    for q in (10, 50, 90, 99):
+        assert abs(histogram.percentile(q) - q * 1000) <= 0.25 * q * 1000
+    assert histogram.percentile(100) == 100_000
+    assert sum(histogram.get_buckets().values()) == 100_000
+
+
+def test_run_session_saves_a_profile_of_every_stage(tmp_path: Path) -> None:
+    measurer = _measurer("a", 1, delay=0.002)
+    session = RunSession(
+        [measurer], {"a": "V"}, tmp_path / "run.csv", _ProfiledConfiguration(), 0.005, get_active_sinks(["csv"]), 20
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    assert session.profiler is not None
+    histograms = session.profiler.get_histograms()
+    assert histograms[(Stage.MEASURE, "a")].count == 20
+    assert histograms[(Stage.MEASURE, "a")].min_ns >= 2_000_000
+    assert histograms[(Stage.FRAME, "samples")].count == 20
+    # The save process records to shared memory.
+    assert histograms[(Stage.WRITE, "csv")].count >= 1
+    report = json.loads(get_profile_path(tmp_path / "run.csv").read_text())
+    assert report["samples"] == 20
+    assert list(report["stages"]) == ["measure", "frame", "journal", "buffer", "write", "flush"]
+
+
+def test_run_session_telemetry_shows_a_run_falling_behind(tmp_path: Path) -> None:
+    session = RunSession(
+        [_measurer("a", 1, delay=0.008)], {"a": "V"}, tmp_path / "run.csv", Configuration(), 0.005, [], 30
+    )
+    session.start()
+    time.sleep(0.1)
+    telemetry = session.get_telemetry()
+    assert telemetry.target_rate == 200
+    assert 0 < telemetry.sample_rate < telemetry.target_rate
+    assert telemetry.last_tick_overrun
+    assert session.stop_event.wait(5)
+    session.stop()
+    telemetry = session.get_telemetry()
+    session.close()
+    assert telemetry.samples == 30
+    assert telemetry.overruns > 0 and telemetry.skipped > 0
+    assert (telemetry.queue_depth, telemetry.writer_lag, telemetry.dropped) == (0, 0.0, 0)
+    # Once the run stopped, the rate is the average of the run.
+    assert telemetry.sample_rate == pytest.approx(30 / telemetry.elapsed)
+
+
+def _captured_rows(trigger: Trigger, values: np.ndarray) -> list[int]:
+    """Return the rows to keep around the events of ``trigger``, checking one sample at a time."""
+    kept: set[int] = set()
+    previous = math.nan
+    for i, value in enumerate(values.tolist()):
+        if math.isnan(value):
+            continue
+        rising, falling = previous < trigger.level <= value, previous > trigger.level >= value
+        previous = value
+        if trigger.mode is TriggerMode.WINDOW:
+            fired = value < trigger.level or value > trigger.upper  # type: ignore
+        elif trigger.mode is TriggerMode.LEVEL:
+            fired = value >= trigger.level if trigger.slope is Slope.RISING else value <= trigger.level
+        else:
+            fired = {Slope.RISING: rising, Slope.FALLING: falling, Slope.EITHER: rising or falling}[trigger.slope]
+        if fired:
+            kept.update(range(max(i - trigger.pre_samples, 0), min(i + trigger.post_samples + 1, len(values))))
+    return sorted(kept)
+
+
+@pytest.mark.parametrize(
+    "trigger",
+    [
+        Trigger("a", TriggerMode.EDGE, 0.5, slope=Slope.RISING, pre_samples=5, post_samples=3),
+        Trigger("a", TriggerMode.EDGE, 0.0, slope=Slope.EITHER, pre_samples=2, post_samples=0),
+        Trigger("a", TriggerMode.LEVEL, 1.5, slope=Slope.RISING, pre_samples=4, post_samples=6),
+        Trigger("a", TriggerMode.WINDOW, -1.5, 1.5, pre_samples=8, post_samples=2),
+    ],
+)
+def test_triggered_capture_keeps_samples_around_events_across_frames(trigger: Trigger) -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "a": "V"})
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, 2000)
+    # The channel is not measured in every sample.
+    values[rng.random(2000) < 0.2] = math.nan
+    frame = np.column_stack([np.arange(2000, dtype=float), values])
+    expected = _captured_rows(trigger, values)
+    assert 0 < len(expected) < 2000
+
+    capture = TriggeredCapture(trigger, schema)
+    bounds = np.unique(np.concatenate([[0, 2000], rng.integers(0, 2000, 300)]))
+    kept = np.concatenate([capture.process(frame[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])])
+    assert kept[:, 0].tolist() == expected
+    # The result does not depend on how the samples were split into frames.
+    whole_capture = TriggeredCapture(trigger, schema)
+    assert whole_capture.process(frame)[:, 0].tolist() == expected
+    assert capture.event_times == whole_capture.event_times
+    assert capture.events <= len(expected)
+
+
+def test_run_session_saves_only_around_trigger_events(tmp_path: Path) -> None:
+    count = 0
+
+    def measure() -> dict[str, float]:
+        nonlocal count
+        count += 1
+        return {"a": float((count - 1) // 20 % 2)}
+
+    trigger = Trigger("a", TriggerMode.EDGE, 0.5, pre_samples=3, post_samples=4)
+    session = RunSession(
+        [Measurer("a", measure, ["a"])],
+        {"a": "V"},
+        tmp_path / "run.csv",
+        Configuration(),
+        0.001,
+        get_active_sinks(["csv"]),
+        100,
+        trigger=trigger,
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    assert session.number_of_samples == 100
+    # The samples rise at the 20th and 60th sample.
+    lines = (tmp_path / "run.csv").read_text(encoding="utf-8-sig").splitlines()
+    assert len(lines) == 1 + 2 * (3 + 1 + 4)
+    # CSV has no metadata of its own, so the metadata is stored next to the file.
+    metadata = json.loads(get_metadata_path(tmp_path / "run.csv").read_text())
+    assert metadata["trigger"] == trigger.to_dict()
+    assert metadata["triggerEventCount"] == 2
+    assert len(json.loads(get_trigger_events_path(tmp_path / "run.csv").read_text())) == 2
+    with pytest.raises(ValueError):
+        RunSession([], {}, tmp_path / "other.csv", Configuration(), 0.001, [], trigger=trigger)
+
+
+def test_run_session_stores_many_trigger_events_of_a_run_file(tmp_path: Path) -> None:
+    count = 0
+
+    def measure() -> dict[str, float]:
+        nonlocal count
+        count += 1
+        return {"a": float(count % 2 == 0)}
+
+    # Every other sample rises, far more events than the header of a run file holds.
+    trigger = Trigger("a", TriggerMode.EDGE, 0.5)
+    session = RunSession(
+        [Measurer("a", measure, ["a"])],
+        {"a": "V"},
+        tmp_path / "run.alrun",
+        Configuration(),
+        0.0005,
+        get_active_sinks(["alrun"]),
+        1000,
+        trigger=trigger,
+    )
+    session.start()
+    assert session.stop_event.wait(5)
+    assert session.stop()
+    session.close()
+    reader = RunFileReader(tmp_path / "run.alrun")
+    assert len(reader) == 500
+    assert reader.metadata["triggerEventCount"] == 500
+    assert reader.metadata["epochNs"] > 0
+    assert len(json.loads(get_trigger_events_path(tmp_path / "run.alrun").read_text())) == 500
+
+
+def test_engine_sends_blocks_of_streaming_devices() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "a": "V", "x": "V", "y": "V"})
+    buffer = SharedRingBuffer(len(schema), 4096, ["display"])
+    counter = iter(range(10**6))
+
+    def measure_block() -> Block:
+        start = next(counter) * 100
+        samples = np.arange(start, start + 100, dtype=float)
+        return Block({"x": samples, "y": -samples}, sample_rate=10_000)
+
+    streaming = Measurer("daq", measure_block, ["x", "y"], streaming=True)
+    poller = DevicePoller([_measurer("a", 1), streaming])
+    engine = AcquisitionEngine(poller, schema, 0.01, buffer, frame_latency=0.02)
+    engine.start()
+    time.sleep(0.2)
+    engine.stop()
+    poller.close()
+    samples = buffer.reader("display").read()
+    blocks = samples[~np.isnan(samples[:, 2])]
+    # Every sample of every block after the start arrives, with the spacing of the device clock.
+    first = int(blocks[0, 2])
+    assert blocks[:, 2].tolist() == list(range(first, first + len(blocks)))
+    assert blocks[0, 0] >= 0
+    np.testing.assert_array_equal(blocks[:, 3], -blocks[:, 2])
+    np.testing.assert_allclose(np.diff(blocks[:, 0]), 1e-4)
+    assert np.all(np.isnan(blocks[:, 1]))
+    # The device measured a block of 100 samples on every tick.
+    assert np.count_nonzero(samples[:, 1] == 1) == (first + len(blocks)) // 100
+    assert np.all(np.diff(samples[:, 0]) >= 0)
+    buffer.close()
+
+
+def test_poller_drops_samples_a_streaming_device_buffered_before_the_start() -> None:
+    def measure_block() -> Block:
+        # The device has buffered a second of samples when the run starts.
+        return Block({"x": np.arange(10_000, dtype=float)}, sample_rate=10_000)
+
+    poller = DevicePoller([Measurer("daq", measure_block, ["x"], streaming=True)])
+    poller.origin_ns = time.perf_counter_ns()
+    # A streaming device has no timestamps of its own.
+    assert poller.poll() == {}
+    (block,) = poller.take_blocks()
+    poller.close()
+    assert 0 < len(block) < 1000
+    assert block.times[0] >= 0
+    np.testing.assert_array_equal(block.channels["x"], np.arange(10_000 - len(block), 10_000))
+
+
+def test_engine_orders_blocks_of_varying_sizes_with_other_devices() -> None:
+    schema = FrameSchema.from_descriptions({"Time": "sec", "a": "V", "x": "V"})
+    buffer = SharedRingBuffer(len(schema), 8192, ["display"])
+    sizes = iter([50, 150, 0, 20, 180, 100, 1, 199] * 1000)
+    counter = iter(range(10**6))
+
+    def measure_block() -> Block:
+        # A buffered device returns whatever arrived since the previous call, on average one poll of samples.
+        return Block({"x": np.array([next(counter) for _ in range(next(sizes))], dtype=float)}, sample_rate=10_000)
+
+    streaming = Measurer("daq", measure_block, ["x"], streaming=True)
+    poller = DevicePoller([_measurer("a", 1), streaming])
+    engine = AcquisitionEngine(poller, schema, 0.01, buffer, frame_latency=0.02)
+    engine.start()
+    time.sleep(0.3)
+    engine.stop()
+    poller.close()
+    samples = buffer.reader("display").read()
+    blocks = samples[~np.isnan(samples[:, 2])]
+    assert len(blocks) > 1000
+    first = int(blocks[0, 2])
+    assert blocks[:, 2].tolist() == list(range(first, first + len(blocks)))
+    np.testing.assert_allclose(np.diff(blocks[:, 0]), 1e-4)
+    # The polled samples fall between the block samples, so the run stays in time order.
+    assert np.count_nonzero(samples[:, 1] == 1) > 10
+    assert np.all(np.diff(samples[:, 0]) >= 0)
+    buffer.close()
+
+
+def _read_in_child(buffer: SharedRingBuffer, conn) -> None:
+    conn.send(buffer.reader("storage").read().tolist())
+
+
+def test_ring_buffer_reports_overflow_per_consumer() -> None:
+    context = mp.get_context("spawn")
+    buffer = SharedRingBuffer(1, 4, ["display", "storage"], context=context)
+    display = buffer.reader("display")
+    buffer.write(np.arange(3.0).reshape(-1, 1))
+    assert display.read().ravel().tolist() == [0, 1, 2]
+    buffer.write(np.arange(3.0, 9.0).reshape(-1, 1))
+    views = display.peek()
+    # The unread samples wrap around the end of the buffer.
+    assert [view.ravel().tolist() for view in views] == [[5, 6, 7], [8]]
+    display.advance(4)
+    assert [(stats.name, stats.lag, stats.overflow) for stats in buffer.stats()] == [
+        ("display", 0, 2),
+        ("storage", 4, 0),
+    ]
+
+    recv_conn, send_conn = mp.Pipe(duplex=False)
+    process = context.Process(target=_read_in_child, args=(buffer, send_conn))
+    process.start()
+    assert recv_conn.recv() == [[5], [6], [7], [8]]
+    process.join()
+    assert buffer.stats()[1].overflow == 5
+    buffer.close()
+
+
+def _write_in_child(buffer: SharedRingBuffer, frames: int, rows: int) -> None:
+    for i in range(frames):
+        buffer.write(np.repeat(np.arange(i * rows, (i + 1) * rows, dtype=float)[:, None], buffer.columns, axis=1))
+    buffer.notify()
+
+
+def test_ring_buffer_reader_never_returns_rows_the_producer_is_overwriting() -> None:
+    context = mp.get_context("spawn")
+    frames, rows = 20000, 48
+    buffer = SharedRingBuffer(256, 64, ["storage"], context=context)
+    reader = buffer.reader("storage")
+    process = context.Process(target=_write_in_child, args=(buffer, frames, rows))
+    process.start()
+    delivered = 0
+    while process.is_alive() or reader.lag:
+        frame = reader.read()
+        # Every row is a copy of one written row, at its index in the run.
+        np.testing.assert_array_equal(frame, frame[:, :1].repeat(buffer.columns, axis=1))
+        np.testing.assert_array_equal(frame[:, 0], np.arange(reader.cursor - len(frame), reader.cursor))
+        delivered += len(frame)
+    process.join()
+    assert delivered + reader.overflow == frames * rows
+    buffer.close()
+
+
+def test_frame_builder_flushes_by_size() -> None:
+    builder = FrameBuilder(FrameSchema(("Time", "a"), ("sec", "V")), max_samples=2, max_latency=10)
+    assert builder.append({"Time": 0, "a": 1, "unknown": 5}) is None
+    frame = builder.append({"Time": 1, "a": 2})
+    np.testing.assert_array_equal(frame, [[0, 1], [1, 2]])
+    assert builder.flush() is None
+
+
+def test_scheduler_fires_on_absolute_deadlines() -> None:
+    scheduler = DeadlineScheduler(10)
+    scheduler.start(0)
+    for arm_ns, fired_ns in ((0, 0), (5, 13), (15, 21), (25, 30)):
+        scheduler.arm(arm_ns)
+        scheduler.tick(fired_ns)
+    # The late tick at 13 does not shift the following deadlines.
+    assert scheduler.next_deadline_ns == 40
+    assert scheduler.stats.max_jitter_ns == 3
+    assert scheduler.stats.overruns == 0
+
+
+def test_scheduler_skips_passed_deadlines() -> None:
+    scheduler = DeadlineScheduler(10, OverrunPolicy.SKIP)
+    scheduler.start(0)
+    scheduler.tick(0)
+    # The previous tick ran until 35, so the deadlines 10, 20 and 30 passed.
+    assert scheduler.arm(35) == 5
+    tick = scheduler.tick(40)
+    assert (tick.index, tick.overrun) == (4, True)
+    assert scheduler.stats.skipped == 3
+
+
+def test_scheduler_flags_overrun() -> None:
+    scheduler = DeadlineScheduler(10, OverrunPolicy.FLAG)
+    scheduler.start(0)
+    scheduler.tick(0)
+    assert scheduler.arm(35) == 0
+    tick = scheduler.tick(35)
+    assert (tick.index, tick.overrun) == (1, True)
+    assert scheduler.next_deadline_ns == 40
+    assert scheduler.stats.skipped == 2
+
+
+def test_ring_reader_waits_for_samples() -> None:
+    buffer = SharedRingBuffer(1, 4, ["storage"])
+    storage = buffer.reader("storage")
+    assert not storage.wait(0.01)
+    buffer.write(np.zeros((1, 1)))
+    assert storage.wait(0)
+    buffer.close()
+
+
+def test_ring_buffer_blocks_for_blocking_consumer() -> None:
+    buffer = SharedRingBuffer(1, 4, ["display", "storage"], [ConsumerPolicy.DROP_OLDEST, ConsumerPolicy.BLOCK], 0.05)
+    storage = buffer.reader("storage")
+    buffer.write(np.arange(4.0).reshape(-1, 1))
+    # The producer waits until the blocking consumer makes room.
+    threading.Timer(0.01, storage.read, (2,)).start()
+    buffer.write(np.arange(4.0, 6.0).reshape(-1, 1))
+    assert storage.read().ravel().tolist() == [2, 3, 4, 5]
+    # A consumer that does not read in time loses samples after the timeout.
+    buffer.write(np.arange(6.0, 9.0).reshape(-1, 1))
+    buffer.write(np.arange(9.0, 11.0).reshape(-1, 1))
+    assert storage.read().ravel().tolist() == [7, 8, 9, 10]
+    stats = buffer.stats()
+    assert stats[1].dropped == 1
+    assert stats[1].blocked >= 0.05
+    assert stats[0].blocked == 0
+    buffer.close()
+
+
+def test_journal_tail_reads_rows_by_index(tmp_path: Path) -> None:
+    schema = FrameSchema(("Time", "a"), ("sec", "V"))
+    journal = JournalWriter(tmp_path / "run.aljournal", schema)
+    tail = JournalTail(journal.path)
+    for start in range(0, 20, 5):
+        journal.append(np.column_stack([np.arange(start, start + 5.0), np.zeros(5)]))
+    assert tail.read_rows(3, 7)[:, 0].tolist() == [3, 4, 5, 6]
+    assert tail.read_rows(7, 12)[:, 0].tolist() == [7, 8, 9, 10, 11]
+    # Rows that are not in the journal yet are not returned.
+    assert tail.read_rows(18, 25)[:, 0].tolist() == [18, 19]
+    tail.close()
+    journal.close()
+
+
+def test_save_worker_recovers_samples_a_slow_reader_lost_from_the_journal(tmp_path: Path) -> None:
+    schema = FrameSchema(("Time", "a"), ("sec", "V"))
+    journal = JournalWriter(tmp_path / "run.aljournal", schema)
+    # The storage reader spills, as with the default "spill" backpressure.
+    buffer = SharedRingBuffer(len(schema), 8, ["csv"], [ConsumerPolicy.DROP_OLDEST])
+    (sink,) = get_active_sinks(["csv"])
+    worker = SaveWorker(sink, schema, buffer.reader("csv"), tmp_path / "run.csv", journal_path=journal.path)
+    for start in range(0, 50, 10):
+        frame = np.column_stack([np.arange(start, start + 10.0), np.ones(10)])
+        journal.append(frame)
+        buffer.write(frame)
+    # The worker runs after the producer wrote everything, so the reader overflowed.
+    worker.stop_event.set()
+    worker.start()
+    journal.close()
+
+    rows = (tmp_path / "run.csv").read_text(encoding="utf-8-sig").splitlines()[1:]
+    assert [float(row.split(",")[0]) for row in rows] == list(range(50))
+    (stats,) = buffer.stats()
+    assert stats.recovered == stats.overflow > 0
+    assert stats.dropped == 0
+    metadata = json.loads(get_metadata_path(tmp_path / "run.csv").read_text(encoding="utf-8"))
+    assert metadata["consumers"]["csv"]["recovered"] == stats.recovered
+    buffer.close()
+
+
+def test_benchmark_reports_throughput_and_regressions(tmp_path: Path) -> None:
+    report = run_benchmark([Scenario(0.005, 4, 0.3)], get_active_sinks(["csv"]), Configuration(), tmp_path)
+    (result,) = report["results"]
+    assert result["scenario"] == "5ms-4ch"
+    assert result["saved"]
+    assert 0.5 < result["samplesPerSecond"] / result["targetSamplesPerSecond"] < 1.5
+    assert result["valuesPerSecond"] == 4 * result["samplesPerSecond"]
+    assert 0 <= result["latency"]["p50"] <= result["latency"]["p99"] <= result["latency"]["max"]
+    assert set(result["cpuPercent"]) == {"acquisition", "csv"}
+    assert (tmp_path / "5ms-4ch.csv").exists()
+    baseline = {"results": [{**result, "samplesPerSecond": 2 * result["samplesPerSecond"]}]}
+    assert find_regressions(report, report, 0.1) == []
+    assert find_regressions(report, baseline, 0.1) == [
+        f"5ms-4ch: {result['samplesPerSecond']:.0f} samples/s, baseline {2 * result['samplesPerSecond']:.0f} samples/s"
+    ]
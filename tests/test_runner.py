@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+import pytest
+from qtpy.QtCore import QObject, QThread
+
+from pyautolab import api
+from pyautolab.app.app import App
+from pyautolab.app.runner import ControllerWorker, DataReadWorker, Runner
+from pyautolab.core.acquisition import Tick
+from pyautolab.core.utils.conf import Configuration, RunConfiguration
+
+
+class _Counter(api.Device):
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def receive(self) -> str:
+        return ""
+
+    def send(self, message: str) -> None:
+        pass
+
+    def reset_buffer(self) -> None:
+        pass
+
+    def measure(self) -> dict[str, float]:
+        self.count += 1
+        return {"Count": float(self.count)}
+
+
+class _Recorder(api.Controller):
+    def __init__(self, interval: int, delay: float = 0, parent: QObject | None = None) -> None:
+        super().__init__()
+        if parent is not None:
+            self.setParent(parent)
+        self.interval = interval
+        self.delay = delay
+        self.ticks: list[Tick] = []
+        self.threads: list[QThread] = []
+        self.stop_thread: QThread | None = None
+
+    def control(self, tick: Tick) -> None:
+        self.ticks.append(tick)
+        self.threads.append(QThread.currentThread())
+        time.sleep(self.delay)
+
+    def stop(self) -> None:
+        self.stop_thread = QThread.currentThread()
+        super().stop()
+
+
+class _CounterTab(api.DeviceTab):
+    def __init__(self, device: api.Device, controller: api.Controller | None = None) -> None:
+        super().__init__(device)
+        self.controller = controller
+
+    def get_controller(self) -> api.Controller | None:
+        return self.controller
+
+    def get_parameters(self) -> dict[str, str] | None:
+        return {"Count": ""}
+
+
+@pytest.fixture()
+def run_conf(monkeypatch, tmp_path) -> RunConfiguration:
+    """Keep the settings, the journal and the files of the runs out of the user folder."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    monkeypatch.setattr(App, "configurations", Configuration())
+    conf = RunConfiguration()
+    conf.add("measuringInterval", 5)
+    conf.add("continuous", False)
+    conf.add("numberOfMeasuringTimes", 50)
+    return conf
+
+
+def test_runner_sends_every_sample_of_a_finite_run_to_the_display(qtbot, run_conf, tmp_path) -> None:
+    # The measurement tab drives the runner and the display worker in the same way.
+    runner = Runner({_CounterTab(_Counter())}, tmp_path / "run.csv")
+    thread = QThread()
+    worker = DataReadWorker(runner.display_reader, 60, is_finished=runner.is_finished)
+    frames: list[np.ndarray] = []
+    worker.sig_read.connect(frames.append)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.start)  # type: ignore
+    thread.start()
+    with qtbot.waitSignal(worker.sig_finished, timeout=10000):
+        runner.start()
+    runner.stop()
+    worker.sig_stopped.emit()
+    thread.quit()
+    thread.wait()
+    runner.close()
+
+    samples = np.concatenate(frames)
+    counts = samples[:, runner.schema.index("Count")]
+    np.testing.assert_array_equal(counts, np.arange(1, 51))
+    assert np.all(np.diff(samples[:, 0]) > 0)
+    assert len((tmp_path / "run.csv").read_text(encoding="utf-8-sig").splitlines()) == 51
+
+
+def test_runner_calls_controllers_on_absolute_deadlines_on_their_thread(qtbot, run_conf, tmp_path) -> None:
+    run_conf.add("continuous", True)
+    controller = _Recorder(20)
+    runner = Runner({_CounterTab(_Counter(), controller)}, tmp_path / "run.csv")
+    main_thread = QThread.currentThread()
+    runner.start()
+    qtbot.waitUntil(lambda: len(controller.ticks) >= 10, timeout=5000)
+    runner.stop()
+    runner.close()
+
+    (thread,) = set(controller.threads)
+    assert thread is not main_thread
+    # The ticks keep the deadlines of the start of the run, however late each call was.
+    first = controller.ticks[0]
+    for tick in controller.ticks:
+        assert tick.deadline_ns - first.deadline_ns == (tick.index - first.index) * 20_000_000
+        assert tick.fired_ns >= tick.deadline_ns
+    assert np.all(np.diff([tick.index for tick in controller.ticks]) > 0)
+    # The run waited for the controller to stop on its thread, and then took it back to the GUI thread.
+    assert controller.stop_thread is thread
+    assert controller.thread() is main_thread
+    assert runner.get_controller_stats()["_Recorder"].ticks >= 10
+
+
+def test_runner_keeps_controllers_with_a_parent_on_the_gui_thread(qtbot, run_conf, tmp_path) -> None:
+    run_conf.add("continuous", True)
+    parent = QObject()
+    controller = _Recorder(20, parent=parent)
+    runner = Runner({_CounterTab(_Counter(), controller)}, tmp_path / "run.csv")
+    runner.start()
+    qtbot.waitUntil(lambda: len(controller.ticks) >= 3, timeout=5000)
+    runner.stop()
+    runner.close()
+    assert set(controller.threads) == {QThread.currentThread()}
+    assert controller.stop_thread is QThread.currentThread()
+    assert controller.parent() is parent
+
+
+def test_controller_worker_counts_overruns(qtbot) -> None:
+    controller = _Recorder(10, delay=0.025)
+    worker = ControllerWorker({controller})
+    worker.start()
+    qtbot.waitUntil(lambda: len(controller.ticks) >= 6, timeout=5000)
+    worker.stop()
+    stats = worker.get_stats()["_Recorder"]
+    # Every call takes more than two intervals, so the next deadlines are skipped and the late ticks are overruns.
+    assert stats.overruns >= 4
+    assert stats.skipped >= 4
+    assert sum(tick.overrun for tick in controller.ticks) == stats.overruns
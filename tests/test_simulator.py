@@ -0,0 +1,64 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from pyautolab.core.utils.system import search_ports
+from pyautolab.plugins.simulator.device import SIMULATED_PORT, SimulatedDaq, SineGenerator, StepGenerator
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"), reason="The simulator needs pseudo-terminals.")
+
+
+def test_instrument_answers_queries_through_its_serial_port() -> None:
+    device = SineGenerator()
+    # Nothing is served until the instrument is opened.
+    assert device.server is None
+    device.amplitude, device.latency = 2.0, 20
+    device.open()
+    assert device.server is not None
+    served_port = device.server.port
+    assert served_port in [port.device for port in search_ports("simulated")]
+    device.send("*IDN?")
+    assert device._serial.readline() == b"pyAutoLab,Sine Generator,0,1.0\n"
+    start = time.perf_counter()
+    value = device.measure()["Sine"]
+    assert time.perf_counter() - start >= 0.02
+    assert -2 <= value <= 2
+    device.close()
+    assert device.server is None
+    assert served_port not in [port.device for port in search_ports("simulated")]
+    # A closed instrument serves a new pseudo-terminal when it is opened again.
+    assert device.port == SIMULATED_PORT
+    device.open()
+    assert "Sine" in device.measure()
+    device.close()
+
+
+def test_step_instrument_switches_between_zero_and_amplitude() -> None:
+    device = StepGenerator()
+    device.frequency, device.amplitude = 50.0, 3.0
+    device.open()
+    values = set()
+    for _ in range(50):
+        values.add(device.measure()["Step"])
+        time.sleep(0.001)
+    assert values == {0.0, 3.0}
+    device.close()
+
+
+def test_daq_streams_blocks_at_its_sample_rate() -> None:
+    device = SimulatedDaq()
+    device.sample_rate = 2000
+    device.open()
+    samples = []
+    for _ in range(20):
+        time.sleep(0.01)
+        samples.append(device.measure())
+    device.close()
+    times = np.concatenate([block.times for block in samples])  # type: ignore
+    values = np.concatenate([block.channels["DAQ"] for block in samples])
+    assert len(times) >= 300
+    # No sample was lost, the block times are the sample indexes at the sample rate.
+    np.testing.assert_allclose(np.diff(times), 1 / 2000)
+    assert np.all(np.abs(values) <= 1)
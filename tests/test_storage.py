@@ -0,0 +1,223 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pyautolab.core.acquisition import FrameSchema, JournalReader, JournalWriter, Trigger, TriggerMode
+from pyautolab.core.storage import (
+    Compression,
+    CsvFileWriter,
+    NpyFileWriter,
+    RunFileError,
+    RunFileReader,
+    RunFileWriter,
+    SegmentedSink,
+    SegmentManifest,
+    SegmentPolicy,
+    SqliteFileWriter,
+    SqliteRunReader,
+    get_metadata_path,
+    get_sink,
+    get_sinks,
+    get_trigger_events_path,
+    recover_interrupted_runs,
+    recover_journal,
+)
+
+SCHEMA = FrameSchema(("Time", "V", "I"), ("sec", "volt", "amp"))
+
+
+def _frame(start: int, stop: int) -> np.ndarray:
+    time = np.arange(start, stop, dtype=float)
+    return np.column_stack([time, time * 2, time * 3])
+
+
+def test_run_file_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "run.alrun"
+    writer = RunFileWriter(path, SCHEMA, chunk_rows=16, metadata={"interval": 0.1})
+    writer.write(_frame(0, 40))
+    # Flushed rows of the current chunk are visible before the chunk is full.
+    writer.flush()
+    assert len(RunFileReader(path)) == 40
+    writer.write(_frame(40, 100))
+    writer.update_metadata({"stopped": True})
+    writer.close()
+
+    reader = RunFileReader(path)
+    assert reader.columns == SCHEMA.columns
+    assert reader.units == SCHEMA.units
+    assert reader.metadata["interval"] == 0.1
+    assert reader.metadata["stopped"]
+    assert len(reader) == 100
+    assert reader.time_range == (0, 99)
+    np.testing.assert_array_equal(reader.read(), _frame(0, 100))
+    np.testing.assert_array_equal(reader.read(15.5, 33), _frame(16, 34))
+    np.testing.assert_array_equal(reader.column("I"), np.arange(100) * 3)
+    reader.close()
+
+
+def test_run_file_rejects_other_files(tmp_path: Path) -> None:
+    path = tmp_path / "run.csv"
+    path.write_text("Time[sec]\n" * 10)
+    with pytest.raises(RunFileError):
+        RunFileReader(path)
+
+
+def test_sinks_are_registered() -> None:
+    assert {"csv", "alrun", "npy", "sqlite"} <= get_sinks().keys()
+    assert get_sink("npy") is NpyFileWriter
+
+
+def test_npy_file_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "run.npy"
+    writer = NpyFileWriter(path, SCHEMA)
+    writer.write(_frame(0, 10))
+    writer.flush()
+    assert len(np.load(path)) == 10
+    writer.write(_frame(10, 25))
+    writer.close()
+
+    data = np.load(path)
+    assert data.dtype.names == SCHEMA.columns
+    assert data.dtype.fields["V"][2] == "V[volt]"
+    np.testing.assert_array_equal(data["I"], np.arange(25) * 3)
+
+
+def test_reserved_files_hold_only_written_rows(tmp_path: Path) -> None:
+    npy_writer = NpyFileWriter(tmp_path / "run.npy", SCHEMA)
+    run_writer = RunFileWriter(tmp_path / "run.alrun", SCHEMA, chunk_rows=8)
+    for writer in (npy_writer, run_writer):
+        writer.reserve(100)
+        writer.write(_frame(0, 20))
+        writer.flush()
+    size = (tmp_path / "run.npy").stat().st_size
+    assert len(np.load(tmp_path / "run.npy")) == 20
+    reader = RunFileReader(tmp_path / "run.alrun")
+    np.testing.assert_array_equal(reader.read(5, 30), _frame(5, 20))
+    reader.close()
+
+    # A run that stops early leaves no reserved rows behind.
+    for writer in (npy_writer, run_writer):
+        writer.write(_frame(20, 25))
+        writer.close()
+    assert (tmp_path / "run.npy").stat().st_size < size
+    assert len(np.load(tmp_path / "run.npy")) == 25
+    reader = RunFileReader(tmp_path / "run.alrun")
+    assert len(reader) == 25 and reader.time_range == (0, 24)
+    reader.close()
+
+
+def test_sqlite_file_live_read(tmp_path: Path) -> None:
+    path = tmp_path / "run.sqlite"
+    writer = SqliteFileWriter(path, SCHEMA)
+    frame = _frame(0, 10)
+    frame[3, 1] = np.nan
+    writer.write(frame)
+    writer.flush()
+
+    # A reader sees the committed rows of a run which is still being written.
+    reader = SqliteRunReader(path)
+    assert reader.is_running
+    assert reader.columns == SCHEMA.columns
+    assert reader.units == SCHEMA.units
+    np.testing.assert_array_equal(reader.read(2.5, 6), frame[3:7])
+    writer.write(_frame(10, 20))
+    assert len(reader) == 10
+    writer.close()
+    assert not reader.is_running
+    assert reader.time_range == (0, 19)
+    np.testing.assert_array_equal(reader.column("I"), np.arange(20) * 3)
+    reader.close()
+
+    # Every run gets its own table.
+    SqliteFileWriter(path, SCHEMA).close()
+    assert [run for run, _, _ in SqliteRunReader.runs(path)] == [1, 2]
+    assert len(SqliteRunReader(path)) == 0
+    assert len(SqliteRunReader(path, 1)) == 20
+
+
+def test_segmented_sink_rotates_and_compresses(tmp_path: Path) -> None:
+    path = tmp_path / "run.csv"
+    sink = SegmentedSink(CsvFileWriter, path, SCHEMA, SegmentPolicy(max_duration=10, compression=Compression.ZLIB))
+    for start in range(0, 35, 7):
+        sink.write(_frame(start, start + 7))
+    sink.close()
+
+    manifest = SegmentManifest(path)
+    assert manifest.columns == SCHEMA.columns
+    assert len(manifest) == 35
+    assert [segment.file for segment in manifest.segments] == [f"run-000{i}.csv.gz" for i in range(1, 5)]
+    assert [(segment.first_time, segment.last_time) for segment in manifest.segments][:2] == [(0, 9), (10, 19)]
+    assert sorted(file.name for file in tmp_path.iterdir()) == sorted(
+        [segment.file for segment in manifest.segments] + ["run.segments.json"]
+    )
+    selected = manifest.select(12, 21)
+    assert [segment.file for segment in selected] == ["run-0002.csv.gz", "run-0003.csv.gz"]
+    with manifest.open(selected[0]) as f:
+        lines = f.read().decode("utf-8-sig").splitlines()
+    assert lines[0] == "Time[sec],V[volt],I[amp]"
+    assert np.loadtxt(lines[1:], delimiter=",").tolist() == _frame(10, 20).tolist()
+
+
+def test_segmented_sink_keeps_max_segments(tmp_path: Path) -> None:
+    path = tmp_path / "run.csv"
+    policy = SegmentPolicy(max_bytes=1, compression=Compression.NONE, max_segments=2)
+    sink = SegmentedSink(CsvFileWriter, path, SCHEMA, policy)
+    for start in range(5):
+        sink.write(_frame(start, start + 1))
+        sink.flush()
+    sink.close()
+
+    manifest = SegmentManifest(path)
+    assert [segment.first_time for segment in manifest.segments] == [3, 4]
+    assert len(list(tmp_path.glob("run-*.csv"))) == 2
+
+
+def test_journal_recovers_interrupted_run(tmp_path: Path) -> None:
+    path = tmp_path / "run.aljournal"
+    csv_path = tmp_path / "run.csv"
+    # The pid of a process that no longer runs.
+    metadata = {"files": {"csv": str(csv_path)}, "pid": 0, "processCreateTime": 0}
+    journal = JournalWriter(path, SCHEMA, metadata)
+    journal.start()
+    journal.append(_frame(0, 10))
+    journal.update_metadata({"epochNs": 1})
+    journal.append(_frame(10, 15))
+    journal.close()
+    with path.open("ab") as f:
+        f.write(b"\x01\x00\x00\x00torn")
+
+    reader = JournalReader(path)
+    assert reader.schema == SCHEMA
+    np.testing.assert_array_equal(reader.read(), _frame(0, 15))
+    assert reader.is_torn
+    assert reader.metadata["epochNs"] == 1
+    reader.close()
+
+    assert recover_interrupted_runs(tmp_path) == [csv_path]
+    assert not path.exists()
+    lines = csv_path.read_text(encoding="utf-8-sig").splitlines()
+    assert np.loadtxt(lines[1:], delimiter=",").tolist() == _frame(0, 15).tolist()
+    # CSV has no metadata of its own, so the metadata of the run is stored next to the file.
+    assert json.loads(get_metadata_path(csv_path).read_text())["epochNs"] == 1
+
+
+def test_journal_recovers_only_the_samples_around_trigger_events(tmp_path: Path) -> None:
+    path = tmp_path / "run.aljournal"
+    run_path = tmp_path / "run.alrun"
+    trigger = Trigger("V", TriggerMode.EDGE, 11, pre_samples=1, post_samples=1)
+    metadata = {"files": {"alrun": str(run_path)}, "trigger": trigger.to_dict()}
+    journal = JournalWriter(path, SCHEMA, metadata)
+    journal.start()
+    journal.append(_frame(0, 5))
+    journal.append(_frame(5, 15))
+    journal.close()
+
+    assert recover_journal(path) == [run_path]
+    reader = RunFileReader(run_path)
+    # V crosses 11 only at the sample of time 6.
+    np.testing.assert_array_equal(reader.read(), _frame(5, 8))
+    assert reader.metadata["trigger"] == trigger.to_dict()
+    assert reader.metadata["triggerEventCount"] == 1
+    assert json.loads(get_trigger_events_path(run_path).read_text()) == [6]